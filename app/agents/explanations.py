@@ -0,0 +1,156 @@
+"""
+On-demand explanations.
+
+/solve hands out an explanation_id for each result without one instead
+of calling Gemini. The id is a content hash of (question, answer,
+steps), so equal results share an id across requests and workers. Its
+record holds the inputs, and later the explanation. Records live in a
+TieredCache whose SQLite tier (EXPLANATION_CACHE_PATH) every worker
+shares, so an id handed out by one worker resolves on any other and
+after a restart. Reads and writes run on the io pool.
+
+The first GET /explain/{id} makes the explanation and stores it in the
+record; concurrent requests for the same id wait on that one call.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+
+from app.agents.gemini_explainer_agent import explain_with_gemini_async
+from app.agents.llm_cache import normalize_input
+from app.config import (
+    EXPLANATION_CACHE_PATH,
+    EXPLANATION_CACHE_SIZE,
+    SOLVE_CACHE_TTL,
+    SOLVE_CACHE_SHARED_SIZE
+)
+from app.utils.cache import LRUCache, SQLiteCache, TieredCache
+from app.utils.executors import ExecutorSaturated, run_io
+
+_cache = None
+_cache_lock = threading.Lock()
+
+# explanation_id -> task making it (on the server's event loop)
+_computing = {}
+
+_stats_lock = threading.Lock()
+_stats = {"registered": 0, "requested": 0, "computed": 0, "coalesced": 0, "failed": 0}
+
+
+def _count(field: str):
+    with _stats_lock:
+        _stats[field] += 1
+
+
+def explanation_cache() -> TieredCache:
+    global _cache
+
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                shared = None
+                if EXPLANATION_CACHE_PATH:
+                    shared = SQLiteCache(
+                        EXPLANATION_CACHE_PATH, "explanations",
+                        SOLVE_CACHE_SHARED_SIZE, SOLVE_CACHE_TTL
+                    )
+                _cache = TieredCache(
+                    LRUCache(EXPLANATION_CACHE_SIZE, SOLVE_CACHE_TTL), shared
+                )
+
+    return _cache
+
+
+def explanation_id(problem_text: str, final_answer: str, steps: list[str]) -> str:
+    material = json.dumps(normalize_input([problem_text, final_answer, steps or []]))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()[:32]
+
+
+def register_explanation(problem_text: str, final_answer: str, steps: list[str]) -> str:
+    """
+    Id for a later GET /explain/{id}. An existing record (possibly
+    already explained) is kept. Blocking (SQLite).
+    """
+    key = explanation_id(problem_text, final_answer, steps)
+    cache = explanation_cache()
+    if cache.get(key) is None:
+        cache.set(key, {
+            "args": [problem_text, final_answer, steps or []],
+            "explanation": None
+        })
+        _count("registered")
+    return key
+
+
+def _load(key: str) -> dict | None:
+    return explanation_cache().get(key)
+
+
+def _save(key: str, record: dict):
+    explanation_cache().set(key, record)
+
+
+def _register_all(problems: list[tuple]) -> list[str]:
+    return [register_explanation(*args) for args in problems]
+
+
+async def register_explanations(problems: list[tuple]) -> list[str | None]:
+    """
+    Ids for (problem_text, final_answer, steps) tuples, registered on
+    the io pool. All None when the pool is saturated: the results then
+    go out without an id rather than failing the solve.
+    """
+    if not problems:
+        return []
+    try:
+        return await run_io(_register_all, problems)
+    except ExecutorSaturated:
+        return [None] * len(problems)
+
+
+async def _compute(key: str, record: dict, use_cache: bool) -> str:
+    try:
+        explanation = await explain_with_gemini_async(*record["args"], use_cache=use_cache)
+    except Exception:
+        _count("failed")
+        raise
+
+    _count("computed")
+    try:
+        await run_io(_save, key, dict(record, explanation=explanation))
+    except ExecutorSaturated:
+        # Served anyway; the next request for the id makes it again
+        pass
+    return explanation
+
+
+async def explain_by_id(key: str, use_cache: bool = True) -> dict | None:
+    """
+    {"explanation", "cached"} for a registered id, None for an unknown
+    one. Gemini errors propagate, as does ExecutorSaturated.
+    """
+    _count("requested")
+    record = await run_io(_load, key)
+    if record is None:
+        return None
+    if record["explanation"] and use_cache:
+        return {"explanation": record["explanation"], "cached": True}
+
+    task = _computing.get(key)
+    if task is None:
+        task = asyncio.create_task(_compute(key, record, use_cache))
+        _computing[key] = task
+        task.add_done_callback(lambda _: _computing.pop(key, None))
+    else:
+        _count("coalesced")
+
+    # A client hanging up must not cancel the work for the others
+    return {"explanation": await asyncio.shield(task), "cached": False}
+
+
+def explanation_stats() -> dict:
+    with _stats_lock:
+        counters = dict(_stats)
+    return dict(counters, computing=len(_computing), cache=explanation_cache().stats())
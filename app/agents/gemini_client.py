@@ -1,13 +1,207 @@
+"""
+Shared Gemini client.
+
+One google-genai client lives for the whole process, on its own event
+loop thread, over a pooled HTTP/1.1 keep-alive connection pool. Solver
+threads call generate(); async handlers await agenerate(). Both share
+the same connections, so there is a single TLS handshake per connection
+rather than one per call.
+
+Every call goes through three layers:
+  - single-flight: identical (model, system, prompt) calls in flight
+    are sent once and share the response;
+  - a semaphore capping concurrent upstream calls;
+  - retries on 429 / 5xx / transport errors with full-jitter
+    exponential backoff.
+"""
+
+import asyncio
+import hashlib
 import os
+import random
+import threading
+import time
+
+import httpx
 from google import genai
+from google.genai import errors, types
+
+from app.config import (
+    GEMINI_MODEL,
+    GEMINI_BASE_URL,
+    GEMINI_MAX_CONCURRENCY,
+    GEMINI_MAX_RETRIES,
+    GEMINI_BACKOFF_BASE,
+    GEMINI_BACKOFF_MAX,
+    GEMINI_TIMEOUT
+)
+from app.utils.latency import LatencyWindow
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+def _retryable(e: Exception) -> bool:
+    if isinstance(e, errors.APIError):
+        return e.code in RETRYABLE_STATUS
+    return isinstance(e, (httpx.TransportError, asyncio.TimeoutError))
+
+
+class GeminiClient:
+    def __init__(
+        self,
+        api_key: str,
+        model: str = GEMINI_MODEL,
+        base_url: str | None = GEMINI_BASE_URL,
+        max_concurrency: int = GEMINI_MAX_CONCURRENCY,
+        max_retries: int = GEMINI_MAX_RETRIES,
+        backoff: tuple[float, float] = (GEMINI_BACKOFF_BASE, GEMINI_BACKOFF_MAX),
+        timeout: float = GEMINI_TIMEOUT
+    ):
+        self.model = model
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._http = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency
+            )
+        )
+        self._client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(
+                base_url=base_url,
+                timeout=int(timeout * 1000),
+                httpx_async_client=self._http
+            )
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight = {}
+
+        self._stats = {
+            "requests": 0,
+            "coalesced": 0,
+            "upstream_calls": 0,
+            "retries": 0,
+            "failures": 0
+        }
+        self._latency = LatencyWindow()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="quantix-gemini", daemon=True
+        )
+        self._thread.start()
+
+    # ── public API ───────────────────────────
+
+    def generate(self, prompt: str, system: str | None = None) -> str:
+        """
+        Blocking call, for worker threads. Must not be called from the
+        client's own loop.
+        """
+        return asyncio.run_coroutine_threadsafe(
+            self._generate(prompt, system), self._loop
+        ).result()
+
+    async def agenerate(self, prompt: str, system: str | None = None) -> str:
+        """
+        Awaitable from any event loop.
+        """
+        return await asyncio.wrap_future(
+            asyncio.run_coroutine_threadsafe(
+                self._generate(prompt, system), self._loop
+            )
+        )
+
+    def stats(self) -> dict:
+        return dict(
+            self._stats,
+            in_flight=len(self._in_flight),
+            latency_ms=self._latency.stats()
+        )
+
+    def close(self):
+        async def aclose():
+            await self._http.aclose()
+
+        try:
+            asyncio.run_coroutine_threadsafe(aclose(), self._loop).result(timeout=5)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    # ── on the client loop ───────────────────
+
+    async def _generate(self, prompt: str, system: str | None) -> str:
+        self._stats["requests"] += 1
+        key = hashlib.sha256(
+            "\0".join((self.model, system or "", prompt)).encode("utf-8")
+        ).hexdigest()
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = self._loop.create_task(self._call_with_retries(prompt, system))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self._stats["coalesced"] += 1
+
+        # A caller giving up must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    async def _call_with_retries(self, prompt: str, system: str | None) -> str:
+        config = types.GenerateContentConfig(system_instruction=system) if system else None
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    self._stats["upstream_calls"] += 1
+                    start = time.perf_counter()
+                    response = await self._client.aio.models.generate_content(
+                        model=self.model, contents=prompt, config=config
+                    )
+                    self._latency.record((time.perf_counter() - start) * 1000)
+                return (response.text or "").strip()
+            except Exception as e:
+                if attempt == self.max_retries or not _retryable(e):
+                    self._stats["failures"] += 1
+                    raise
+                self._stats["retries"] += 1
+
+            # Full jitter: uniform in [0, min(cap, base * 2^attempt)]
+            base, cap = self.backoff
+            await asyncio.sleep(random.uniform(0, min(cap, base * 2 ** attempt)))
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def gemini_client() -> GeminiClient:
+    """
+    The process-wide client, created on first use.
+    """
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise RuntimeError("GEMINI_API_KEY not set")
+                _client = GeminiClient(api_key)
+
+    return _client
+
 
+def gemini_stats() -> dict | None:
+    return _client.stats() if _client is not None else None
 
-def get_gemini_model():
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise RuntimeError("GEMINI_API_KEY not set")
 
-    client = genai.Client(api_key=api_key)
+def close_gemini_client():
+    global _client
 
-    # Fast + cheap, good for explanations & fallback math
-    return client.models.get("gemini-1.5-flash")
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
@@ -1,4 +1,17 @@
-from app.agents.gemini_client import get_gemini_model
+import asyncio
+import json
+import re
+import time
+
+from app.agents.gemini_client import gemini_client
+from app.agents.llm_cache import (
+    acached_call,
+    cached_call,
+    aget_cached,
+    aput_cached,
+    template_version
+)
+from app.config import GEMINI_EXPLAIN_BATCH_SIZE, GEMINI_EXPLAIN_BATCH_TOKENS
 
 SYSTEM_PROMPT = """
 You explain math solutions.
@@ -10,13 +23,26 @@ Rules:
 - Be concise and educational.
 """
 
-def explain_with_gemini(problem_text: str, final_answer: str, steps: list[str]) -> str:
-    if not steps:
-        return "Explanation unavailable."
+PROMPT_TEMPLATE = """
+Problem:
+{problem_text}
+
+Final Answer:
+{final_answer}
+
+Steps:
+{steps}
+
+Explain the reasoning behind these steps.
+"""
+
+# Stands in for the steps when a result has none (KB / LLM answers)
+NO_STEPS = "None given. Explain how the final answer follows from the problem."
 
-    model = get_gemini_model()
+TEMPLATE_VERSION = template_version(SYSTEM_PROMPT, PROMPT_TEMPLATE, NO_STEPS)
 
-    prompt = f"""
+BATCH_ITEM_TEMPLATE = """
+### Problem {id}
 Problem:
 {problem_text}
 
@@ -25,15 +51,171 @@ Final Answer:
 
 Steps:
 {steps}
+"""
 
-Explain the reasoning behind these steps.
+BATCH_PROMPT_TEMPLATE = """
+Explain the reasoning behind each of the following solved problems.
+{items}
+Return ONLY a JSON array with one object per problem, in the same order:
+[{{"id": <problem number>, "explanation": "<explanation>"}}]
 """
 
-    response = model.generate_content(
-        [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt}
-        ]
+BATCH_TEMPLATE_VERSION = template_version(
+    SYSTEM_PROMPT, BATCH_ITEM_TEMPLATE, BATCH_PROMPT_TEMPLATE, NO_STEPS
+)
+
+_JSON_ARRAY = re.compile(r"\[.*\]", re.DOTALL)
+
+
+def _explain_inputs(problem_text: str, final_answer: str, steps: list[str]) -> dict:
+    return {
+        "problem_text": problem_text,
+        "final_answer": final_answer,
+        "steps": steps or NO_STEPS
+    }
+
+
+def explain_with_gemini(problem_text: str, final_answer: str, steps: list[str], use_cache: bool = True) -> str:
+    inputs = _explain_inputs(problem_text, final_answer, steps)
+    return cached_call(
+        "explain", TEMPLATE_VERSION, inputs,
+        lambda: gemini_client().generate(
+            PROMPT_TEMPLATE.format(**inputs), system=SYSTEM_PROMPT
+        ),
+        use_cache
     )
 
-    return response.text.strip()
+
+async def explain_with_gemini_async(problem_text: str, final_answer: str, steps: list[str], use_cache: bool = True) -> str:
+    inputs = _explain_inputs(problem_text, final_answer, steps)
+    return await acached_call(
+        "explain", TEMPLATE_VERSION, inputs,
+        lambda: gemini_client().agenerate(
+            PROMPT_TEMPLATE.format(**inputs), system=SYSTEM_PROMPT
+        ),
+        use_cache
+    )
+
+
+# ─────────────────────────────────────────────
+# BATCHED EXPLANATIONS
+# ─────────────────────────────────────────────
+
+def _estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English and math
+    return len(text) // 4 + 1
+
+
+def _chunk(items: list[dict], max_items: int, max_tokens: int) -> list[list[dict]]:
+    """
+    Greedy packing in order; an item over the token budget on its own
+    still gets a chunk.
+    """
+    chunks, current, tokens = [], [], 0
+    for item in items:
+        cost = _estimate_tokens(BATCH_ITEM_TEMPLATE.format(id=0, **item["inputs"]))
+        if current and (len(current) >= max_items or tokens + cost > max_tokens):
+            chunks.append(current)
+            current, tokens = [], 0
+        current.append(item)
+        tokens += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _parse_batch(text: str, count: int) -> dict[int, str]:
+    """
+    {position: explanation} from the model's JSON array; items it
+    skipped or mangled are simply absent.
+    """
+    match = _JSON_ARRAY.search(text)
+    if not match:
+        return {}
+    try:
+        entries = json.loads(match.group(0))
+    except json.JSONDecodeError:
+        return {}
+
+    parsed = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            position = int(entry.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        explanation = entry.get("explanation")
+        if 0 <= position < count and isinstance(explanation, str) and explanation.strip():
+            parsed[position] = explanation.strip()
+    return parsed
+
+
+async def _explain_chunk(chunk: list[dict], use_cache: bool):
+    if len(chunk) > 1:
+        prompt = BATCH_PROMPT_TEMPLATE.format(items="".join(
+            BATCH_ITEM_TEMPLATE.format(id=n, **item["inputs"])
+            for n, item in enumerate(chunk, start=1)
+        ))
+        started = time.perf_counter()
+        try:
+            parsed = _parse_batch(
+                await gemini_client().agenerate(prompt, system=SYSTEM_PROMPT),
+                len(chunk)
+            )
+        except Exception:
+            parsed = {}
+        latency_ms = (time.perf_counter() - started) * 1000 / len(chunk)
+
+        for position, explanation in parsed.items():
+            item = chunk[position]
+            item["explanation"] = explanation
+            await aput_cached("explain_batch", BATCH_TEMPLATE_VERSION, item["inputs"], explanation, latency_ms)
+
+    # Single items, and whatever the batch did not answer, one call each
+    async def explain_one(item):
+        try:
+            item["explanation"] = await explain_with_gemini_async(
+                *item["args"], use_cache=use_cache
+            )
+        except Exception:
+            pass
+
+    await asyncio.gather(*(
+        explain_one(item) for item in chunk if item["explanation"] is None
+    ))
+
+
+async def explain_batch(
+    problems: list[tuple],
+    use_cache: bool = True,
+    batch_size: int = GEMINI_EXPLAIN_BATCH_SIZE,
+    token_budget: int = GEMINI_EXPLAIN_BATCH_TOKENS
+) -> list[str | None]:
+    """
+    Explanations for (problem_text, final_answer, steps) tuples, in
+    order; None where one could not be produced.
+
+    Cached explanations are reused. The rest are packed into prompts
+    of up to `batch_size` problems / `token_budget` tokens, sent
+    concurrently. A batch that fails or leaves items unanswered falls
+    back to concurrent per-problem calls for those items.
+    """
+    inputs = [_explain_inputs(*args) for args in problems]
+    cached = await asyncio.gather(*(
+        aget_cached("explain_batch", BATCH_TEMPLATE_VERSION, item, use_cache)
+        for item in inputs
+    ))
+    items = [
+        {"args": args, "inputs": item, "explanation": explanation}
+        for args, item, explanation in zip(problems, inputs, cached)
+    ]
+
+    pending = [item for item in items if item["explanation"] is None]
+    if batch_size <= 1:
+        chunks = [[item] for item in pending]
+    else:
+        chunks = _chunk(pending, batch_size, token_budget)
+
+    await asyncio.gather(*(_explain_chunk(chunk, use_cache) for chunk in chunks))
+    return [item["explanation"] for item in items]
@@ -1,4 +1,5 @@
-from app.agents.gemini_client import get_gemini_model
+from app.agents.gemini_client import gemini_client
+from app.agents.llm_cache import cached_call, template_version
 
 SYSTEM_PROMPT = """
 You are a fallback mathematics solver.
@@ -11,10 +12,7 @@ STRICT RULES:
 - Keep the final answer concise and factual.
 """
 
-def solve_with_gemini(problem_text: str) -> dict:
-    model = get_gemini_model()
-
-    prompt = f"""
+PROMPT_TEMPLATE = """
 Solve the following problem carefully.
 
 Problem:
@@ -25,14 +23,17 @@ Instructions:
 - Return ONLY the final answer in the first line.
 """
 
-    response = model.generate_content(
-        [
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt}
-        ]
-    )
+TEMPLATE_VERSION = template_version(SYSTEM_PROMPT, PROMPT_TEMPLATE)
 
-    text = response.text.strip()
+
+def solve_with_gemini(problem_text: str, use_cache: bool = True) -> dict:
+    text = cached_call(
+        "solve", TEMPLATE_VERSION, {"problem_text": problem_text},
+        lambda: gemini_client().generate(
+            PROMPT_TEMPLATE.format(problem_text=problem_text), system=SYSTEM_PROMPT
+        ),
+        use_cache
+    )
 
     first_line = text.splitlines()[0] if text else "Unable to determine the answer."
 
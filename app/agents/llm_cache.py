@@ -0,0 +1,201 @@
+"""
+Durable cache of Gemini responses.
+
+Keys are sha256 over the model name, the call kind, the version of its
+prompt templates and the normalized inputs. A template version is a
+hash of the template text, so editing a prompt retires every response
+made with the old one: those rows no longer match and age out of the
+size-bounded SQLite table.
+
+Each entry keeps the latency of the call that produced it, so hits
+report how much upstream time they saved.
+
+The async helpers do their SQLite reads and writes on the io pool, never
+on the event loop. A saturated pool only costs the cache: the lookup
+counts as a miss and the store is skipped.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from app.config import (
+    GEMINI_MODEL,
+    LLM_CACHE_PATH,
+    LLM_CACHE_SIZE,
+    LLM_CACHE_TTL,
+    LLM_CACHE_LOCAL_SIZE
+)
+from app.utils.cache import LRUCache, SQLiteCache, TieredCache
+from app.utils.executors import ExecutorSaturated, run_io
+
+
+def template_version(*templates: str) -> str:
+    return hashlib.sha256("\0".join(templates).encode("utf-8")).hexdigest()[:12]
+
+
+def normalize_input(value):
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return [normalize_input(v) for v in value]
+    return value
+
+
+def _key(kind: str, version: str, inputs: dict) -> str:
+    material = json.dumps(
+        [GEMINI_MODEL, kind, version, {k: normalize_input(v) for k, v in inputs.items()}],
+        sort_keys=True
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {}
+
+
+def llm_cache() -> TieredCache | None:
+    global _cache
+
+    if _cache is None and LLM_CACHE_PATH:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TieredCache(
+                    LRUCache(LLM_CACHE_LOCAL_SIZE, LLM_CACHE_TTL),
+                    SQLiteCache(LLM_CACHE_PATH, "llm_responses", LLM_CACHE_SIZE, LLM_CACHE_TTL)
+                )
+
+    return _cache
+
+
+def _count(kind: str, field: str, amount: float = 1):
+    with _stats_lock:
+        counters = _stats.setdefault(
+            kind, {"hits": 0, "misses": 0, "bypassed": 0, "saved_ms": 0.0}
+        )
+        counters[field] += amount
+
+
+def _lookup(kind: str, key: str, use_cache: bool):
+    cache = llm_cache()
+    if cache is None:
+        return None, None
+    if not use_cache:
+        _count(kind, "bypassed")
+        return cache, None
+
+    entry = cache.get(key)
+    if entry is None:
+        _count(kind, "misses")
+        return cache, None
+
+    _count(kind, "hits")
+    _count(kind, "saved_ms", entry["latency_ms"])
+    return cache, entry
+
+
+async def _alookup(kind: str, key: str, use_cache: bool):
+    try:
+        return await run_io(_lookup, kind, key, use_cache)
+    except ExecutorSaturated:
+        return None, None
+
+
+def _entry(value, latency_ms: float) -> dict:
+    return {"value": value, "latency_ms": round(latency_ms, 2)}
+
+
+def _store(cache, key: str, value, started: float):
+    if cache is not None:
+        cache.set(key, _entry(value, (time.perf_counter() - started) * 1000))
+
+
+async def _astore(cache, key: str, value, latency_ms: float):
+    if cache is None:
+        return
+    try:
+        await run_io(cache.set, key, _entry(value, latency_ms))
+    except ExecutorSaturated:
+        pass
+
+
+def get_cached(kind: str, version: str, inputs: dict, use_cache: bool = True):
+    """
+    Cached value or None, for callers that fill entries themselves.
+    """
+    _, entry = _lookup(kind, _key(kind, version, inputs), use_cache)
+    return entry["value"] if entry is not None else None
+
+
+async def aget_cached(kind: str, version: str, inputs: dict, use_cache: bool = True):
+    _, entry = await _alookup(kind, _key(kind, version, inputs), use_cache)
+    return entry["value"] if entry is not None else None
+
+
+def put_cached(kind: str, version: str, inputs: dict, value, latency_ms: float):
+    cache = llm_cache()
+    if cache is not None:
+        cache.set(_key(kind, version, inputs), _entry(value, latency_ms))
+
+
+async def aput_cached(kind: str, version: str, inputs: dict, value, latency_ms: float):
+    try:
+        await run_io(put_cached, kind, version, inputs, value, latency_ms)
+    except ExecutorSaturated:
+        pass
+
+
+def cached_call(kind: str, version: str, inputs: dict, call, use_cache: bool = True):
+    """
+    call() on a miss; its result is stored. With use_cache=False the
+    lookup is skipped but the fresh result still replaces the entry.
+    """
+    key = _key(kind, version, inputs)
+    cache, entry = _lookup(kind, key, use_cache)
+    if entry is not None:
+        return entry["value"]
+
+    started = time.perf_counter()
+    value = call()
+    _store(cache, key, value, started)
+    return value
+
+
+async def acached_call(kind: str, version: str, inputs: dict, call, use_cache: bool = True):
+    """
+    cached_call for a coroutine function `call`.
+    """
+    key = _key(kind, version, inputs)
+    cache, entry = await _alookup(kind, key, use_cache)
+    if entry is not None:
+        return entry["value"]
+
+    started = time.perf_counter()
+    value = await call()
+    await _astore(cache, key, value, (time.perf_counter() - started) * 1000)
+    return value
+
+
+def llm_cache_stats() -> dict:
+    cache = llm_cache()
+    if cache is None:
+        return {"enabled": False}
+
+    with _stats_lock:
+        kinds = {kind: dict(counters) for kind, counters in _stats.items()}
+
+    for counters in kinds.values():
+        counters["saved_ms"] = round(counters["saved_ms"], 2)
+        lookups = counters["hits"] + counters["misses"]
+        counters["hit_rate"] = round(counters["hits"] / lookups, 4) if lookups else 0.0
+
+    return {
+        "enabled": True,
+        "saved_calls": sum(c["hits"] for c in kinds.values()),
+        "saved_ms": round(sum(c["saved_ms"] for c in kinds.values()), 2),
+        "kinds": kinds,
+        "tiers": cache.stats()
+    }
@@ -0,0 +1,184 @@
+"""
+Numeric engine for single-variable optimization.
+
+The expression is compiled once with lambdify to NumPy. The first
+derivative is sampled on a grid in one vectorized call, and every sign
+change is refined by a safeguarded Newton iteration: Newton steps with a
+bisection fallback, so the iteration never leaves its bracket. This
+works for transcendental derivatives that sp.solve cannot handle, and
+it is cheap enough to stand in when symbolic solving is over budget.
+"""
+
+import math
+import re
+from fractions import Fraction
+
+import numpy as np
+import sympy as sp
+
+from app.agents.sympy_parsing import parse_source, to_source
+from app.config import NUMERIC_GRID_POINTS, NUMERIC_SEARCH_RADIUS
+
+# A number or a multiple / fraction of pi: "3", "-1.5", "2pi", "-π/2"
+_BOUND = r"-?\s*(?:\d+(?:\.\d+)?\s*\*?\s*(?:pi|π)?|pi|π)(?:\s*/\s*\d+(?:\.\d+)?)?"
+
+# "on [0, 3]", "in the interval (-pi, pi)", "over [0, 2π]"
+_BRACKET_INTERVAL = re.compile(
+    rf"\s*\b(?:on|in|over|for)\s+(?:the\s+)?(?:interval\s+)?"
+    rf"[\[\(]\s*({_BOUND})\s*,\s*({_BOUND})\s*[\]\)]"
+)
+
+# "for 0 <= x <= 3", "where -1 < x < 2"
+_INEQUALITY_INTERVAL = re.compile(
+    rf"\s*,?\s*(?:\b(?:for|where|when|with)\s+)?({_BOUND})\s*(?:<=|≤|<)\s*[a-z]\s*"
+    rf"(?:<=|≤|<)\s*({_BOUND})\s*$"
+)
+
+
+def parse_number(token: str) -> float:
+    return float(parse_source(to_source(token)))
+
+
+def parse_interval(text: str):
+    """
+    Finds optional interval bounds in a problem statement.
+    Returns ((lo, hi) or None, text with the interval removed).
+    """
+    for pattern in (_BRACKET_INTERVAL, _INEQUALITY_INTERVAL):
+        match = pattern.search(text)
+        if not match:
+            continue
+        try:
+            lo, hi = parse_number(match.group(1)), parse_number(match.group(2))
+        except (SyntaxError, TypeError, ValueError):
+            continue
+        if lo < hi:
+            return (lo, hi), text[:match.start()] + text[match.end():]
+
+    return None, text
+
+
+def _compile(expr, var):
+    fn = sp.lambdify(var, expr, "numpy")
+
+    def vectorized(xs):
+        with np.errstate(all="ignore"):
+            ys = np.asarray(fn(xs))
+        if np.iscomplexobj(ys):
+            ys = np.where(np.abs(ys.imag) < 1e-12, ys.real, np.nan)
+        return np.broadcast_to(ys.astype(float), np.shape(xs))
+
+    def scalar(x):
+        return float(vectorized(np.asarray([x]))[0])
+
+    return vectorized, scalar
+
+
+def _refine_root(g, dg, a: float, b: float, tol: float = 1e-12, max_iter: int = 60) -> float:
+    """
+    Root of g in [a, b], where g changes sign. Newton steps are taken
+    while they stay inside the shrinking bracket, bisection otherwise.
+    """
+    ga, gb = g(a), g(b)
+    if ga == 0:
+        return a
+    if gb == 0:
+        return b
+    if ga > 0:
+        a, b = b, a
+
+    x = 0.5 * (a + b)
+    for _ in range(max_iter):
+        gx = g(x)
+        if gx == 0 or not np.isfinite(gx):
+            return x
+        if gx < 0:
+            a = x
+        else:
+            b = x
+
+        dgx = dg(x)
+        nx = x - gx / dgx if dgx and np.isfinite(dgx) else None
+        if nx is None or not min(a, b) < nx < max(a, b):
+            nx = 0.5 * (a + b)
+
+        if abs(nx - x) <= tol * (1 + abs(x)):
+            return nx
+        x = nx
+
+    return x
+
+
+def critical_points(expr, var, lo: float, hi: float, points: int = NUMERIC_GRID_POINTS) -> list[float]:
+    """
+    Zeros of the first derivative in [lo, hi]: sign changes on a grid,
+    each refined to machine precision.
+    """
+    d1 = sp.diff(expr, var)
+    d2 = sp.diff(d1, var)
+    grad, grad_at = _compile(d1, var)
+    _, curv_at = _compile(d2, var)
+
+    xs = np.linspace(lo, hi, points)
+    gs = grad(xs)
+
+    signs = np.sign(gs)
+    finite = np.isfinite(gs[:-1]) & np.isfinite(gs[1:])
+    brackets = np.nonzero(finite & (signs[:-1] * signs[1:] < 0))[0]
+    on_grid = np.nonzero(gs == 0)[0]
+
+    # A derivative that vanishes across the grid: no isolated extrema
+    if len(on_grid) > points // 4:
+        return []
+
+    roots = [float(xs[i]) for i in on_grid]
+    for i in brackets:
+        roots.append(float(_refine_root(grad_at, curv_at, xs[i], xs[i + 1])))
+
+    return sorted(roots)
+
+
+def optimize(expr, var, maximize: bool, interval=None) -> dict:
+    """
+    Global extremum of expr over `interval`. Endpoints count when the
+    interval came from the problem. Otherwise only critical points in
+    ±NUMERIC_SEARCH_RADIUS count, which matches the symbolic solver.
+    """
+    lo, hi = map(float, interval or (-NUMERIC_SEARCH_RADIUS, NUMERIC_SEARCH_RADIUS))
+    _, f_at = _compile(expr, var)
+    _, curv_at = _compile(sp.diff(expr, var, 2), var)
+
+    critical = critical_points(expr, var, lo, hi)
+
+    # Prefer critical points of the requested kind (f'' sign)
+    wanted = [c for c in critical if (curv_at(c) < 0) == maximize]
+    candidates = wanted or critical
+    if interval is not None:
+        candidates = candidates + [lo, hi]
+
+    values = [(f_at(c), c) for c in candidates]
+    values = [(v, c) for v, c in values if np.isfinite(v)]
+    if not values:
+        raise ValueError("No critical points found")
+
+    value, x = max(values) if maximize else min(values)
+    return {
+        "x": x,
+        "value": value,
+        "critical_points": critical,
+        "interval": (lo, hi)
+    }
+
+
+def format_number(value: float) -> str:
+    """
+    Short exact-looking form when the value is a simple fraction,
+    10 significant digits otherwise. inf / NaN (a point evaluation at
+    a pole, 0/0) read "undefined".
+    """
+    if not math.isfinite(value):
+        return "undefined"
+    fraction = Fraction(value).limit_denominator(100)
+    if abs(float(fraction) - value) <= 1e-10 * max(1.0, abs(value)):
+        return str(fraction)
+    return f"{value:.10g}"
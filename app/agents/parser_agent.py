@@ -1,5 +1,7 @@
 import re
 
+# Keyword -> operation. Order is priority: when a statement mentions
+# several keywords, the earliest entry here decides the operation.
 OPERATIONS = {
     "gradient": "gradient",
     "jacobian": "jacobian",
@@ -9,6 +11,10 @@ OPERATIONS = {
     "d/d": "derivative",
     "maximum": "optimization",
     "minimum": "optimization",
+    "maximize": "optimization",
+    "minimize": "optimization",
+    "maximise": "optimization",
+    "minimise": "optimization",
     "max": "optimization",
     "min": "optimization",
     "solve": "system"
@@ -25,13 +31,83 @@ TOPICS = {
     "optimization": "calculus"
 }
 
+# Words that only tell the topic (no solver operation)
+_TOPIC_WORDS = [k for k in TOPICS if k not in OPERATIONS.values()]
+
+# Which extremum an optimization keyword asks for: "max" or "min"
+_EXTREMA = {word: word[:3] for word, op in OPERATIONS.items() if op == "optimization"}
+
+_PRIORITY = {key: rank for rank, key in enumerate(OPERATIONS)}
+
+
+def _keyword_pattern(words) -> str:
+    # Longest first so "maximum" is never cut to "max"; whole words
+    # only, so "min" does not match inside "determine". "d/d" is
+    # followed by its variable ("d/dx"), so it has no right boundary.
+    # The first-letter lookahead skips most positions cheaply.
+    alternatives = [
+        re.escape(w) + (r"(?![a-z])" if w[-1].isalpha() and "/" not in w else "")
+        for w in sorted(words, key=len, reverse=True)
+    ]
+    first = "".join(sorted({w[0] for w in words}))
+    return r"\b(?=[" + first + "])(?:" + "|".join(alternatives) + ")"
+
+
+_KEYWORDS = re.compile(_keyword_pattern(list(OPERATIONS) + _TOPIC_WORDS))
+
+_NEEDS_NORMALIZING = re.compile(r"[\r\n\t]|  ")
+_WHITESPACE = re.compile(r"[ \t]+")
+_NEWLINES = re.compile(r"\n+")
+_SUBPROBLEM_SPLIT = re.compile(r"\n|\. (?=[A-Z]|find|solve|max|min)")
+
+_DELIMITERS = re.compile(r"[()\[\]{},;]| and ")
+
+_FUNCTION_NAMES = r"(?:sin|cos|tan|cot|sec|csc|exp|log|ln|sqrt)\b"
+
+# Leading prose before an equation ("Solve", "Find the derivative of",
+# "d/dx of", "a function"), keeping function names that may start the
+# maths ("sin x + y = 1"). "a" / "an" only go when a word follows, so
+# the variable in "a + b = 3" stays.
+_PROSE = re.compile(
+    r"^(?:(?:d/d[a-z]"
+    rf"|an?(?=\s+(?!{_FUNCTION_NAMES})[A-Za-z]{{2,}}\s)"
+    rf"|(?!{_FUNCTION_NAMES})[A-Za-z]{{2,}})\s+)+"
+)
+
+# Prose joined to the maths by a connective, up to the last one:
+# "with respect to x of y = ...", "What is x if 2x + 7 = 15"
+_LEAD_IN = re.compile(r"^.*\b(?:of|if|that|given|where|when|let)\s+")
+
+# Trailing clause after a function body: "... on [0, 3]", "... at (1, 2)"
+_TRAILING_CLAUSE = re.compile(r"\s+(?:on|in|over|for|at|where|when|with)\b.*$")
+
+# Any other prose after the maths, from its first word: a word of three
+# letters or more that is not a function or Greek letter name, or a
+# short connective ("x^2 - 4x + 5 subject to a budget", "... if x > 0").
+# Products of two letters ("xy") stay.
+_TRAILING_PROSE = re.compile(
+    rf"\s+(?:(?!{_FUNCTION_NAMES}|(?:pi|theta|alpha|beta|gamma|phi|omega)\b)"
+    r"[A-Za-z]{3,}|as|if|is|to|of|by|or|so)\b.*$"
+)
+
+# Operations about one (possibly vector-valued) function, whose body
+# the solvers take as "expression"
+_SINGLE_FUNCTION = {"derivative", "optimization", "gradient", "jacobian", "hessian"}
+
+# Single-letter identifiers: x, y, z... but not letters of words, function
+# names as in f(x), or the d of d/dx
+_VARIABLE = re.compile(r"(?<![A-Za-z])[a-z](?![A-Za-z(/])")
+
 
 def _normalize_text(text: str) -> str:
     if not text:
         return ""
+    # Most input is already a single clean line
+    if not _NEEDS_NORMALIZING.search(text):
+        return text.strip()
     text = text.replace("\r", " ")
-    text = re.sub(r"\n+", "\n", text)
-    text = re.sub(r"[ \t]+", " ", text)
+    text = _NEWLINES.sub("\n", text)
+    text = _WHITESPACE.sub(" ", text)
     return text.strip()
 
 
@@ -39,16 +115,89 @@ def _split_into_subproblems(text: str) -> list[str]:
     """
     Splits multi-question input into atomic math problems.
     """
-    parts = re.split(r"\n|\. (?=[A-Z]|find|solve|max|min)", text)
+    parts = _SUBPROBLEM_SPLIT.split(text)
     return [p.strip() for p in parts if len(p.strip()) > 3]
 
 
+def _split_top_level(text: str) -> list[str]:
+    """
+    Splits on , ; and " and " outside brackets, so f(x, y) and
+    [a, b] stay whole.
+    """
+    parts, depth, start = [], 0, 0
+
+    for match in _DELIMITERS.finditer(text):
+        token = match.group(0)
+        if token in "([{":
+            depth += 1
+        elif token in ")]}":
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            parts.append(text[start:match.start()])
+            start = match.end()
+
+    parts.append(text[start:])
+    return parts
+
+
+def _extract_equations(text: str) -> list[str]:
+    """
+    Every "lhs = rhs" in the statement with the surrounding prose and
+    trailing clauses removed: "Solve x + y = 3, x - y = 1" ->
+    ["x + y = 3", "x - y = 1"]; "Find the maximum of a function
+    g(t) = 4t - t^2 on [0, 3]" -> ["g(t) = 4t - t^2"].
+    """
+    if "=" not in text:
+        return []
+
+    equations = []
+    for part in _split_top_level(text):
+        lhs, _, rhs = part.rsplit(":", 1)[-1].partition("=")
+        # The clause goes first: "for 0 <= x <= 3" is not an equation
+        rhs = _TRAILING_CLAUSE.sub("", rhs.strip())
+        rhs = _TRAILING_PROSE.sub("", rhs).rstrip(" .?")
+        if not rhs or "=" in rhs or lhs.rstrip().endswith(("<", ">", "!")):
+            continue
+        lhs = _PROSE.sub("", _LEAD_IN.sub("", lhs.strip()))
+        if lhs:
+            equations.append(f"{lhs} = {rhs}")
+
+    return equations
+
+
+def _function_body(operation, equations: list[str]):
+    """
+    The expression a single-function problem is about: the right-hand
+    side of its first equation. None for other operations, including
+    none ("What is x if 2x + 7 = 15").
+    """
+    if not equations or operation not in _SINGLE_FUNCTION:
+        return None
+    return equations[0].split(" = ", 1)[1]
+
+
 def _detect_operation(text: str):
-    text_l = text.lower()
-    for key, op in OPERATIONS.items():
-        if key in text_l:
-            return op
-    return None
+    """
+    Returns (operation, topic, extremum) from one scan for keywords.
+    extremum is "max" or "min" for optimization, from the first of its
+    keywords in the text ("the minimum ... a maximum budget" is "min"),
+    else None.
+    """
+    operation, topic, extremum, rank = None, None, None, len(_PRIORITY)
+
+    for match in _KEYWORDS.finditer(text.lower()):
+        word = match.group(0)
+        if word in _PRIORITY:
+            if _PRIORITY[word] < rank:
+                operation, rank = OPERATIONS[word], _PRIORITY[word]
+            if extremum is None:
+                extremum = _EXTREMA.get(word)
+        elif topic is None:
+            topic = TOPICS[word]
+
+    if operation != "optimization":
+        extremum = None
+    return operation, TOPICS.get(operation) or topic or "unknown", extremum
 
 
 def parse_problem(raw_text: str) -> dict:
@@ -58,16 +207,25 @@ def parse_problem(raw_text: str) -> dict:
     parsed_items = []
 
     for sub in subproblems:
-        operation = _detect_operation(sub)
-        topic = TOPICS.get(operation, "unknown")
+        operation, topic, extremum = _detect_operation(sub)
+        equations = _extract_equations(sub)
 
-        variables = sorted(set(re.findall(r"[a-zA-Z]", sub)))
+        # Variables come from the maths, not the prose; without an
+        # equation the article "a" is the one single letter to skip.
+        # e is Euler's number, as the solvers read it.
+        if equations:
+            variables = set(_VARIABLE.findall(" ".join(equations))) - {"e"}
+        else:
+            variables = set(_VARIABLE.findall(sub)) - {"a", "e"}
 
         parsed_items.append({
             "problem_text": sub,
             "operation": operation,
             "topic": topic,
-            "variables": variables,
+            "variables": sorted(variables),
+            "equations": equations,
+            "expression": _function_body(operation, equations),
+            "extremum": extremum,
             "needs_clarification": False,
             "parser_metadata": {
                 "auto_detected": operation is not None
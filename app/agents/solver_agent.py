@@ -1,81 +1,146 @@
-from app.rag.retriever import retrieve_context
+from app.rag.retriever import (
+    kb_snapshot,
+    retrieve_context,
+    retrieve_context_batch
+)
+from app.memory.memory_store import memory_generation
 from app.memory.similarity import find_similar_problem
 from app.agents.gemini_solver_agent import solve_with_gemini  # fallback only
-
-import sympy as sp
-import re
-
-from sympy.parsing.sympy_parser import (
-    parse_expr,
-    standard_transformations,
-    implicit_multiplication_application
+from app.config import (
+    SOLVER_CONCURRENCY,
+    KB_ACCEPT_SCORE,
+    KB_HINT_SCORE,
+    SOLVE_CACHE_SIZE,
+    SOLVE_CACHE_TTL,
+    SOLVE_CACHE_PATH,
+    SOLVE_CACHE_SHARED_SIZE
 )
+from app.agents import symbolic
+from app.utils.cache import LRUCache, SQLiteCache, TieredCache
+from app.utils.embeddings import encode
+from app.utils.executors import solver_pool, symbolic_pool
+
+import copy
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
 
 # ─────────────────────────────────────────────
-# Parsing utilities
+# Result helpers
 # ─────────────────────────────────────────────
 
-TRANSFORMATIONS = standard_transformations + (
-    implicit_multiplication_application,
-)
-
-
-def _parse_expr(expr_text: str):
-    return parse_expr(expr_text.replace("^", "**"), transformations=TRANSFORMATIONS)
-
+def _answer(text: str, latex: str = ""):
+    return {"text": text, "latex": latex}
 
-def _extract_rhs_expression(text: str):
-    match = re.search(r"=\s*(.+)", text)
-    if not match:
-        raise ValueError("No '=' found in expression")
-    return _parse_expr(match.group(1))
 
+def _kb_result(problem_text: str, top: dict, confidence: str) -> dict:
+    return {
+        "question": problem_text,
+        "final_answer": _answer(top.get("answer") or "Answer not found"),
+        "explanation": top.get("explanation"),
+        "kb_score": round(top["score"], 4),
+        "confidence": confidence,
+        "source": {
+            "answer": "knowledge_base",
+            "explanation": top.get("source")
+        }
+    }
 
-def _first_symbol(expr):
-    vars_ = sorted(expr.free_symbols, key=lambda s: s.name)
-    if not vars_:
-        raise ValueError("No variable found")
-    return vars_[0]
 
+# ─────────────────────────────────────────────
+# SYMBOLIC STAGE (SANDBOXED)
+# ─────────────────────────────────────────────
 
-def _answer(text: str, latex: str = ""):
-    return {"text": text, "latex": latex}
+# Latest memo-cache counters reported by each symbolic worker (by pid)
+_worker_cache_stats = {}
+
+
+def _run_symbolic(route: str, problem_text: str, equations=None,
+                  expression=None, extremum=None) -> dict | None:
+    if route not in symbolic.ROUTES:
+        return None
+
+    # Optimization switches to the numeric engine inside the worker
+    # (see symbolic.solve_symbolic); the pool's budget only stops
+    # runaway tasks.
+    pool = symbolic_pool()
+    if pool is None:
+        pid, solved, stats = symbolic.worker_task(
+            route, problem_text, "auto", equations, expression, extremum
+        )
+    else:
+        pid, solved, stats = pool.run(
+            symbolic.worker_task, route, problem_text, "auto", equations, expression,
+            extremum
+        )
+
+    _worker_cache_stats[pid] = stats
+    return solved
+
+
+def symbolic_cache_stats() -> dict:
+    """
+    SymPy memo-cache counters summed over every symbolic worker.
+    """
+    totals = {}
+    for stats in list(_worker_cache_stats.values()):
+        for name, cache in stats.items():
+            if name == "hit_rate":
+                continue
+            total = totals.setdefault(name, {"entries": 0, "hits": 0, "misses": 0, "evictions": 0})
+            for field in total:
+                total[field] += cache[field]
+
+    for total in totals.values():
+        lookups = total["hits"] + total["misses"]
+        total["hit_rate"] = round(total["hits"] / lookups, 4) if lookups else 0.0
+
+    hits = sum(t["hits"] for t in totals.values())
+    lookups = hits + sum(t["misses"] for t in totals.values())
+    totals["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+    totals["workers"] = len(_worker_cache_stats)
+    return totals
 
 
 # ─────────────────────────────────────────────
 # SOLVE A SINGLE SUB-PROBLEM
 # ─────────────────────────────────────────────
 
-def _solve_single(subproblem: dict) -> dict:
+def _solve_single(subproblem: dict, kb_results=None, query_embedding=None, use_cache: bool = True) -> dict:
+    """
+    `kb_results` and `query_embedding` may be precomputed by the
+    batched retrieval in solve_problem; otherwise they are fetched here.
+    `use_cache=False` skips cached LLM responses.
+    """
     problem_text = subproblem["problem_text"]
     route = subproblem.get("route")
 
     # ==========================================================
     # 1️⃣ KNOWLEDGE BASE (ANSWER + EXPLANATION)
     # ==========================================================
-    try:
-        kb_results = retrieve_context(problem_text)
-    except Exception:
-        kb_results = []
+    if kb_results is None:
+        try:
+            kb_results = retrieve_context(problem_text)
+        except Exception:
+            kb_results = []
 
-    if kb_results:
-        top = kb_results[0]
+    # The index always returns top_k hits; only a relevant one may
+    # short-circuit the pipeline.
+    top = kb_results[0] if kb_results else None
+    kb_score = top["score"] if top else 0.0
 
-        return {
-            "question": problem_text,
-            "final_answer": _answer(top.get("answer") or "Answer not found"),
-            "explanation": top.get("explanation"),
-            "source": {
-                "answer": top.get("KB"),
-                "explanation": top.get("source")
-            }
-        }
+    if top and kb_score >= KB_ACCEPT_SCORE:
+        return _kb_result(problem_text, top, "high")
 
     # ==========================================================
     # 2️⃣ MEMORY STORE
     # ==========================================================
     try:
-        memory_match = find_similar_problem(problem_text)
+        memory_match = find_similar_problem(
+            problem_text, query_embedding=query_embedding
+        )
     except Exception:
         memory_match = None
 
@@ -90,91 +155,39 @@ def _solve_single(subproblem: dict) -> dict:
             }
         }
 
-    text = problem_text.lower()
-
     # ==========================================================
     # 3️⃣ SYMBOLIC SOLVERS
     # ==========================================================
+    # Runs under a time / memory budget; an overrun or a failure
+    # falls through to the next stage.
     try:
-        # ───────── DERIVATIVE
-        if route == "quant_derivative":
-            expr = _extract_rhs_expression(text)
-            var = _first_symbol(expr)
-            d = sp.diff(expr, var)
-
-            m = re.search(r"\((\-?\d+)\)", text)
-            if m:
-                d = d.subs(var, int(m.group(1)))
-
-            return {
-                "question": problem_text,
-                "final_answer": _answer(str(d), sp.latex(d)),
-                "explanation": (
-                    "Differentiate the given function symbolically with respect "
-                    f"to {var}. If a value is specified, substitute it after differentiation."
-                ),
-                "source": {
-                    "answer": "symbolic_solver",
-                    "explanation": "symbolic_solver"
-                }
-            }
-
-        # ───────── SYSTEM OF EQUATIONS
-        if route == "quant_system":
-            eqs = re.findall(
-                r"([a-zA-Z0-9+\-*/ ]+=+[a-zA-Z0-9+\-*/ ]+)",
-                problem_text
-            )
-            sym_eqs = [sp.Eq(*map(_parse_expr, e.split("="))) for e in eqs]
-            vars_ = sorted(
-                set().union(*[e.free_symbols for e in sym_eqs]),
-                key=lambda s: s.name
-            )
-            sol = sp.solve(sym_eqs, vars_, dict=True)
-
-            return {
-                "question": problem_text,
-                "final_answer": _answer(str(sol)),
-                "explanation": (
-                    "The system of equations is converted into symbolic form. "
-                    "Common variables are identified and solved simultaneously."
-                ),
-                "source": {
-                    "answer": "symbolic_solver",
-                    "explanation": "symbolic_solver"
-                }
-            }
+        solved = _run_symbolic(
+            route, problem_text,
+            subproblem.get("equations"), subproblem.get("expression"),
+            subproblem.get("extremum")
+        )
+    except Exception:
+        solved = None
 
-        # ───────── OPTIMIZATION
-        if route == "quant_optimization":
-            expr = _extract_rhs_expression(text)
-            var = _first_symbol(expr)
-            d = sp.diff(expr, var)
-            critical = sp.solve(d, var)
-            values = [expr.subs(var, c) for c in critical]
-
-            result = max(values) if "max" in text else min(values)
-
-            return {
-                "question": problem_text,
-                "final_answer": _answer(str(result)),
-                "explanation": (
-                    "Critical points are obtained by setting the first derivative to zero. "
-                    "The function value is evaluated at these points to find extrema."
-                ),
-                "source": {
-                    "answer": "symbolic_solver",
-                    "explanation": "symbolic_solver"
-                }
+    if solved:
+        return {
+            "question": problem_text,
+            "final_answer": solved["final_answer"],
+            "explanation": solved["explanation"],
+            "source": {
+                "answer": "symbolic_solver",
+                "explanation": "symbolic_solver"
             }
+        }
 
-    except Exception:
-        pass
+    # A near KB match is cheaper than the LLM and usually as good
+    if top and kb_score >= KB_HINT_SCORE:
+        return _kb_result(problem_text, top, "low")
 
     # ==========================================================
     # 4️⃣ LLM FALLBACK (LAST RESORT)
     # ==========================================================
-    llm = solve_with_gemini(problem_text)
+    llm = solve_with_gemini(problem_text, use_cache)
 
     return {
         "question": problem_text,
@@ -187,21 +200,218 @@ def _solve_single(subproblem: dict) -> dict:
     }
 
 
+# ─────────────────────────────────────────────
+# RESULT CACHE
+# ─────────────────────────────────────────────
+
+_solve_cache = None
+_solve_cache_lock = threading.Lock()
+
+
+def solve_cache() -> TieredCache:
+    global _solve_cache
+    if _solve_cache is None:
+        with _solve_cache_lock:
+            if _solve_cache is None:
+                shared = None
+                if SOLVE_CACHE_PATH:
+                    shared = SQLiteCache(
+                        SOLVE_CACHE_PATH, "solve_results",
+                        SOLVE_CACHE_SHARED_SIZE, SOLVE_CACHE_TTL
+                    )
+                _solve_cache = TieredCache(
+                    LRUCache(SOLVE_CACHE_SIZE, SOLVE_CACHE_TTL), shared
+                )
+    return _solve_cache
+
+
+def normalize_problem_text(text: str) -> str:
+    return " ".join(text.lower().split()).rstrip(" .?!")
+
+
+def _cache_key(sub: dict, kb_version, generation: int) -> str:
+    """
+    Content address of a sub-problem result. The KB version and memory
+    generation are part of the key, so a new index or new feedback
+    simply stops matching older entries.
+    """
+    material = json.dumps([
+        normalize_problem_text(sub.get("problem_text", "")),
+        sub.get("route"),
+        kb_version,
+        generation
+    ])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def solve_cache_stats() -> dict:
+    if SOLVE_CACHE_SIZE <= 0:
+        return {"enabled": False}
+    return dict(solve_cache().stats(), enabled=True)
+
+
 # ─────────────────────────────────────────────
 # MAIN ENTRY — MULTI-PROBLEM EXECUTION
 # ─────────────────────────────────────────────
 
-def solve_problem(parsed_payload: dict) -> dict:
-    results = []
+def _retrieve_batch(subproblems: list[dict], snapshot):
+    """
+    Embeds every sub-problem in one forward pass and searches the KB
+    once. The same embeddings are reused for the memory lookup.
+    """
+    queries = [sub["problem_text"] for sub in subproblems]
+    if not queries:
+        return [], []
+
+    try:
+        embeddings = encode(queries)
+    except Exception:
+        return [[] for _ in queries], [None] * len(queries)
+
+    try:
+        kb_batch = retrieve_context_batch(
+            queries, query_embeddings=embeddings, snapshot=snapshot
+        )
+    except Exception:
+        kb_batch = [[] for _ in queries]
 
+    return kb_batch, list(embeddings)
+
+
+def _solve_item(sub: dict, kb_results=None, query_embedding=None, cache_key=None, use_cache: bool = True) -> dict:
+    """
+    Solves one sub-problem, isolating failures and recording timing.
+    Successful results are stored under `cache_key` when given.
+    """
+    start = time.perf_counter()
+
+    try:
+        solved = _solve_single(sub, kb_results, query_embedding, use_cache)
+    except Exception as e:
+        solved = {
+            "question": sub.get("problem_text", ""),
+            "final_answer": _answer("Unable to solve this problem."),
+            "explanation": None,
+            "error": str(e),
+            "source": {
+                "answer": "error",
+                "explanation": "error"
+            }
+        }
+
+    # Callers decorate results in place; the cache keeps its own copy
+    if cache_key is not None and "error" not in solved:
+        solve_cache().set(cache_key, copy.deepcopy(solved))
+
+    solved["timing_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return solved
+
+
+def _cached_item(cached: dict) -> dict:
+    return dict(copy.deepcopy(cached), cached=True, timing_ms=0.0)
+
+
+def iter_solve(parsed_payload: dict, concurrency: int = SOLVER_CONCURRENCY, use_cache: bool = True):
+    """
+    Solves every sub-problem and yields events as soon as each is
+    ready, in completion order:
+
+        {"event": "start", "total_problems", "kb_index_version"}
+        {"event": "result", "index", "result"}      once per sub-problem
+        {"event": "done", "retrieval_ms", "cache_hits"}
+
+    Cache hits are yielded before any retrieval or solving starts.
+    With use_cache=False nothing is read from the solve-result or LLM
+    caches; fresh results still replace the cached ones.
+    """
     from app.agents.intent_router import route_intent
+    from app.agents.parser_agent import _detect_operation
 
-    for sub in parsed_payload.get("subproblems", []):
+    subproblems = parsed_payload.get("subproblems", [])
+    for sub in subproblems:
         sub["route"] = route_intent(sub)
-        solved = _solve_single(sub)
-        results.append(solved)
+        # Payloads parsed before "extremum" existed
+        if sub["route"] == "quant_optimization" and not sub.get("extremum"):
+            sub["extremum"] = _detect_operation(sub.get("problem_text", ""))[2]
 
-    return {
-        "total_problems": len(results),
-        "results": results
+    # Pin one index version for the whole request
+    snapshot = kb_snapshot()
+
+    yield {
+        "event": "start",
+        "total_problems": len(subproblems),
+        "kb_index_version": snapshot.version
     }
+
+    keys = [None] * len(subproblems)
+    pending = list(range(len(subproblems)))
+    if SOLVE_CACHE_SIZE > 0:
+        generation = memory_generation()
+        pending = []
+        for i, sub in enumerate(subproblems):
+            keys[i] = _cache_key(sub, snapshot.version, generation)
+            cached = solve_cache().get(keys[i]) if use_cache else None
+            if cached is None:
+                pending.append(i)
+            else:
+                yield {"event": "result", "index": i, "result": _cached_item(cached)}
+
+    # Only cache misses are embedded, searched and solved
+    retrieval_start = time.perf_counter()
+    kb_batch, embeddings = _retrieve_batch(
+        [subproblems[i] for i in pending], snapshot
+    )
+    retrieval_ms = round((time.perf_counter() - retrieval_start) * 1000, 2)
+    items = [
+        (i, (subproblems[i], kb, emb, keys[i], use_cache))
+        for i, kb, emb in zip(pending, kb_batch, embeddings)
+    ]
+
+    # Single problem: no point paying the hand-off to the pool
+    if len(items) <= 1 or concurrency <= 1:
+        for i, item in items:
+            yield {"event": "result", "index": i, "result": _solve_item(*item)}
+    else:
+        # Fan out with at most `concurrency` in flight for this
+        # request, topping up as each one finishes.
+        queued = iter(items)
+        running = {}
+
+        def submit_next():
+            for i, item in queued:
+                running[solver_pool().submit(_solve_item, *item)] = i
+                return
+
+        for _ in range(concurrency):
+            submit_next()
+
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                submit_next()
+                yield {"event": "result", "index": i, "result": future.result()}
+
+    yield {
+        "event": "done",
+        "retrieval_ms": retrieval_ms,
+        "cache_hits": len(subproblems) - len(pending)
+    }
+
+
+def solve_problem(parsed_payload: dict, concurrency: int = SOLVER_CONCURRENCY, use_cache: bool = True) -> dict:
+    """
+    Blocking form of iter_solve: every result, in the original order.
+    """
+    response = {}
+    results = []
+
+    for event in iter_solve(parsed_payload, concurrency, use_cache):
+        kind = event.pop("event")
+        if kind == "result":
+            results.append((event["index"], event["result"]))
+        else:
+            response.update(event)
+
+    response["results"] = [result for _, result in sorted(results, key=lambda r: r[0])]
+    return response
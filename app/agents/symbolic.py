@@ -0,0 +1,485 @@
+"""
+Symbolic solvers and the memoized SymPy operations they share.
+Imported by the sandboxed symbolic workers (see solver_agent).
+
+Parsing is keyed on the whitespace-normalized source text. Everything
+downstream is keyed on the parsed expression itself: SymPy builds
+expressions in canonical form and hashes them structurally, so
+`x^2+3x` and `3x + x**2` land on the same diff / solve / latex entries.
+"""
+
+import os
+import re
+import signal
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import sympy as sp
+
+from app.agents import numeric
+from app.agents.sympy_parsing import parse_source, to_source
+from app.config import SYMPY_CACHE_SIZE, NUMERIC_SWITCH_AFTER
+from app.utils.cache import LRUCache
+
+_caches = {
+    name: LRUCache(SYMPY_CACHE_SIZE)
+    for name in ("parse", "diff", "solve", "latex", "matrix", "lambdify")
+}
+
+
+def _memo(name: str, key, compute):
+    cache = _caches[name]
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value)
+    return value
+
+
+def parse(expr_text: str):
+    source = to_source(expr_text)
+    return _memo("parse", source, lambda: parse_source(source))
+
+
+def diff(expr, var):
+    return _memo("diff", (expr, var), lambda: sp.diff(expr, var))
+
+
+def solve(equations, variables, **kwargs):
+    """
+    sp.solve with a memoized result. Results are shared between
+    callers: treat them as read-only.
+    """
+    key = (
+        tuple(equations) if isinstance(equations, list) else equations,
+        tuple(variables) if isinstance(variables, list) else variables,
+        tuple(sorted(kwargs.items()))
+    )
+    return _memo("solve", key, lambda: sp.solve(equations, variables, **kwargs))
+
+
+def latex(expr) -> str:
+    return _memo("latex", expr, lambda: sp.latex(expr))
+
+
+def derivative_matrix(kind: str, exprs: tuple, variables: tuple) -> sp.ImmutableMatrix:
+    """
+    "gradient" (1 x n), "jacobian" (m x n) or "hessian" (n x n) of
+    `exprs` with respect to `variables`, built once per function.
+    """
+    def build():
+        if kind == "gradient":
+            rows = [[diff(exprs[0], v) for v in variables]]
+        elif kind == "jacobian":
+            rows = [[diff(e, v) for v in variables] for e in exprs]
+        elif kind == "hessian":
+            first = [diff(exprs[0], v) for v in variables]
+            rows = [[diff(d, v) for v in variables] for d in first]
+        else:
+            raise ValueError(f"Unknown derivative matrix: {kind}")
+        return sp.ImmutableMatrix(rows)
+
+    return _memo("matrix", (kind, exprs, variables), build)
+
+
+def compiled_matrix(matrix: sp.ImmutableMatrix, variables: tuple):
+    """
+    NumPy evaluator for a symbolic matrix: takes an (n, len(variables))
+    array of points and returns (n, rows, cols) in one vectorized call.
+    """
+    def build():
+        fn = sp.lambdify(variables, list(matrix), "numpy")
+        shape = matrix.shape
+
+        def evaluate(points):
+            points = np.atleast_2d(np.asarray(points, dtype=float))
+            with np.errstate(all="ignore"):
+                # Constant entries come back as scalars: broadcast them
+                entries = [
+                    np.broadcast_to(np.asarray(v, dtype=float), (len(points),))
+                    for v in fn(*points.T)
+                ]
+            return np.stack(entries, axis=1).reshape(len(points), *shape)
+
+        return evaluate
+
+    return _memo("lambdify", (matrix, variables), build)
+
+
+# ─────────────────────────────────────────────
+# Solvers (run inside the sandboxed symbolic workers)
+# ─────────────────────────────────────────────
+
+MATRIX_ROUTES = {
+    "quant_gradient": "gradient",
+    "quant_jacobian": "jacobian",
+    "quant_hessian": "hessian"
+}
+
+ROUTES = ("quant_derivative", "quant_system", "quant_optimization", *MATRIX_ROUTES)
+
+
+class _PastSoftDeadline(BaseException):
+    """
+    Raised into symbolic solving when it runs past its soft deadline.
+    Not an Exception, so SymPy's own `except Exception` cannot swallow it.
+    """
+
+
+@contextmanager
+def _soft_deadline(seconds: float):
+    """
+    Interrupts the block with _PastSoftDeadline after `seconds`. Needs
+    SIGALRM and the main thread, as in a sandbox worker; elsewhere (or
+    with seconds <= 0) the block runs to completion.
+    """
+    if (seconds <= 0 or not hasattr(signal, "setitimer")
+            or threading.current_thread() is not threading.main_thread()):
+        yield
+        return
+
+    def interrupt(signum, frame):
+        raise _PastSoftDeadline()
+
+    previous = signal.signal(signal.SIGALRM, interrupt)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def _extract_rhs_expression(text: str):
+    match = re.search(r"=\s*(.+)", text)
+    if not match:
+        raise ValueError("No '=' found in expression")
+    return parse(match.group(1))
+
+
+_RESPECT_TO = re.compile(r"\bd/d([a-z])\b|\bwith respect to ([a-z])\b")
+
+
+def _function_variable(expr, text: str, equation: str | None = None):
+    """
+    The variable of a one-variable function: declared as in "f(x) =",
+    named as in "d/dx" or "with respect to x", else the expression's
+    only free symbol (x when there are several).
+    """
+    declared = _DECLARED_ARGS.search((equation or text).split("=", 1)[0])
+    if declared:
+        return sp.Symbol(declared.group(1).split(",")[0].strip())
+
+    named = _RESPECT_TO.search(text)
+    if named:
+        return sp.Symbol(named.group(1) or named.group(2))
+
+    free = {s.name: s for s in expr.free_symbols}
+    if len(free) == 1:
+        return next(iter(free.values()))
+    if "x" in free:
+        return free["x"]
+    if not free:
+        raise ValueError("No variable found")
+    raise ValueError(f"Ambiguous variable among {sorted(free)}")
+
+
+def _answer(text: str, latex: str = ""):
+    return {"text": text, "latex": latex}
+
+
+_POINTS = re.compile(r"\s*\bat\s+((?:\(\s*[^()]*\)\s*(?:,|and)?\s*)+)")
+_TUPLE = re.compile(r"\(([^()]*)\)")
+_DECLARED_ARGS = re.compile(r"\b[a-z]\w*\s*\(\s*([a-z]\w*(?:\s*,\s*[a-z]\w*)*)\s*\)\s*$")
+
+
+def _extract_points(text: str):
+    """
+    Evaluation points after "at": "at (1, 2)", "at (0, 0) and (1, -1)".
+    Returns (list of coordinate tuples, text without them).
+    """
+    match = _POINTS.search(text)
+    if not match:
+        return [], text
+
+    points = [
+        tuple(numeric.parse_number(c) for c in group.split(","))
+        for group in _TUPLE.findall(match.group(1))
+    ]
+    return points, text[:match.start()] + text[match.end():]
+
+
+def _split_components(rhs: str) -> list[str]:
+    """
+    "[x*y, x + f(y, 2)]" -> ["x*y", "x + f(y, 2)"]; a scalar stays whole.
+    """
+    rhs = rhs.strip().rstrip(".")
+    if not (rhs[:1] in "[(" and rhs[-1:] in "])"):
+        return [rhs]
+
+    parts, depth, start = [], 0, 1
+    for i, ch in enumerate(rhs[1:-1], start=1):
+        if ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(rhs[start:i])
+            start = i + 1
+    parts.append(rhs[start:-1])
+
+    return parts if len(parts) > 1 else [rhs]
+
+
+def _function_spec(text: str, equation: str | None = None):
+    """
+    Components, variables and evaluation points of
+    "f(x, y) = [x^2 y, sin(y)] at (1, 2)". Variables come from the
+    declaration f(x, y) when present, otherwise from the expression.
+    The function is read from `equation` (the parser's) when given;
+    points always come from the text.
+    """
+    points, text = _extract_points(text)
+    source = equation or text
+    if "=" not in source:
+        raise ValueError("No '=' found in expression")
+    lhs, rhs = source.split("=", 1)
+
+    exprs = tuple(parse(c) for c in _split_components(rhs))
+
+    declared = _DECLARED_ARGS.search(lhs)
+    if declared:
+        variables = tuple(sp.Symbol(v.strip()) for v in declared.group(1).split(","))
+    else:
+        variables = tuple(sorted(
+            set().union(*(e.free_symbols for e in exprs)), key=lambda s: s.name
+        ))
+
+    if not variables:
+        raise ValueError("No variable found")
+    for point in points:
+        if len(point) != len(variables):
+            raise ValueError(
+                f"Point {point} does not match variables {variables}"
+            )
+
+    return exprs, variables, points
+
+
+def _format_values(kind: str, values) -> str:
+    if kind == "gradient":
+        return "(" + ", ".join(numeric.format_number(v) for v in values.ravel()) + ")"
+    return "[" + ", ".join(
+        "[" + ", ".join(numeric.format_number(v) for v in row) + "]" for row in values
+    ) + "]"
+
+
+def _format_point(point) -> str:
+    return "(" + ", ".join(numeric.format_number(c) for c in point) + ")"
+
+
+_MATRIX_EXPLANATIONS = {
+    "gradient": "The gradient collects the partial derivatives of the function "
+                "with respect to each variable ({vars}).",
+    "jacobian": "Each row of the Jacobian holds the partial derivatives of one "
+                "component with respect to {vars}.",
+    "hessian": "The Hessian is the matrix of second-order partial derivatives "
+               "with respect to {vars}."
+}
+
+
+def _solve_matrix(kind: str, text: str, equation: str | None = None) -> dict:
+    exprs, variables, points = _function_spec(text, equation)
+    if kind != "jacobian" and len(exprs) != 1:
+        raise ValueError(f"The {kind} needs a scalar function")
+
+    matrix = derivative_matrix(kind, exprs, variables)
+    symbolic_text = (
+        str(tuple(matrix)) if kind == "gradient" else str(matrix.tolist())
+    )
+    explanation = _MATRIX_EXPLANATIONS[kind].format(
+        vars=", ".join(v.name for v in variables)
+    )
+
+    if not points:
+        return {
+            "final_answer": _answer(symbolic_text, latex(matrix)),
+            "explanation": explanation
+        }
+
+    # All points in one vectorized call
+    values = compiled_matrix(matrix, variables)(points)
+
+    if len(points) == 1:
+        answer = _answer(
+            _format_values(kind, values[0]),
+            latex(matrix) + r"\Big|_{" + _format_point(points[0]) + "}"
+        )
+    else:
+        answer = _answer(
+            "; ".join(
+                f"at {_format_point(p)}: {_format_values(kind, v)}"
+                for p, v in zip(points, values)
+            ),
+            latex(matrix)
+        )
+
+    return {
+        "final_answer": answer,
+        "explanation": (
+            f"{explanation} It equals {symbolic_text} and is then evaluated "
+            "at the given point" + ("s." if len(points) > 1 else ".")
+        )
+    }
+
+
+def _optimize_symbolic(expr, var, maximize: bool, interval=None) -> dict:
+    d = diff(expr, var)
+    critical = [c for c in solve(d, var) if c.is_real is not False]
+    if interval is not None:
+        lo, hi = interval
+        critical = [c for c in critical if lo <= float(c) <= hi]
+
+    values = [expr.subs(var, c) for c in critical]
+    if interval is not None:
+        # Bounds were parsed as floats; recover 2*pi rather than 6.283...
+        values += [expr.subs(var, sp.nsimplify(bound, [sp.pi])) for bound in interval]
+    if not values:
+        raise ValueError("No real critical points")
+
+    result = max(values) if maximize else min(values)
+
+    return {
+        "final_answer": _answer(str(result)),
+        "explanation": (
+            "Critical points are obtained by setting the first derivative to zero. "
+            "The function value is evaluated at these points to find extrema."
+        )
+    }
+
+
+def _optimize_numeric(expr, var, maximize: bool, interval=None) -> dict:
+    found = numeric.optimize(expr, var, maximize, interval)
+    lo, hi = found["interval"]
+
+    return {
+        "final_answer": _answer(numeric.format_number(found["value"])),
+        "explanation": (
+            f"The derivative is sampled on [{lo:g}, {hi:g}] and each sign change "
+            "is refined with Newton's method to locate the critical points. "
+            f"The {'maximum' if maximize else 'minimum'} value, "
+            f"attained at {var} ≈ {found['x']:.6g}, is a numerical approximation."
+        )
+    }
+
+
+def solve_symbolic(route: str, problem_text: str, method: str = "auto",
+                   equations=None, expression=None, extremum=None) -> dict | None:
+    """
+    Returns {"final_answer", "explanation"} for the symbolic routes,
+    None for any other route. Raises when the problem cannot be solved.
+
+    For optimization, `method` picks the engine: "symbolic", "numeric",
+    or "auto" (symbolic, numeric when there is no closed form or when
+    symbolic runs past NUMERIC_SWITCH_AFTER; the switch happens in the
+    same call, so the worker is not killed for it).
+    `equations` and `expression` (the function body) come from the
+    parser; the text is only scanned for them when they are missing.
+    `extremum` ("max" / "min", also the parser's) is required for
+    optimization.
+    """
+    text = problem_text.lower()
+    if expression:
+        expression = expression.lower()
+    equation = equations[0].lower() if equations else None
+
+    # ───────── DERIVATIVE
+    if route == "quant_derivative":
+        expr = parse(expression) if expression else _extract_rhs_expression(text)
+        var = _function_variable(expr, text, equation)
+        d = diff(expr, var)
+
+        m = re.search(r"\((\-?\d+)\)", text)
+        if m:
+            d = d.subs(var, int(m.group(1)))
+
+        return {
+            "final_answer": _answer(str(d), latex(d)),
+            "explanation": (
+                "Differentiate the given function symbolically with respect "
+                f"to {var}. If a value is specified, substitute it after differentiation."
+            )
+        }
+
+    # ───────── SYSTEM OF EQUATIONS
+    if route == "quant_system":
+        # Equations pre-extracted by the parser, when available
+        eqs = equations or re.findall(
+            r"([a-zA-Z0-9+\-*/ ]+=+[a-zA-Z0-9+\-*/ ]+)",
+            problem_text
+        )
+        sym_eqs = [sp.Eq(*map(parse, e.split("="))) for e in eqs]
+        vars_ = sorted(
+            set().union(*[e.free_symbols for e in sym_eqs]),
+            key=lambda s: s.name
+        )
+        sol = solve(sym_eqs, vars_, dict=True)
+
+        return {
+            "final_answer": _answer(str(sol)),
+            "explanation": (
+                "The system of equations is converted into symbolic form. "
+                "Common variables are identified and solved simultaneously."
+            )
+        }
+
+    # ───────── OPTIMIZATION
+    if route == "quant_optimization":
+        interval, text = numeric.parse_interval(text)
+        expr = parse(expression) if expression else _extract_rhs_expression(text)
+        var = _function_variable(expr, text, equation)
+        if extremum not in ("max", "min"):
+            raise ValueError("Neither a maximum nor a minimum was asked for")
+        maximize = extremum == "max"
+
+        if method != "numeric":
+            try:
+                with _soft_deadline(NUMERIC_SWITCH_AFTER if method == "auto" else 0):
+                    return _optimize_symbolic(expr, var, maximize, interval)
+            except (NotImplementedError, TypeError, ValueError, _PastSoftDeadline):
+                # No closed form (e.g. transcendental derivative), or
+                # none found in time
+                if method == "symbolic":
+                    raise
+
+        return _optimize_numeric(expr, var, maximize, interval)
+
+    # ───────── GRADIENT / JACOBIAN / HESSIAN
+    if route in MATRIX_ROUTES:
+        return _solve_matrix(MATRIX_ROUTES[route], text, equation)
+
+    return None
+
+
+def worker_task(route: str, problem_text: str, method: str = "auto",
+                equations=None, expression=None, extremum=None):
+    """
+    Sandbox entry point: the result plus this worker's cache counters,
+    which the parent aggregates for /metrics.
+    """
+    solved = solve_symbolic(route, problem_text, method, equations, expression, extremum)
+    return os.getpid(), solved, cache_stats()
+
+
+def cache_stats() -> dict:
+    stats = {name: cache.stats() for name, cache in _caches.items()}
+    hits = sum(s["hits"] for s in stats.values())
+    lookups = hits + sum(s["misses"] for s in stats.values())
+    stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+    return stats
+
+
+def clear_caches():
+    for cache in _caches.values():
+        cache.clear()
@@ -0,0 +1,30 @@
+"""
+Text -> SymPy parsing shared by the symbolic and numeric engines, so
+both read "2x^2", "3π/2", "sin x" and "x e^(-x)" the same way.
+"""
+
+from sympy import E
+from sympy.parsing.sympy_parser import (
+    parse_expr,
+    standard_transformations,
+    implicit_multiplication_application
+)
+
+TRANSFORMATIONS = standard_transformations + (
+    implicit_multiplication_application,
+)
+
+# A standalone e is Euler's number, as in "x e^(-x)", not a variable
+LOCALS = {"e": E}
+
+
+def to_source(expr_text: str) -> str:
+    """
+    Python-syntax source for an expression as people type it:
+    ^ for powers, π for pi, any whitespace.
+    """
+    return " ".join(expr_text.replace("π", "pi").replace("^", "**").split())
+
+
+def parse_source(source: str):
+    return parse_expr(source, local_dict=dict(LOCALS), transformations=TRANSFORMATIONS)
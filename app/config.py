@@ -0,0 +1,176 @@
+import os
+
+# ─────────────────────────────────────────────
+# Embeddings
+# ─────────────────────────────────────────────
+EMBEDDING_MODEL_NAME = os.getenv(
+    "EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2"
+)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+
+# Load the embedding model in a background thread at startup instead of
+# on the first request that needs it.
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "1") == "1"
+
+# ─────────────────────────────────────────────
+# Executors (blocking work off the event loop)
+# ─────────────────────────────────────────────
+IO_POOL_WORKERS = int(os.getenv("IO_POOL_WORKERS", "8"))
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(os.cpu_count() or 2)))
+
+# Tasks allowed to be running or waiting per pool before requests get 503.
+IO_POOL_MAX_PENDING = int(os.getenv("IO_POOL_MAX_PENDING", "64"))
+CPU_POOL_MAX_PENDING = int(os.getenv("CPU_POOL_MAX_PENDING", "16"))
+
+# ─────────────────────────────────────────────
+# OCR
+# ─────────────────────────────────────────────
+# Uploads are downscaled so the page's long side (assumed
+# OCR_PAGE_INCHES, ~A4 / Letter) is at most OCR_TARGET_DPI.
+OCR_TARGET_DPI = int(os.getenv("OCR_TARGET_DPI", "300"))
+OCR_PAGE_INCHES = float(os.getenv("OCR_PAGE_INCHES", "11"))
+
+# Tesseract backend: "tesserocr" keeps one initialized engine per cpu
+# worker and passes pixels in memory; "pytesseract" runs the tesseract
+# binary per read; "auto" prefers tesserocr when it is installed.
+OCR_BACKEND = os.getenv("OCR_BACKEND", "auto")
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+OCR_TESSDATA = os.getenv("TESSDATA_PREFIX")
+
+# Start the cpu workers and load Tesseract at startup. Best-effort:
+# the pool decides which worker takes each warm-up task, so a worker
+# may still load on its first upload; failures are only logged.
+OCR_WARMUP = os.getenv("OCR_WARMUP", "1") == "1"
+
+# Mean word confidence (0-100) below which OCR text needs review.
+OCR_MIN_CONFIDENCE = float(os.getenv("OCR_MIN_CONFIDENCE", "60"))
+
+# Photos of the same page can reuse one OCR result: a 63-bit perceptual
+# hash of the binarized page, matched within OCR_DEDUP_MAX_DISTANCE
+# bits among the last OCR_DEDUP_SIZE pages (0, the default, disables).
+# The hash cannot see glyphs (same layout, other numbers), so a match
+# is served only after OCR_DEDUP_VERIFY_LINES of its lines (at least
+# one) are read again and give the same text. Lines not re-read are
+# trusted: a sheet differing in one of those still gets the old text.
+OCR_DEDUP_SIZE = int(os.getenv("OCR_DEDUP_SIZE", "0"))
+OCR_DEDUP_MAX_DISTANCE = int(os.getenv("OCR_DEDUP_MAX_DISTANCE", "8"))
+OCR_DEDUP_VERIFY_LINES = int(os.getenv("OCR_DEDUP_VERIFY_LINES", "2"))
+OCR_DEDUP_TTL = float(os.getenv("OCR_DEDUP_TTL", "86400"))
+
+# ─────────────────────────────────────────────
+# Solver
+# ─────────────────────────────────────────────
+# Sub-problems of one request solved at the same time.
+SOLVER_CONCURRENCY = int(os.getenv("SOLVER_CONCURRENCY", "4"))
+
+# Threads shared by all requests for sub-problem fan-out.
+SOLVER_POOL_WORKERS = int(os.getenv("SOLVER_POOL_WORKERS", "16"))
+
+# Entries per memo cache (parse / diff / solve / latex) of the SymPy layer.
+SYMPY_CACHE_SIZE = int(os.getenv("SYMPY_CACHE_SIZE", "4096"))
+
+# Symbolic solving runs in sandboxed worker processes. A task past its
+# wall-clock or resident-memory budget is killed and the pipeline moves
+# on to the next stage. 0 workers solves in-process without budgets.
+SYMBOLIC_WORKERS = int(os.getenv("SYMBOLIC_WORKERS", str(min(4, os.cpu_count() or 1))))
+SYMBOLIC_TIMEOUT = float(os.getenv("SYMBOLIC_TIMEOUT", "5"))
+SYMBOLIC_MAX_RSS_MB = int(os.getenv("SYMBOLIC_MAX_RSS_MB", "512"))
+
+# Optimization problems switch to the numeric engine (lambdify + grid +
+# Newton) once symbolic solving has run this many seconds. The switch
+# is a SIGALRM inside the sandbox worker, which keeps running; with 0
+# workers symbolic runs to completion instead. Without
+# interval bounds in the text, critical points are searched in
+# ±NUMERIC_SEARCH_RADIUS.
+NUMERIC_SWITCH_AFTER = float(os.getenv("NUMERIC_SWITCH_AFTER", "0.5"))
+NUMERIC_GRID_POINTS = int(os.getenv("NUMERIC_GRID_POINTS", "2001"))
+NUMERIC_SEARCH_RADIUS = float(os.getenv("NUMERIC_SEARCH_RADIUS", "10"))
+
+# ─────────────────────────────────────────────
+# Gemini
+# ─────────────────────────────────────────────
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+
+# Point the client at another endpoint (e.g. scripts/fake_gemini.py).
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+
+# One pooled client per process: at most MAX_CONCURRENCY calls in
+# flight, each retried up to MAX_RETRIES times on 429 / 5xx / network
+# errors with full-jitter exponential backoff (seconds).
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "0.5"))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", "8"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+
+# Explanations for one solve are packed into prompts of at most
+# BATCH_SIZE problems and about BATCH_TOKENS prompt tokens (1 = one
+# call per problem).
+GEMINI_EXPLAIN_BATCH_SIZE = int(os.getenv("GEMINI_EXPLAIN_BATCH_SIZE", "8"))
+GEMINI_EXPLAIN_BATCH_TOKENS = int(os.getenv("GEMINI_EXPLAIN_BATCH_TOKENS", "6000"))
+
+# /solve returns an explanation_id per result instead of explaining
+# inline; GET /explain/{id} makes the explanation on first request.
+# Handles are kept per worker and in a SQLite file shared by every
+# worker on the host, so an id stays valid across workers and restarts
+# (SOLVE_CACHE_TTL). Empty path: this worker's memory only.
+LAZY_EXPLANATIONS = os.getenv("LAZY_EXPLANATIONS", "1") == "1"
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "10000"))
+EXPLANATION_CACHE_PATH = os.getenv("EXPLANATION_CACHE_PATH", "data/explanations.sqlite3")
+
+# Durable cache of Gemini responses, keyed by model, prompt-template
+# version and normalized inputs. Editing a prompt template changes its
+# version, so old responses stop matching. Empty path disables it.
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite3")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "50000"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(30 * 86400)))
+LLM_CACHE_LOCAL_SIZE = int(os.getenv("LLM_CACHE_LOCAL_SIZE", "1024"))
+
+# ─────────────────────────────────────────────
+# Feedback memory
+# ─────────────────────────────────────────────
+# Past this many stored interactions, lookups use a FAISS inner-product
+# index instead of a plain matrix-vector product.
+MEMORY_FAISS_THRESHOLD = int(os.getenv("MEMORY_FAISS_THRESHOLD", "50000"))
+
+# ─────────────────────────────────────────────
+# Knowledge base
+# ─────────────────────────────────────────────
+# Seconds between checks for a newly ingested vectorstore (0 disables).
+KB_RELOAD_INTERVAL = float(os.getenv("KB_RELOAD_INTERVAL", "5"))
+
+# Required in X-Admin-Token for /admin endpoints when set.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Index built by ingest: flat_l2 | flat_ip | ivf_flat | ivf_pq | hnsw.
+# All but flat_l2 search normalized vectors by inner product (cosine).
+KB_INDEX_TYPE = os.getenv("KB_INDEX_TYPE", "flat_ip")
+KB_IVF_NPROBE = int(os.getenv("KB_IVF_NPROBE", "16"))
+KB_PQ_M = int(os.getenv("KB_PQ_M", "48"))
+KB_HNSW_M = int(os.getenv("KB_HNSW_M", "32"))
+KB_HNSW_EF_SEARCH = int(os.getenv("KB_HNSW_EF_SEARCH", "64"))
+
+# Relevance gate on KB hits (cosine-equivalent score of the top hit).
+# At or above ACCEPT the KB answer is returned straight away; between
+# HINT and ACCEPT it is only used if the memory and symbolic stages
+# fail, instead of paying for the LLM fallback.
+KB_ACCEPT_SCORE = float(os.getenv("KB_ACCEPT_SCORE", "0.75"))
+KB_HINT_SCORE = float(os.getenv("KB_HINT_SCORE", "0.55"))
+
+# Weight of lexical overlap in the hybrid re-rank (0 disables it) and
+# how many vector hits are re-ranked.
+KB_LEXICAL_WEIGHT = float(os.getenv("KB_LEXICAL_WEIGHT", "0.3"))
+KB_RERANK_DEPTH = int(os.getenv("KB_RERANK_DEPTH", "10"))
+
+# ─────────────────────────────────────────────
+# Solve-result cache
+# ─────────────────────────────────────────────
+# Finished sub-problem results keyed by normalized text + route, the KB
+# index version and the feedback-memory generation, so re-ingesting or
+# storing feedback invalidates them. 0 entries disables the cache.
+SOLVE_CACHE_SIZE = int(os.getenv("SOLVE_CACHE_SIZE", "2048"))
+SOLVE_CACHE_TTL = float(os.getenv("SOLVE_CACHE_TTL", "86400"))
+
+# Optional SQLite file shared by all workers on the host (unset disables).
+SOLVE_CACHE_PATH = os.getenv("SOLVE_CACHE_PATH")
+SOLVE_CACHE_SHARED_SIZE = int(os.getenv("SOLVE_CACHE_SHARED_SIZE", "100000"))
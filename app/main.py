@@ -6,31 +6,130 @@ try:
 except ImportError:
     pass
 
-from fastapi import FastAPI, UploadFile, File, Form, Body
+from fastapi import FastAPI, UploadFile, File, Form, Body, Header
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
+import asyncio
+import json
+import logging
 import os
 import re
+import threading
+import time
 
+from app.config import (
+    EMBEDDING_WARMUP,
+    ADMIN_TOKEN,
+    LAZY_EXPLANATIONS,
+    CPU_POOL_WORKERS,
+    OCR_WARMUP
+)
 from app.schemas import ParseResponse, FeedbackRequest
 from app.agents.parser_agent import parse_problem
-from app.agents.solver_agent import solve_problem
-from app.agents.gemini_explainer_agent import explain_with_gemini
+from app.agents.solver_agent import (
+    iter_solve,
+    solve_problem,
+    solve_cache_stats,
+    symbolic_cache_stats
+)
+from app.agents.gemini_explainer_agent import explain_batch, explain_with_gemini_async
+from app.agents.gemini_client import close_gemini_client, gemini_stats
+from app.agents.explanations import explain_by_id, explanation_stats, register_explanations
+from app.agents.llm_cache import llm_cache_stats
 
-from app.utils.ocr import extract_text_from_image
+from app.utils.ocr import ocr_dedup_stats, ocr_image, warm_up as warm_up_ocr
 from app.utils.asr import transcribe_audio
 from app.utils.confidence import assess_confidence
 
 from app.hitl.handler import hitl_required
 from app.memory.memory_store import store_interaction
+from app.rag.retriever import (
+    kb_stats,
+    reload_vectorstore,
+    start_vectorstore_watcher
+)
+from app.utils.embeddings import warm_up as warm_up_embeddings
+from app.utils.latency import LatencyWindow
+from app.utils.executors import (
+    ExecutorSaturated,
+    run_io,
+    stream_io,
+    shutdown_pools,
+    io_pool,
+    cpu_pool,
+    symbolic_pool
+)
+
+logger = logging.getLogger(__name__)
 
 # ─────────────────────────────────────────────
 # App init
 # ─────────────────────────────────────────────
 app = FastAPI(title="Quantix Mathematician")
 
+
+@app.on_event("startup")
+def start_embedding_warmup():
+    # Load the shared embedding model without delaying startup;
+    # the first request that needs it blocks only if still loading.
+    if EMBEDDING_WARMUP:
+        threading.Thread(target=warm_up_embeddings, daemon=True).start()
+
+
+@app.on_event("startup")
+def start_kb_watcher():
+    start_vectorstore_watcher()
+
+
+@app.on_event("startup")
+def start_symbolic_workers():
+    # Pre-start the sandboxed SymPy workers so the first symbolic
+    # problem does not wait for them to import SymPy.
+    symbolic_pool()
+
+
+def _log_ocr_warm_up(future):
+    if future.cancelled():
+        return
+    error = future.exception()
+    if error is not None:
+        logger.warning("OCR warm-up failed: %s", error)
+
+
+@app.on_event("startup")
+def start_ocr_workers():
+    # Spawn the cpu workers and load Tesseract's language data, so the
+    # first upload does not pay for either. Best-effort: one task per
+    # worker, but the pool picks who runs it, and failures (missing
+    # language data, a forced backend that is not installed) are
+    # logged here and raised again by the first upload.
+    if not OCR_WARMUP:
+        return
+    try:
+        for _ in range(CPU_POOL_WORKERS):
+            cpu_pool().submit(warm_up_ocr).add_done_callback(_log_ocr_warm_up)
+    except ExecutorSaturated:
+        logger.warning("OCR warm-up skipped: cpu pool is saturated")
+
+
+@app.on_event("shutdown")
+def stop_executors():
+    shutdown_pools()
+    close_gemini_client()
+
+
+def _busy_response(e: ExecutorSaturated):
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": "1"},
+        content={
+            "error": "Server busy",
+            "details": str(e)
+        }
+    )
+
 # ─────────────────────────────────────────────
 # Middleware
 # ─────────────────────────────────────────────
@@ -56,25 +155,62 @@ def serve_ui():
 # ─────────────────────────────────────────────
 # Parse input (TEXT / IMAGE / AUDIO)
 # ─────────────────────────────────────────────
-@app.post("/parse", response_model=ParseResponse)
+# Per uploaded image, decode to text; backend of the last one
+_ocr_ms = LatencyWindow()
+_ocr_backend = {"last": None}
+
+@app.post(
+    "/parse",
+    response_model=ParseResponse,
+    responses={503: {"description": "Worker pools saturated"}}
+)
 async def parse_input(
     input_type: str = Form(...),
     text: str = Form(None),
-    file: UploadFile = File(None)
+    file: UploadFile = File(None),
+    cache: bool = True
 ):
     """
     AUDIO HANDLING RULES:
     - If frontend sends audio as TEXT → use directly
     - If audio FILE is sent → run ASR
+
+    `?cache=false` reads an image even when a near-identical page was
+    read before; the fresh result is cached as well.
     """
 
     raw_text = ""
+    ocr = None
 
     if input_type == "text":
         raw_text = text or ""
 
     elif input_type == "image" and file:
-        raw_text = extract_text_from_image(await file.read())
+        try:
+            image_bytes = await file.read()
+            started = time.perf_counter()
+            ocr = await ocr_image(image_bytes, use_cache=cache)
+        except ExecutorSaturated as e:
+            return _busy_response(e)
+        except ValueError as e:
+            return JSONResponse(
+                status_code=400,
+                content={
+                    "error": "Unreadable image",
+                    "details": str(e)
+                }
+            )
+        except Exception as e:
+            return JSONResponse(
+                status_code=500,
+                content={
+                    "error": "OCR failed",
+                    "details": str(e)
+                }
+            )
+        raw_text = ocr.text
+        _ocr_ms.record((time.perf_counter() - started) * 1000)
+        _ocr_backend["last"] = ocr.backend
 
     elif input_type == "audio":
         if text:
@@ -99,7 +235,9 @@ async def parse_input(
     # ─────────────────────────────────────────
     # Confidence + HITL
     # ─────────────────────────────────────────
-    confidence = assess_confidence(raw_text)
+    confidence = assess_confidence(
+        raw_text, ocr.confidence if ocr is not None else None
+    )
     parsed = parse_problem(raw_text)
     needs_hitl = hitl_required(confidence, parsed)
 
@@ -107,43 +245,100 @@ async def parse_input(
         raw_text=raw_text,
         parsed_problem=parsed,
         confidence=confidence,
-        needs_hitl=needs_hitl
+        needs_hitl=needs_hitl,
+        ocr=ocr.to_dict() if ocr is not None else None
     )
 
 
 # ─────────────────────────────────────────────
 # Solve (MULTI-PROBLEM SAFE + EXPLAINER)
 # ─────────────────────────────────────────────
+# Time until the client has its first sub-problem result. For the
+# blocking endpoint that is the whole request.
+_first_result_ms = {
+    "solve": LatencyWindow(),
+    "solve_stream": LatencyWindow()
+}
+
+
+def _needs_explanation(item: dict) -> bool:
+    return not item.get("explanation") and bool(os.getenv("GEMINI_API_KEY"))
+
+
+def _explain_args(item: dict) -> tuple:
+    return (
+        item.get("question", ""),
+        item.get("final_answer", {}).get("text", ""),
+        item.get("steps") or []
+    )
+
+
+async def _attach_explanation_ids(items: list[dict]):
+    """
+    Lazy mode: a result that needs an explanation gets an
+    explanation_id for GET /explain/{id} instead.
+    """
+    items = [item for item in items if _needs_explanation(item)]
+    ids = await register_explanations([_explain_args(item) for item in items])
+    for item, key in zip(items, ids):
+        if key is not None:
+            item["explanation_id"] = key
+
+
+async def _explain_item(item: dict, use_cache: bool = True) -> str | None:
+    """
+    Gemini explanation for a result that has none, or None.
+    Never fails the solve.
+    """
+    if not _needs_explanation(item):
+        return None
+
+    try:
+        return await explain_with_gemini_async(*_explain_args(item), use_cache=use_cache)
+    except Exception:
+        return None
+
+
 @app.post("/solve")
-async def solve(parsed_problem: dict = Body(...)):
+async def solve(parsed_problem: dict = Body(...), cache: bool = True):
+    """
+    `?cache=false` bypasses cached answers and LLM responses for this
+    request; the fresh results replace them.
+    """
+    started = time.perf_counter()
     try:
         if not isinstance(parsed_problem, dict):
             raise ValueError("Invalid request body")
 
-        solution = solve_problem(parsed_problem)
+        # Solver pipeline (SymPy, embeddings, FAISS, LLM) is blocking
+        solution = await run_io(solve_problem, parsed_problem, use_cache=cache)
+        _first_result_ms["solve"].record((time.perf_counter() - started) * 1000)
 
         # ─────────────────────────────────────
-        # EXPLAINER (NON-DESTRUCTIVE)
+        # EXPLAINER (LAZY HANDLES, OR INLINE + BATCHED)
         # ─────────────────────────────────────
-        if os.getenv("GEMINI_API_KEY"):
-            for item in solution.get("results", []):
-                if not item.get("explanation"):
-                    try:
-                        item["explanation"] = explain_with_gemini(
-                            item.get("question", ""),
-                            item.get("final_answer", {}).get("text", "")
-                        )
-                        item.setdefault("source", {})
-                        item["source"]["explanation"] = "gemini_explainer"
-                    except Exception:
-                        # Never fail solve because of explainer
-                        pass
+        results = solution.get("results", [])
+        if LAZY_EXPLANATIONS:
+            await _attach_explanation_ids(results)
+        else:
+            missing = [item for item in results if _needs_explanation(item)]
+            explanations = await explain_batch(
+                [_explain_args(item) for item in missing], use_cache=cache
+            )
+            for item, explanation in zip(missing, explanations):
+                if explanation:
+                    item["explanation"] = explanation
+                    item.setdefault("source", {})
+                    item["source"]["explanation"] = "gemini_explainer"
 
         return JSONResponse(
             status_code=200,
             content=solution
         )
 
+    except ExecutorSaturated as e:
+        return _busy_response(e)
+
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -154,6 +349,150 @@ async def solve(parsed_problem: dict = Body(...)):
         )
 
 
+async def _solve_stream_events(events, started: float, use_cache: bool = True):
+    """
+    Interleaves solver events with explanation events as each
+    explanation finishes. "done" is held back until the last one,
+    with time_to_first_result_ms and total_ms added.
+    """
+    out = asyncio.Queue()
+    explaining = set()
+    first_result_ms = None
+
+    async def explain(index, item):
+        explanation = await _explain_item(item, use_cache)
+        if explanation:
+            await out.put({
+                "event": "explanation",
+                "index": index,
+                "explanation": explanation,
+                "source": "gemini_explainer"
+            })
+
+    async def pump():
+        done = {"event": "done"}
+        try:
+            async for event in events:
+                if event["event"] == "done":
+                    done.update(event)
+                    continue
+                if event["event"] == "result" and LAZY_EXPLANATIONS:
+                    await _attach_explanation_ids([event["result"]])
+                elif event["event"] == "result":
+                    explaining.add(asyncio.create_task(
+                        explain(event["index"], event["result"])
+                    ))
+                await out.put(event)
+        except Exception as e:
+            await out.put({
+                "event": "error",
+                "error": "Solve endpoint failed",
+                "details": str(e)
+            })
+
+        await asyncio.gather(*explaining)
+        await out.put(done)
+        await out.put(None)
+
+    pumping = asyncio.create_task(pump())
+    try:
+        while (event := await out.get()) is not None:
+            if event["event"] == "result" and first_result_ms is None:
+                first_result_ms = (time.perf_counter() - started) * 1000
+                _first_result_ms["solve_stream"].record(first_result_ms)
+            if event["event"] == "done":
+                event["time_to_first_result_ms"] = (
+                    round(first_result_ms, 2) if first_result_ms is not None else None
+                )
+                event["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            yield json.dumps(event) + "\n"
+    finally:
+        # Client went away: stop solving and explaining
+        pumping.cancel()
+        for task in explaining:
+            task.cancel()
+        await asyncio.gather(pumping, return_exceptions=True)
+        await events.aclose()
+
+
+@app.post(
+    "/solve/stream",
+    responses={503: {"description": "Worker pools saturated"}}
+)
+async def solve_stream(parsed_problem: dict = Body(...), cache: bool = True):
+    """
+    NDJSON stream: "start", then one "result" per sub-problem as it is
+    solved (with its "index"), "explanation" follow-ups (eager mode
+    only), then "done".
+    `?cache=false` as for /solve.
+    """
+    started = time.perf_counter()
+    try:
+        events = stream_io(iter_solve, parsed_problem, use_cache=cache)
+    except ExecutorSaturated as e:
+        return _busy_response(e)
+
+    return StreamingResponse(
+        _solve_stream_events(events, started, cache),
+        media_type="application/x-ndjson"
+    )
+
+
+# ─────────────────────────────────────────────
+# Explain (LAZY, ONE RESULT)
+# ─────────────────────────────────────────────
+@app.get(
+    "/explain/{explanation_id}",
+    responses={
+        404: {"description": "Unknown explanation id"},
+        502: {"description": "Gemini call failed"},
+        503: {"description": "Gemini not configured, or worker pools saturated"}
+    }
+)
+async def explain_result(explanation_id: str, cache: bool = True):
+    """
+    Explanation for an explanation_id returned by /solve, made on the
+    first request and stored. `?cache=false` makes a fresh one.
+    """
+    if not os.getenv("GEMINI_API_KEY"):
+        return JSONResponse(
+            status_code=503,
+            content={
+                "error": "Explanations unavailable",
+                "details": "GEMINI_API_KEY not set"
+            }
+        )
+
+    try:
+        explained = await explain_by_id(explanation_id, use_cache=cache)
+    except ExecutorSaturated as e:
+        return _busy_response(e)
+    except Exception as e:
+        return JSONResponse(
+            status_code=502,
+            content={
+                "error": "Explanation failed",
+                "details": str(e)
+            }
+        )
+
+    if explained is None:
+        return JSONResponse(
+            status_code=404,
+            content={
+                "error": "Unknown explanation id",
+                "details": explanation_id
+            }
+        )
+
+    return JSONResponse({
+        "explanation_id": explanation_id,
+        "explanation": explained["explanation"],
+        "cached": explained["cached"],
+        "source": "gemini_explainer"
+    })
+
+
 # ─────────────────────────────────────────────
 # Feedback
 # ─────────────────────────────────────────────
@@ -166,3 +505,56 @@ def feedback(request: FeedbackRequest):
         correction=request.correction
     )
     return JSONResponse({"status": "stored"})
+
+
+# ─────────────────────────────────────────────
+# Admin + metrics
+# ─────────────────────────────────────────────
+@app.post("/admin/reload-index")
+async def reload_index(x_admin_token: str = Header(None)):
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        return JSONResponse(status_code=403, content={"error": "Forbidden"})
+
+    try:
+        snapshot = await run_io(reload_vectorstore, True)
+    except ExecutorSaturated as e:
+        return _busy_response(e)
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "error": "Index reload failed",
+                "details": str(e)
+            }
+        )
+
+    return JSONResponse({
+        "status": "reloaded",
+        "kb_index_version": snapshot.version
+    })
+
+
+@app.get("/metrics")
+def metrics():
+    symbolic = symbolic_pool()
+    return JSONResponse({
+        "kb_index": kb_stats(),
+        "solve_cache": solve_cache_stats(),
+        "sympy_cache": symbolic_cache_stats(),
+        "gemini": gemini_stats(),
+        "llm_cache": llm_cache_stats(),
+        "explanations": explanation_stats(),
+        "ocr": {
+            "backend": _ocr_backend["last"],
+            "latency_ms": _ocr_ms.stats(),
+            "dedup": ocr_dedup_stats()
+        },
+        "time_to_first_result_ms": {
+            name: window.stats() for name, window in _first_result_ms.items()
+        },
+        "executors": {
+            "io": io_pool().stats(),
+            "cpu": cpu_pool().stats(),
+            "symbolic": symbolic.stats() if symbolic is not None else None
+        }
+    })
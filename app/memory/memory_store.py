@@ -1,34 +1,228 @@
 import json
+import os
+import time
+from contextlib import contextmanager
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
 
+import numpy as np
+
+from app.utils.embeddings import encode
+
+# Legacy single-file store, migrated into MEMORY_DIR on first use
 MEMORY_PATH = Path("data/memory.json")
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
-model = SentenceTransformer(MODEL_NAME)
+# On-disk layout:
+#   records.jsonl   append-only log, one JSON record per line
+#   embeddings.f32  raw float32 rows, record["row"] points into it
+#   meta.json       {"dim": ...}, written once when the store is created
+MEMORY_DIR = Path("data/memory")
+RECORDS_PATH = MEMORY_DIR / "records.jsonl"
+EMBEDDINGS_PATH = MEMORY_DIR / "embeddings.f32"
+META_PATH = MEMORY_DIR / "meta.json"
+LOCK_PATH = MEMORY_DIR / ".lock"
+
+DTYPE = np.float32
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    def _lock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock_file(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def _store_lock():
+    """
+    Exclusive cross-process lock for writers (several uvicorn workers).
+    Readers never take it: appends are whole-line / whole-row writes.
+    """
+    MEMORY_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_PATH, "a+b") as f:
+        _lock_file(f)
+        try:
+            yield
+        finally:
+            _unlock_file(f)
+
+
+def _read_dim():
+    if not META_PATH.exists():
+        return None
+    return json.loads(META_PATH.read_text())["dim"]
+
+
+def _append_locked(embeddings: np.ndarray, records: list[dict]):
+    """
+    Appends rows then records. Must hold _store_lock.
+
+    Embeddings go first: a crash in between leaves an unused row,
+    never a record pointing at missing data.
+    """
+    dim = _read_dim()
+    if dim is None:
+        dim = int(embeddings.shape[1])
+        META_PATH.write_text(json.dumps({"dim": dim}))
+
+    row_bytes = dim * np.dtype(DTYPE).itemsize
+
+    with open(EMBEDDINGS_PATH, "ab") as f:
+        # Drop a torn row left by a crashed writer
+        size = f.tell()
+        if size % row_bytes:
+            f.truncate(size - size % row_bytes)
+            f.seek(0, os.SEEK_END)
+        first_row = f.tell() // row_bytes
+        f.write(np.ascontiguousarray(embeddings, dtype=DTYPE).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    lines = []
+    for offset, record in enumerate(records):
+        record = dict(record, row=first_row + offset)
+        lines.append(json.dumps(record, ensure_ascii=False) + "\n")
+
+    with open(RECORDS_PATH, "ab") as f:
+        # Never glue a new record onto a torn last line
+        if f.tell() > 0:
+            with open(RECORDS_PATH, "rb") as r:
+                r.seek(-1, os.SEEK_END)
+                if r.read(1) != b"\n":
+                    lines[0] = "\n" + lines[0]
+        f.write("".join(lines).encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _migrate_legacy_locked():
+    """
+    Imports data/memory.json into the array-backed store once.
+    The legacy file is left in place untouched.
+    """
+    if RECORDS_PATH.exists():
+        return
+
+    legacy = []
+    if MEMORY_PATH.exists():
+        legacy = json.loads(MEMORY_PATH.read_text())
+        legacy = [item for item in legacy if item.get("embedding")]
+
+    if legacy:
+        embeddings = np.asarray(
+            [item["embedding"] for item in legacy], dtype=DTYPE
+        )
+        records = [
+            {k: v for k, v in item.items() if k != "embedding"}
+            for item in legacy
+        ]
+        _append_locked(embeddings, records)
+
+    RECORDS_PATH.touch()
+
+
+def _ensure_store():
+    if RECORDS_PATH.exists():
+        return
+    with _store_lock():
+        _migrate_legacy_locked()
+
+
+def load_records(offset: int = 0):
+    """
+    Reads records from byte `offset` of the log.
+    Returns (records, end_offset); torn trailing lines are left unread.
+    """
+    _ensure_store()
+
+    records = []
+    with open(RECORDS_PATH, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+
+    return records, offset
+
+
+def memory_generation() -> int:
+    """
+    Cheap change marker for the store: the size of the records log,
+    which grows with every stored interaction in any worker.
+    """
+    try:
+        return RECORDS_PATH.stat().st_size
+    except FileNotFoundError:
+        return 0
+
+
+def load_embeddings():
+    """
+    Memory-maps the embedding matrix (read-only).
+    Returns an empty (0, 0) array when nothing is stored yet.
+    """
+    _ensure_store()
+
+    dim = _read_dim()
+    if dim is None or not EMBEDDINGS_PATH.exists():
+        return np.zeros((0, 0), dtype=DTYPE)
+
+    row_bytes = dim * np.dtype(DTYPE).itemsize
+    rows = EMBEDDINGS_PATH.stat().st_size // row_bytes
+    if rows == 0:
+        return np.zeros((0, dim), dtype=DTYPE)
+
+    return np.memmap(EMBEDDINGS_PATH, dtype=DTYPE, mode="r", shape=(rows, dim))
 
 
 def load_memory():
-    if not MEMORY_PATH.exists():
-        return []
-    return json.loads(MEMORY_PATH.read_text())
+    """
+    Returns every stored interaction with its embedding row attached.
+    """
+    records, _ = load_records()
+    embeddings = load_embeddings()
 
+    memory = []
+    for record in records:
+        row = record.get("row", -1)
+        if 0 <= row < len(embeddings):
+            memory.append(dict(record, embedding=embeddings[row]))
 
-def store_interaction(problem, solution, feedback, correction=None):
-    MEMORY_PATH.parent.mkdir(exist_ok=True)
+    return memory
 
-    memory = load_memory()
 
-    embedding = model.encode(problem["problem_text"]).tolist()
+def store_interaction(problem, solution, feedback, correction=None):
+    embedding = encode(problem["problem_text"])
 
-    memory.append({
-        "embedding": embedding,
+    record = {
         "topic": problem.get("topic"),
         "problem_text": problem.get("problem_text"),
         "solution_steps": solution.get("steps"),
         "final_answer": solution.get("final_answer"),
         "feedback": feedback,
-        "correction": correction
-    })
+        "correction": correction,
+        "created_at": time.time()
+    }
 
-    MEMORY_PATH.write_text(json.dumps(memory, indent=2))
+    with _store_lock():
+        _migrate_legacy_locked()
+        _append_locked(embedding, [record])
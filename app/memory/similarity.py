@@ -1,9 +1,14 @@
+import threading
+
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from app.memory.memory_store import load_memory
 
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-model = SentenceTransformer(MODEL_NAME)
+from app.config import MEMORY_FAISS_THRESHOLD
+from app.memory.memory_store import (
+    RECORDS_PATH,
+    load_records,
+    load_embeddings
+)
+from app.utils.embeddings import encode
 
 
 def cosine_similarity(a, b):
@@ -12,20 +17,167 @@ def cosine_similarity(a, b):
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
 
-def find_similar_problem(query_text: str, threshold: float = 0.85):
-    memory = load_memory()
-    if not memory:
-        return None
+# Rows normalized per FAISS add call
+_ADD_CHUNK = 65536
+
+
+def _row_norms(matrix: np.ndarray) -> np.ndarray:
+    # Zero rows stay zero instead of turning into NaN
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return norms
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    return matrix / _row_norms(matrix)
+
+
+class MemoryIndex:
+    """
+    In-process view of the feedback memory: a pre-normalized float32
+    matrix plus its records. Only new log entries are read on refresh,
+    so each store_interaction (from any worker) costs one incremental
+    append here.
+    """
+
+    def __init__(self, faiss_threshold: int = MEMORY_FAISS_THRESHOLD):
+        self.faiss_threshold = faiss_threshold
+        self.records = []
+        self._matrix = None
+        self._size = 0
+        self._faiss = None
+        self._log_offset = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """
+        Normalized rows; empty once lookups have moved to FAISS.
+        """
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    def add(self, embeddings: np.ndarray, records: list[dict]):
+        """
+        Appends rows (normalized here) and their records.
+        Callers must hold the lock or own the index exclusively.
+        """
+        if not len(records):
+            return
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = _row_norms(embeddings)
+        needed = self._size + len(embeddings)
+
+        if self._faiss is None and needed >= self.faiss_threshold:
+            self._build_faiss(embeddings.shape[1])
+
+        if self._faiss is not None:
+            self.records.extend(records)
+            # Chunked so normalizing never doubles a large batch in RAM
+            for start in range(0, len(embeddings), _ADD_CHUNK):
+                end = start + _ADD_CHUNK
+                self._faiss.add(embeddings[start:end] / norms[start:end])
+            self._size = needed
+            return
+
+        # Amortized growth: double capacity instead of copying per append
+        if self._matrix is None or needed > len(self._matrix):
+            current = 0 if self._matrix is None else len(self._matrix)
+            capacity = max(needed, 2 * current, 64)
+            grown = np.empty((capacity, embeddings.shape[1]), dtype=np.float32)
+            if self._size:
+                grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
 
-    query_embedding = model.encode(query_text)
+        # Records before size, so a concurrent search never sees a row
+        # without its record
+        np.divide(embeddings, norms, out=self._matrix[self._size:needed])
+        self.records.extend(records)
+        self._size = needed
 
-    best_match = None
-    best_score = 0.0
+    def _build_faiss(self, dim: int):
+        import faiss
+
+        index = faiss.IndexFlatIP(dim)
+        if self._size:
+            index.add(self.matrix)
+        self._faiss = index
+        # The FAISS index owns the vectors from here on
+        self._matrix = None
+
+    def refresh(self):
+        """
+        Pulls records appended to the on-disk log since the last refresh.
+        """
+        try:
+            log_size = RECORDS_PATH.stat().st_size
+        except FileNotFoundError:
+            log_size = 0
+
+        if log_size and log_size == self._log_offset:
+            return
+
+        with self._lock:
+            records, offset = load_records(self._log_offset)
+            if records:
+                embeddings = load_embeddings()
+                records = [
+                    r for r in records
+                    if 0 <= r.get("row", -1) < len(embeddings)
+                ]
+                rows = [r["row"] for r in records]
+                if rows:
+                    self.add(embeddings[rows], records)
+            self._log_offset = offset
+
+    def search(self, query_embedding, threshold: float):
+        """
+        Returns (score, record) for the best match at or above
+        `threshold`, else (score, None).
+        """
+        query = _normalize(np.asarray(query_embedding).reshape(1, -1))
+
+        # Under the lock: a concurrent add() may grow the matrix or move
+        # the rows into FAISS (which does not allow add during search)
+        with self._lock:
+            if not self._size:
+                return 0.0, None
+
+            if self._faiss is not None:
+                scores, ids = self._faiss.search(query, 1)
+                best, score = int(ids[0][0]), float(scores[0][0])
+            else:
+                scores = self.matrix @ query[0]
+                best = int(np.argmax(scores))
+                score = float(scores[best])
+
+            if best < 0 or score < threshold:
+                return score, None
+
+            return score, self.records[best]
+
+
+_index = MemoryIndex()
+
+
+def memory_index() -> MemoryIndex:
+    _index.refresh()
+    return _index
+
+
+def find_similar_problem(query_text: str, threshold: float = 0.85, query_embedding=None):
+    index = memory_index()
+    if not len(index):
+        return None
 
-    for item in memory:
-        score = cosine_similarity(query_embedding, item["embedding"])
-        if score > best_score and score >= threshold:
-            best_score = score
-            best_match = item
+    if query_embedding is None:
+        query_embedding = encode(query_text)[0]
 
-    return best_match
+    _, match = index.search(query_embedding, threshold)
+    return match
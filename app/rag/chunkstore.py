@@ -0,0 +1,110 @@
+import json
+import mmap
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+
+# Offset table row: FAISS id -> byte range of its JSON record
+_IDX_DTYPE = np.dtype([("id", "<i8"), ("offset", "<i8"), ("length", "<i8")])
+
+
+def extract_answer(block: str) -> str | None:
+    """
+    Extracts **Answer:** section from markdown chunk
+    """
+    match = re.search(r"\*\*Answer:\*\*\s*(.+)", block)
+    return match.group(1).strip() if match else None
+
+
+def extract_explanation(block: str) -> str | None:
+    """
+    Extracts **Explanation:** section from markdown chunk
+    """
+    match = re.search(
+        r"\*\*Explanation:\*\*(.+?)(?:\n\*\*Source:\*\*|\Z)",
+        block,
+        re.S
+    )
+    return match.group(1).strip() if match else None
+
+
+def parse_chunk(text: str, source: str) -> dict:
+    """
+    Pre-parses a markdown Q/A chunk into the fields the retriever returns.
+    """
+    return {
+        "raw": text,
+        "answer": extract_answer(text),
+        "explanation": extract_explanation(text),
+        "source": source
+    }
+
+
+def write_chunk_store(data_path: Path, idx_path: Path, records: dict, write):
+    """
+    Serializes {id: record} as concatenated JSON plus a sorted
+    (id, offset, length) table. `write(path, fn)` is the caller's
+    atomic file writer.
+    """
+    ids = sorted(records)
+    table = np.empty(len(ids), dtype=_IDX_DTYPE)
+    blobs = []
+    offset = 0
+
+    for i, cid in enumerate(ids):
+        blob = json.dumps(records[cid], ensure_ascii=False).encode("utf-8")
+        table[i] = (cid, offset, len(blob))
+        blobs.append(blob)
+        offset += len(blob)
+
+    write(data_path, lambda f: f.write(b"".join(blobs)))
+    write(idx_path, lambda f: f.write(table.tobytes()))
+
+
+class ChunkStore:
+    """
+    Memory-mapped chunk records: nothing is decoded until a search
+    asks for a specific id.
+    """
+
+    def __init__(self, data_path: Path, idx_path: Path):
+        self._table = np.zeros(0, dtype=_IDX_DTYPE)
+        if os.path.getsize(idx_path):
+            self._table = np.memmap(idx_path, dtype=_IDX_DTYPE, mode="r")
+
+        self._data = b""
+        if os.path.getsize(data_path):
+            with open(data_path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self._table)
+
+    def get(self, cid: int) -> dict | None:
+        pos = int(np.searchsorted(self._table["id"], cid))
+        if pos >= len(self._table) or self._table["id"][pos] != cid:
+            return None
+
+        offset = int(self._table["offset"][pos])
+        length = int(self._table["length"][pos])
+        return json.loads(self._data[offset:offset + length])
+
+
+class InMemoryChunkStore:
+    """
+    Adapter for pickled metadata (legacy stores), parsed once at load.
+    """
+
+    def __init__(self, texts, metadatas):
+        keys = texts.keys() if isinstance(texts, dict) else range(len(texts))
+        self._records = {
+            int(k): parse_chunk(texts[k], metadatas[k]["source"]) for k in keys
+        }
+
+    def __len__(self):
+        return len(self._records)
+
+    def get(self, cid: int) -> dict | None:
+        return self._records.get(int(cid))
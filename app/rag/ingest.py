@@ -1,14 +1,24 @@
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
+from app.config import KB_INDEX_TYPE
+from app.utils.embeddings import encode
+from app.rag.vectorstore import (
+    VECTORSTORE_PATH,
+    build_index,
+    index_metric,
+    normalize,
+    read_current_version,
+    supports_remove,
+    write_vectorstore
+)
 import faiss
-import pickle
+import hashlib
+import json
+import numpy as np
 import re
+import sys
 
 BASE_DIR = Path(__file__).resolve().parents[1]
 KB_PATH = BASE_DIR / "knowledge_base"
-VECTORSTORE_PATH = BASE_DIR / "data" / "vectorstore"
-
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
 
 def chunk_markdown_qa(text: str):
@@ -22,39 +32,121 @@ def chunk_markdown_qa(text: str):
     return re.findall(pattern, text)
 
 
-def ingest():
-    VECTORSTORE_PATH.mkdir(parents=True, exist_ok=True)
+def chunk_id(source: str, text: str) -> tuple[int, str]:
+    """
+    Content hash of a chunk and the FAISS id derived from it.
+    Any edit to the chunk changes both.
+    """
+    digest = hashlib.sha256(f"{source}\0{text}".encode("utf-8")).hexdigest()
+    return int(digest[:16], 16) & 0x7FFF_FFFF_FFFF_FFFF, digest
 
-    model = SentenceTransformer(MODEL_NAME)
 
-    texts, metadatas = [], []
+def collect_chunks() -> dict:
+    """
+    Returns {id: {"text", "source", "type", "hash"}} for every KB chunk.
+    """
+    chunks = {}
 
-    for file in KB_PATH.glob("*.md"):
+    for file in sorted(KB_PATH.glob("*.md")):
         content = file.read_text(encoding="utf-8")
-        chunks = chunk_markdown_qa(content)
 
-        for chunk in chunks:
-            texts.append(chunk.strip())
-            metadatas.append({
+        for chunk in chunk_markdown_qa(content):
+            text = chunk.strip()
+            cid, digest = chunk_id(file.name, text)
+            chunks[cid] = {
+                "text": text,
                 "source": file.name,
-                "type": "jee_pyq"
-            })
+                "type": "jee_pyq",
+                "hash": digest
+            }
+
+    return chunks
+
+
+def _load_previous():
+    """
+    Current ID-mapped index, its manifest chunks and index info,
+    or (None, {}, {}) when a full build is needed (first run or legacy
+    positional index).
+    """
+    version = read_current_version()
+    if version is None:
+        return None, {}, {}
+
+    manifest_path = VECTORSTORE_PATH / f"manifest-{version}.json"
+    if not manifest_path.exists():
+        return None, {}, {}
 
-    if not texts:
+    manifest = json.loads(manifest_path.read_text())
+    index = faiss.read_index(str(VECTORSTORE_PATH / f"index-{version}.faiss"))
+    chunks = {int(cid): entry for cid, entry in manifest["chunks"].items()}
+    info = manifest.get("index") or {
+        "type": "flat_l2",
+        "requested": "flat_l2",
+        "metric": "l2",
+        "trained_on": len(chunks)
+    }
+
+    return index, chunks, info
+
+
+def _needs_rebuild(info: dict, index_type: str, n: int, removing: bool) -> bool:
+    if info.get("requested") != index_type:
+        return True
+    if removing and not supports_remove(info["type"]):
+        return True
+
+    # Trained indexes, and fallbacks from a trained type, are rebuilt
+    # once the corpus outgrows what they were built for.
+    trained = info["type"] in ("ivf_flat", "ivf_pq") or info["type"] != index_type
+    return trained and n >= 4 * info.get("trained_on", n)
+
+
+def ingest(full: bool = False, index_type: str = KB_INDEX_TYPE):
+    chunks = collect_chunks()
+
+    if not chunks:
         raise RuntimeError("No QA chunks found. Check markdown format.")
 
-    embeddings = model.encode(texts, convert_to_numpy=True)
+    index, previous, info = (None, {}, {}) if full else _load_previous()
+
+    added = [cid for cid in chunks if cid not in previous]
+    removed = [cid for cid in previous if cid not in chunks]
+
+    if index is None or _needs_rebuild(info, index_type, len(chunks), bool(removed)):
+        added, removed = list(chunks), []
+        embeddings = encode([chunks[cid]["text"] for cid in added])
+        index, built_type = build_index(
+            index_type, embeddings, np.asarray(added, dtype=np.int64)
+        )
+        info = {
+            "type": built_type,
+            "requested": index_type,
+            "metric": index_metric(built_type),
+            "trained_on": len(added)
+        }
+
+    elif not added and not removed:
+        print(f"✅ Knowledge base unchanged ({len(chunks)} QA chunks)")
+        return
 
-    index = faiss.IndexFlatL2(embeddings.shape[1])
-    index.add(embeddings)
+    else:
+        if added:
+            embeddings = encode([chunks[cid]["text"] for cid in added])
+            if info["metric"] == "ip":
+                embeddings = normalize(embeddings)
+            index.add_with_ids(embeddings, np.asarray(added, dtype=np.int64))
 
-    faiss.write_index(index, str(VECTORSTORE_PATH / "index.faiss"))
+        if removed:
+            index.remove_ids(np.asarray(removed, dtype=np.int64))
 
-    with open(VECTORSTORE_PATH / "meta.pkl", "wb") as f:
-        pickle.dump({"texts": texts, "metadatas": metadatas}, f)
+    version = write_vectorstore(index, chunks, info)
 
-    print(f"✅ Ingested {len(texts)} QA chunks")
+    print(
+        f"✅ Ingested {len(chunks)} QA chunks into {info['type']} "
+        f"(+{len(added)} embedded, -{len(removed)} removed) → {version}"
+    )
 
 
 if __name__ == "__main__":
-    ingest()
+    ingest(full="--full" in sys.argv[1:])
@@ -1,51 +1,240 @@
-from sentence_transformers import SentenceTransformer
-from app.rag.vectorstore import load_vectorstore
+from app.config import (
+    KB_RELOAD_INTERVAL,
+    KB_LEXICAL_WEIGHT,
+    KB_RERANK_DEPTH
+)
+from app.rag.chunkstore import extract_answer, extract_explanation  # noqa: F401
+from app.rag.vectorstore import (
+    CURRENT_PATH,
+    load_vectorstore,
+    normalize,
+    read_current_version
+)
+from app.utils.embeddings import encode
+from dataclasses import dataclass, field
+import logging
 import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class KBSnapshot:
+    """
+    One immutable, fully loaded vectorstore version.
+    Searches hold a reference for their whole duration, so swapping
+    in a new snapshot never affects requests already in flight.
+    """
+    index: object
+    chunks: object
+    version: str
+    index_info: dict
+    loaded_at: float = field(default_factory=time.time)
+
+
+def _load_snapshot() -> KBSnapshot:
+    version = read_current_version()
+    index, chunks, index_info = load_vectorstore(version)
+    return KBSnapshot(index, chunks, version or "legacy", index_info)
 
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-model = SentenceTransformer(MODEL_NAME)
 
 # Load FAISS index
-index, texts, metadatas = load_vectorstore()
+_snapshot = _load_snapshot()
+_reload_lock = threading.Lock()
+_reload_stats = {"reloads": 0, "failures": 0, "last_error": None}
 
 
-def extract_answer(block: str) -> str | None:
+def kb_snapshot() -> KBSnapshot:
+    return _snapshot
+
+
+def reload_vectorstore(force: bool = False) -> KBSnapshot:
     """
-    Extracts **Answer:** section from markdown chunk
+    Loads the current on-disk version (if it changed) and swaps it in.
+    Loading happens before the swap; searches never block on it.
     """
-    match = re.search(r"\*\*Answer:\*\*\s*(.+)", block)
-    return match.group(1).strip() if match else None
+    global _snapshot
+
+    with _reload_lock:
+        version = read_current_version() or "legacy"
+        if not force and version == _snapshot.version:
+            return _snapshot
+
+        try:
+            snapshot = _load_snapshot()
+        except Exception as e:
+            _reload_stats["failures"] += 1
+            _reload_stats["last_error"] = str(e)
+            raise
+
+        _snapshot = snapshot
+        _reload_stats["reloads"] += 1
+        logger.info("Knowledge base index reloaded: %s", snapshot.version)
+        return snapshot
+
 
+def kb_stats() -> dict:
+    snapshot = _snapshot
+    return {
+        "version": snapshot.version,
+        "chunks": int(snapshot.index.ntotal),
+        "index_type": snapshot.index_info.get("type"),
+        "loaded_at": snapshot.loaded_at,
+        **_reload_stats
+    }
 
-def extract_explanation(block: str) -> str | None:
+
+def _watch(interval: float):
+    last_seen = None
+
+    while True:
+        time.sleep(interval)
+        try:
+            stamp = CURRENT_PATH.stat().st_mtime_ns
+        except FileNotFoundError:
+            continue
+
+        if stamp == last_seen:
+            continue
+        last_seen = stamp
+
+        try:
+            reload_vectorstore()
+        except Exception:
+            logger.exception("Knowledge base reload failed")
+
+
+_watcher = None
+
+
+def start_vectorstore_watcher(interval: float = KB_RELOAD_INTERVAL):
     """
-    Extracts **Explanation:** section from markdown chunk
+    Polls the CURRENT pointer written by ingest and hot-swaps new
+    versions in a background thread. No-op when interval <= 0.
     """
-    match = re.search(
-        r"\*\*Explanation:\*\*(.+?)(?:\n\*\*Source:\*\*|\Z)",
-        block,
-        re.S
+    global _watcher
+
+    if interval <= 0 or _watcher is not None:
+        return
+
+    _watcher = threading.Thread(
+        target=_watch, args=(interval,), daemon=True, name="kb-watcher"
     )
-    return match.group(1).strip() if match else None
+    _watcher.start()
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
 
+def _tokens(text: str) -> set[str]:
+    return set(_TOKEN_RE.findall(text.lower()))
 
-def retrieve_context(query: str, top_k: int = 3):
+
+def lexical_score(query: str, block: str) -> float:
     """
-    Retrieves relevant KB chunks and extracts
-    answer + explanation independently.
+    Share of query tokens that appear in the chunk's question part.
     """
-    q_emb = model.encode([query], convert_to_numpy=True)
-    _, indices = index.search(q_emb, top_k)
+    query_tokens = _tokens(query)
+    if not query_tokens:
+        return 0.0
+    question = block.split("**Answer:**", 1)[0]
+    return len(query_tokens & _tokens(question)) / len(query_tokens)
+
 
+def _similarity(distance: float, metric: str) -> float:
+    # Unit vectors: squared L2 distance d relates to cosine as 1 - d/2
+    if metric == "ip":
+        return float(distance)
+    return 1.0 - float(distance) / 2.0
+
+
+def _build_results(
+    snapshot: KBSnapshot,
+    query: str,
+    distances_row,
+    indices_row,
+    top_k: int,
+    lexical_weight: float
+) -> list[dict]:
+    metric = snapshot.index_info.get("metric", "l2")
     results = []
-    for idx in indices[0]:
-        block = texts[idx]
 
-        results.append({
-            "raw": block,
-            "answer": extract_answer(block),
-            "explanation": extract_explanation(block),
-            "source": metadatas[idx]["source"]
-        })
+    for distance, idx in zip(distances_row, indices_row):
+        if idx < 0:
+            # Fewer candidates than requested in the index
+            continue
+
+        # Only the returned top-k are decoded; fields were parsed at ingest
+        record = snapshot.chunks.get(int(idx))
+        if record is None:
+            continue
+
+        similarity = _similarity(distance, metric)
+        result = dict(
+            record,
+            distance=float(distance),
+            similarity=similarity,
+            score=similarity
+        )
+
+        if lexical_weight > 0:
+            result["lexical"] = lexical_score(query, record["raw"])
+            result["score"] = (
+                (1 - lexical_weight) * similarity
+                + lexical_weight * result["lexical"]
+            )
+
+        results.append(result)
+
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return results[:top_k]
+
+
+def retrieve_context_batch(
+    queries: list[str],
+    top_k: int = 3,
+    query_embeddings=None,
+    snapshot: KBSnapshot | None = None,
+    lexical_weight: float = KB_LEXICAL_WEIGHT
+):
+    """
+    Retrieves KB chunks for many queries at once:
+    one batched encode and one index.search over the query matrix.
+    Pass `query_embeddings` to reuse vectors already computed upstream,
+    and `snapshot` to pin the index version the caller reports.
+
+    Each hit carries the raw FAISS `distance`, a cosine-equivalent
+    `similarity` and the final `score` (hybrid with lexical overlap
+    when `lexical_weight` > 0), best first.
+    """
+    if not queries:
+        return []
+
+    if snapshot is None:
+        snapshot = _snapshot
+
+    if query_embeddings is None:
+        query_embeddings = encode(queries)
+
+    # Inner-product indexes hold unit vectors: search with cosine
+    if snapshot.index_info.get("metric") == "ip":
+        query_embeddings = normalize(query_embeddings)
+
+    # Re-ranking needs a deeper candidate list than it returns
+    depth = max(top_k, KB_RERANK_DEPTH) if lexical_weight > 0 else top_k
+    distances, indices = snapshot.index.search(query_embeddings, depth)
 
-    return results
+    return [
+        _build_results(snapshot, query, d_row, i_row, top_k, lexical_weight)
+        for query, d_row, i_row in zip(queries, distances, indices)
+    ]
+
+
+def retrieve_context(query: str, top_k: int = 3, lexical_weight: float = KB_LEXICAL_WEIGHT):
+    """
+    Retrieves relevant KB chunks and extracts
+    answer + explanation independently.
+    """
+    return retrieve_context_batch([query], top_k, lexical_weight=lexical_weight)[0]
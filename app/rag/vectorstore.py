@@ -1,25 +1,274 @@
 import faiss
+import hashlib
+import json
+import logging
+import numpy as np
+import os
 import pickle
+import time
 from pathlib import Path
 
+from app.rag.chunkstore import (
+    ChunkStore,
+    InMemoryChunkStore,
+    parse_chunk,
+    write_chunk_store
+)
+from app.config import (
+    KB_IVF_NPROBE,
+    KB_PQ_M,
+    KB_HNSW_M,
+    KB_HNSW_EF_SEARCH
+)
+
 # Resolve paths relative to /app
 BASE_DIR = Path(__file__).resolve().parents[1]  # points to app/
 VECTORSTORE_PATH = BASE_DIR / "data" / "vectorstore"
 
+# Each ingest writes a new version:
+#   index-<v>.faiss     ID-mapped FAISS index
+#   chunks-<v>.bin      pre-parsed chunk records, concatenated JSON
+#   chunks-<v>.idx      sorted (id, offset, length) table into chunks-<v>.bin
+#   info-<v>.json       index type / metric, read by the retriever
+#   manifest-<v>.json   per-chunk content hashes, read by ingest
+# and then atomically repoints CURRENT at it. Versions from before the
+# chunk store carry meta-<v>.pkl instead; without CURRENT the legacy
+# positional index.faiss / meta.pkl pair is loaded.
+CURRENT_PATH = VECTORSTORE_PATH / "CURRENT"
+
+# Versions kept on disk besides the current one (for readers mid-load)
+KEEP_PREVIOUS_VERSIONS = 1
+
+logger = logging.getLogger(__name__)
+
+
+INDEX_TYPES = ("flat_l2", "flat_ip", "ivf_flat", "ivf_pq", "hnsw")
+
+# Smallest corpus each trained type is built for; below it the next
+# simpler type is used (IVF wants ~39 points per list, PQ 256 per code).
+_MIN_TRAIN = {"ivf_pq": 256 * 39, "ivf_flat": 2 * 39}
+_FALLBACK = {"ivf_pq": "ivf_flat", "ivf_flat": "flat_ip"}
+
+
+def index_metric(index_type: str) -> str:
+    return "l2" if index_type == "flat_l2" else "ip"
+
+
+def supports_remove(index_type: str) -> bool:
+    # HNSW graphs cannot drop vectors; removals force a rebuild
+    return index_type != "hnsw"
+
+
+def normalize(embeddings: np.ndarray) -> np.ndarray:
+    embeddings = np.array(embeddings, dtype=np.float32, copy=True)
+    faiss.normalize_L2(embeddings)
+    return embeddings
+
+
+def _pq_subquantizers(dim: int) -> int:
+    m = min(KB_PQ_M, dim)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def _factory_string(index_type: str, n: int, dim: int) -> str:
+    if index_type in ("flat_l2", "flat_ip"):
+        return "IDMap2,Flat"
+    if index_type == "hnsw":
+        return f"IDMap2,HNSW{KB_HNSW_M}"
+
+    # ~4·sqrt(n) inverted lists, each with enough training points
+    nlist = max(2, min(int(4 * n ** 0.5), n // 39))
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    return f"IVF{nlist},PQ{_pq_subquantizers(dim)}"
+
+
+def build_index(index_type: str, embeddings: np.ndarray, ids: np.ndarray):
+    """
+    Creates, trains and fills an index of the requested type.
+    Returns (index, built_type); trained types fall back to simpler
+    ones when the corpus is too small to train them.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+
+    n, dim = embeddings.shape
+    while n < _MIN_TRAIN.get(index_type, 0):
+        index_type = _FALLBACK[index_type]
+
+    metric = index_metric(index_type)
+    if metric == "ip":
+        embeddings = normalize(embeddings)
+
+    index = faiss.index_factory(
+        dim,
+        _factory_string(index_type, n, dim),
+        faiss.METRIC_INNER_PRODUCT if metric == "ip" else faiss.METRIC_L2
+    )
+
+    if not index.is_trained:
+        index.train(embeddings)
+
+    index.add_with_ids(embeddings, np.asarray(ids, dtype=np.int64))
+    configure_search(index)
 
-def load_vectorstore():
-    index_path = VECTORSTORE_PATH / "index.faiss"
-    meta_path = VECTORSTORE_PATH / "meta.pkl"
+    return index, index_type
+
+
+def configure_search(index):
+    """
+    Applies query-time knobs (nprobe, efSearch); unknown ones are
+    ignored by index types that do not have them.
+    """
+    params = faiss.ParameterSpace()
+    for name, value in (("nprobe", KB_IVF_NPROBE), ("efSearch", KB_HNSW_EF_SEARCH)):
+        try:
+            params.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass
+
+
+def read_current_version():
+    if not CURRENT_PATH.exists():
+        return None
+    return CURRENT_PATH.read_text().strip() or None
+
+
+def _atomic_write(path: Path, write):
+    """
+    Writes via a temp file in the same directory, fsyncs, then renames.
+    `write` receives the open binary file.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _prune_old_versions(current: str):
+    versions = sorted(
+        {p.stem.split("-", 1)[1] for p in VECTORSTORE_PATH.glob("manifest-*.json")},
+        reverse=True
+    )
+    stale = [v for v in versions if v != current][KEEP_PREVIOUS_VERSIONS:]
+
+    for version in stale:
+        # The manifest goes last: while it exists the version is found
+        # again, so files still held open (Windows will not delete a
+        # mapped file) are retried by the next build
+        manifest = VECTORSTORE_PATH / f"manifest-{version}.json"
+        paths = [p for p in VECTORSTORE_PATH.glob(f"*-{version}.*") if p != manifest]
+        if all([_unlink(path) for path in paths]):
+            _unlink(manifest)
+
+
+def _unlink(path: Path) -> bool:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning("Could not remove old index file %s: %s", path, e)
+        return False
+    return True
+
+
+def write_vectorstore(index, chunks: dict, index_info: dict) -> str:
+    """
+    Persists a new vectorstore version and makes it current.
+    `chunks` maps FAISS id -> {"text", "source", "type", "hash"};
+    `index_info` describes the index (type, metric, training size).
+    """
+    VECTORSTORE_PATH.mkdir(parents=True, exist_ok=True)
+
+    digest = hashlib.sha256(
+        "".join(sorted(c["hash"] for c in chunks.values())).encode()
+    ).hexdigest()
+    version = f"{int(time.time())}-{digest[:8]}"
+
+    info = {
+        "version": version,
+        "index": index_info,
+        "chunks": len(chunks)
+    }
+    manifest = {
+        "version": version,
+        "index": index_info,
+        "chunks": {
+            str(cid): {"hash": c["hash"], "source": c["source"]}
+            for cid, c in chunks.items()
+        }
+    }
+
+    _atomic_write(
+        VECTORSTORE_PATH / f"index-{version}.faiss",
+        lambda f: f.write(faiss.serialize_index(index).tobytes())
+    )
+    write_chunk_store(
+        VECTORSTORE_PATH / f"chunks-{version}.bin",
+        VECTORSTORE_PATH / f"chunks-{version}.idx",
+        {cid: parse_chunk(c["text"], c["source"]) for cid, c in chunks.items()},
+        _atomic_write
+    )
+    _atomic_write(
+        VECTORSTORE_PATH / f"info-{version}.json",
+        lambda f: f.write(json.dumps(info).encode("utf-8"))
+    )
+    _atomic_write(
+        VECTORSTORE_PATH / f"manifest-{version}.json",
+        lambda f: f.write(json.dumps(manifest).encode("utf-8"))
+    )
+
+    # Readers switch only once every file of the version is in place
+    _atomic_write(CURRENT_PATH, lambda f: f.write(version.encode("utf-8")))
+
+    _prune_old_versions(version)
+    return version
+
+
+def load_vectorstore(version: str | None = None):
+    """
+    Loads the given version, or the current one when omitted.
+    Returns (index, chunk_store, index_info).
+    """
+    if version is None:
+        version = read_current_version()
+
+    if version is not None:
+        index_path = VECTORSTORE_PATH / f"index-{version}.faiss"
+        meta_path = VECTORSTORE_PATH / f"meta-{version}.pkl"
+    else:
+        index_path = VECTORSTORE_PATH / "index.faiss"
+        meta_path = VECTORSTORE_PATH / "meta.pkl"
 
     if not index_path.exists():
         raise FileNotFoundError(
             f"FAISS index not found at {index_path}. "
-            "Run `python app/rag/ingest.py` first."
+            "Run `python -m app.rag.ingest` first."
         )
 
     index = faiss.read_index(str(index_path))
+    configure_search(index)
+
+    info_path = VECTORSTORE_PATH / f"info-{version}.json"
+    if version is not None and info_path.exists():
+        info = json.loads(info_path.read_text())
+        chunks = ChunkStore(
+            VECTORSTORE_PATH / f"chunks-{version}.bin",
+            VECTORSTORE_PATH / f"chunks-{version}.idx"
+        )
+        return index, chunks, info["index"]
 
     with open(meta_path, "rb") as f:
         meta = pickle.load(f)
 
-    return index, meta["texts"], meta["metadatas"]
+    # Pickled stores: keyed by FAISS id when versioned, by position when
+    # legacy (a raw IndexFlatL2)
+    index_info = meta.get("index", {"type": "flat_l2", "metric": "l2"})
+    chunks = InMemoryChunkStore(meta["texts"], meta["metadatas"])
+
+    return index, chunks, index_info
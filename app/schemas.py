@@ -7,6 +7,7 @@ class ParseResponse(BaseModel):
     parsed_problem: dict
     confidence: str
     needs_hitl: bool
+    ocr: Optional[dict] = None
 
 
 class AnswerSchema(BaseModel):
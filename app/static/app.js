@@ -70,7 +70,7 @@ async function parseInput() {
 }
 
 /* =========================================================
-   SOLVE
+   SOLVE (STREAMED: one NDJSON event per line)
    ========================================================= */
 async function solveProblem() {
   if (!parsedProblem) {
@@ -78,14 +78,41 @@ async function solveProblem() {
     return;
   }
 
-  const res = await fetch("/solve", {
+  const res = await fetch("/solve/stream", {
     method: "POST",
     headers: { "Content-Type": "application/json" },
     body: JSON.stringify(parsedProblem)
   });
 
-  solvedResult = await res.json();
-  renderResults(solvedResult);
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({}));
+    clearResults();
+    document.getElementById("answerText").textContent =
+      err.error || `Solve failed (${res.status})`;
+    return;
+  }
+
+  solvedResult = { results: [] };
+  clearResults();
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+
+    lines.filter((line) => line.trim()).forEach((line) => {
+      handleSolveEvent(JSON.parse(line));
+    });
+  }
+
+  if (buffer.trim()) handleSolveEvent(JSON.parse(buffer));
 }
 
 /* Audio solve shortcut */
@@ -93,64 +120,137 @@ function solveFromAudio() {
   parseInput().then(solveProblem);
 }
 
-/* =========================================================
-   RENDER RESULTS
-   ========================================================= */
-function renderResults(data) {
-  const answerTextEl = document.getElementById("answerText");
-  const answerLatexEl = document.getElementById("answerLatex");
-  const ctxEl = document.getElementById("supportingContext");
+function handleSolveEvent(event) {
   const sysInfoEl = document.getElementById("systemInfo");
 
-  answerTextEl.innerHTML = "";
-  answerLatexEl.innerHTML = "";
-  ctxEl.innerHTML = "";
-  sysInfoEl.textContent = "";
+  if (event.event === "start") {
+    solvedResult.total_problems = event.total_problems;
+    solvedResult.kb_index_version = event.kb_index_version;
+    sysInfoEl.textContent = `Solving ${event.total_problems} problem(s)...`;
 
-  if (!data.results || data.results.length === 0) {
-    answerTextEl.textContent = "No results returned.";
-    return;
+    if (event.total_problems === 0) {
+      document.getElementById("answerText").textContent = "No results returned.";
+    }
   }
 
-  sysInfoEl.textContent = `Total problems solved: ${data.total_problems}`;
+  else if (event.event === "result") {
+    solvedResult.results[event.index] = event.result;
+    renderResult(event.result, event.index);
+    renderExplanation(event.result, event.index);
+  }
 
-  data.results.forEach((item, index) => {
-    const block = document.createElement("div");
-    block.className = "result-block";
+  else if (event.event === "explanation") {
+    const item = solvedResult.results[event.index];
+    if (!item) return;
+    item.explanation = event.explanation;
+    item.source = { ...(item.source || {}), explanation: event.source };
+    renderExplanation(item, event.index);
+  }
 
-    block.innerHTML = `
-      <p><strong>Q${index + 1}:</strong> ${item.question}</p>
-      <p><strong>Answer:</strong> ${item.final_answer.text}</p>
-      <p class="source">Source: ${item.source?.answer || item.source}</p>
-    `;
+  else if (event.event === "error") {
+    sysInfoEl.textContent = `${event.error}: ${event.details}`;
+  }
 
-    if (item.final_answer.latex) {
-      const latexDiv = document.createElement("div");
-      latexDiv.innerHTML = `$$${item.final_answer.latex}$$`;
-      block.appendChild(latexDiv);
-    }
+  else if (event.event === "done") {
+    Object.assign(solvedResult, {
+      retrieval_ms: event.retrieval_ms,
+      cache_hits: event.cache_hits
+    });
+    sysInfoEl.textContent =
+      `Total problems solved: ${solvedResult.total_problems} ` +
+      `(first result ${event.time_to_first_result_ms ?? "-"} ms, ` +
+      `all done ${event.total_ms} ms)`;
+  }
+}
 
-    answerTextEl.appendChild(block);
-  });
+/* =========================================================
+   RENDER RESULTS (one block per problem, in problem order)
+   ========================================================= */
+function clearResults() {
+  document.getElementById("answerText").innerHTML = "";
+  document.getElementById("answerLatex").innerHTML = "";
+  document.getElementById("supportingContext").innerHTML = "";
+  document.getElementById("systemInfo").textContent = "";
+}
 
-  data.results.forEach((item, index) => {
-    if (!item.explanation) return;
+/* Returns the block for problem `index`, creating it in order */
+function slotFor(container, prefix, index) {
+  const id = `${prefix}-${index}`;
+  let block = document.getElementById(id);
+  if (block) return block;
 
-    const expBlock = document.createElement("div");
-    expBlock.className = "result-block";
+  block = document.createElement("div");
+  block.id = id;
+  block.className = "result-block";
+  block.dataset.index = index;
 
-    expBlock.innerHTML = `
+  const next = [...container.children].find(
+    (el) => Number(el.dataset.index) > index
+  );
+  container.insertBefore(block, next || null);
+  return block;
+}
+
+function renderResult(item, index) {
+  const block = slotFor(document.getElementById("answerText"), "result", index);
+
+  block.innerHTML = `
+    <p><strong>Q${index + 1}:</strong> ${item.question}</p>
+    <p><strong>Answer:</strong> ${item.final_answer.text}</p>
+    <p class="source">Source: ${item.source?.answer || item.source}</p>
+  `;
+
+  if (item.final_answer.latex) {
+    const latexDiv = document.createElement("div");
+    latexDiv.innerHTML = `$$${item.final_answer.latex}$$`;
+    block.appendChild(latexDiv);
+  }
+
+  if (window.MathJax) {
+    MathJax.typesetPromise([block]);
+  }
+}
+
+function renderExplanation(item, index) {
+  if (!item.explanation && !item.explanation_id) return;
+
+  const block = slotFor(
+    document.getElementById("supportingContext"), "explanation", index
+  );
+
+  /* Lazy explanation: fetched only when asked for */
+  if (!item.explanation) {
+    block.innerHTML = `
       <p><strong>Q${index + 1} – Explanation:</strong></p>
-      <p>${item.explanation}</p>
-      <p class="source">Source: ${item.source?.explanation || item.source}</p>
+      <button>Explain</button>
     `;
+    block.querySelector("button").onclick = () => fetchExplanation(item, index);
+    return;
+  }
 
-    ctxEl.appendChild(expBlock);
-  });
+  block.innerHTML = `
+    <p><strong>Q${index + 1} – Explanation:</strong></p>
+    <p>${item.explanation}</p>
+    <p class="source">Source: ${item.source?.explanation || item.source}</p>
+  `;
+}
 
-  if (window.MathJax) {
-    MathJax.typesetPromise();
+async function fetchExplanation(item, index) {
+  const block = document.getElementById(`explanation-${index}`);
+  block.querySelector("button").disabled = true;
+
+  const res = await fetch(`/explain/${item.explanation_id}`);
+  const data = await res.json().catch(() => ({}));
+
+  if (!res.ok) {
+    block.querySelector("button").disabled = false;
+    alert(data.error || `Explain failed (${res.status})`);
+    return;
   }
+
+  item.explanation = data.explanation;
+  item.source = { ...(item.source || {}), explanation: data.source };
+  renderExplanation(item, index);
 }
 
 /* =========================================================
@@ -0,0 +1,313 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+class LRUCache:
+    """
+    Thread-safe in-process cache with size-based LRU eviction and an
+    optional TTL (seconds, None = never expires).
+    """
+
+    def __init__(self, max_entries: int, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.max_entries <= 0:
+            return
+
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class SQLiteCache:
+    """
+    JSON key/value cache in a SQLite file, shared by every worker on
+    the host. Expired rows are dropped on read; the least recently used
+    rows are evicted once the table outgrows `max_entries`.
+    """
+
+    # Eviction runs every this many writes rather than on each one
+    _EVICT_EVERY = 64
+
+    def __init__(self, path, table: str, max_entries: int, ttl: float | None = None):
+        self.path = Path(path)
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._local = threading.local()
+        # Guards the counters; get/set run on several io-pool threads
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread; WAL lets workers read while one writes
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        now = time.time()
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or (row[1] is not None and row[1] < now):
+                if row is not None:
+                    conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._count("misses")
+                return None
+
+            conn.execute(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        except sqlite3.Error:
+            # A busy or broken shared tier must never fail a request
+            self._count("misses")
+            return None
+
+        self._count("hits")
+        return json.loads(row[0])
+
+    def _count(self, counter: str, n: int = 1) -> int:
+        with self._lock:
+            value = getattr(self, counter) + n
+            setattr(self, counter, value)
+            return value
+
+    def set(self, key: str, value):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        try:
+            conn = self._connect()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now)
+            )
+
+            if self._count("_writes") % self._EVICT_EVERY == 0:
+                self._evict(conn, now)
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn, now: float):
+        conn.execute(
+            f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at < ?",
+            (now,)
+        )
+        evicted = conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY accessed_at DESC "
+            "LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        if evicted > 0:
+            self._count("evictions", evicted)
+
+    def clear(self):
+        self._connect().execute(f"DELETE FROM {self.table}")
+
+    def stats(self) -> dict:
+        try:
+            entries = self._connect().execute(
+                f"SELECT COUNT(*) FROM {self.table}"
+            ).fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+
+        with self._lock:
+            hits, misses, evictions = self.hits, self.misses, self.evictions
+
+        lookups = hits + misses
+        return {
+            "path": os.fspath(self.path),
+            "entries": entries,
+            "hits": hits,
+            "misses": misses,
+            "evictions": evictions,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class TieredCache:
+    """
+    In-process LRU in front of an optional shared SQLite tier.
+    Shared hits are promoted into the local tier.
+    """
+
+    def __init__(self, local: LRUCache, shared: SQLiteCache | None = None):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key: str):
+        value = self.local.get(key)
+        if value is not None or self.shared is None:
+            return value
+
+        value = self.shared.get(key)
+        if value is not None:
+            self.local.set(key, value)
+        return value
+
+    def set(self, key: str, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self) -> dict:
+        return {
+            "local": self.local.stats(),
+            "shared": self.shared.stats() if self.shared is not None else None
+        }
+
+
+class HammingCache:
+    """
+    Bounded LRU keyed by perceptual hashes (ints). get() returns the
+    nearest entry within `max_distance` differing bits, so near-equal
+    inputs share an entry. Lookups scan every entry: keep it small.
+    """
+
+    def __init__(self, max_entries: int, max_distance: int, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.exact_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: int, accept=None):
+        """
+        (distance, value) of the nearest live entry for which
+        accept(value) holds, or None.
+        """
+        now = time.time()
+        with self._lock:
+            best = None
+            expired = []
+            for other, (expires_at, value) in self._data.items():
+                if expires_at is not None and expires_at < now:
+                    expired.append(other)
+                    continue
+                distance = (key ^ other).bit_count()
+                if distance > self.max_distance or (best is not None and distance >= best[0]):
+                    continue
+                if accept is None or accept(value):
+                    best = (distance, other, value)
+            for other in expired:
+                del self._data[other]
+
+            if best is None:
+                self.misses += 1
+                return None
+
+            distance, other, value = best
+            self._data.move_to_end(other)
+            self.hits += 1
+            if distance == 0:
+                self.exact_hits += 1
+            return distance, value
+
+    def set(self, key: int, value):
+        if self.max_entries <= 0:
+            return
+
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "exact_hits": self.exact_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
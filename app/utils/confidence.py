@@ -1,4 +1,9 @@
-def assess_confidence(text: str) -> str:
+from app.config import OCR_MIN_CONFIDENCE
+
+
+def assess_confidence(text: str, ocr_confidence: float | None = None) -> str:
     if not text or len(text) < 15:
         return "low"
+    if ocr_confidence is not None and ocr_confidence < OCR_MIN_CONFIDENCE:
+        return "low"
     return "high"
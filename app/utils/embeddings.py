@@ -0,0 +1,60 @@
+import threading
+
+import numpy as np
+
+from app.config import EMBEDDING_MODEL_NAME, EMBEDDING_BATCH_SIZE
+
+# One SentenceTransformer per process, shared by RAG, memory and ingest.
+_model = None
+_lock = threading.Lock()
+
+
+def get_model():
+    """
+    Returns the process-wide embedding model, loading it on first use.
+    """
+    global _model
+
+    if _model is None:
+        with _lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+    return _model
+
+
+def is_loaded() -> bool:
+    return _model is not None
+
+
+def warm_up():
+    """
+    Loads the model ahead of the first request.
+    Safe to call from a background thread.
+    """
+    get_model()
+
+
+def encode(texts, batch_size: int = EMBEDDING_BATCH_SIZE) -> np.ndarray:
+    """
+    Encodes one text or a list of texts in a single batched call.
+    Always returns a float32 matrix of shape (len(texts), dim).
+    """
+    if isinstance(texts, str):
+        texts = [texts]
+
+    model = get_model()
+
+    if not texts:
+        dim = model.get_sentence_embedding_dimension()
+        return np.zeros((0, dim), dtype=np.float32)
+
+    embeddings = model.encode(
+        list(texts),
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        show_progress_bar=False
+    )
+
+    return np.asarray(embeddings, dtype=np.float32)
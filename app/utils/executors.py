@@ -0,0 +1,271 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from app.config import (
+    IO_POOL_WORKERS,
+    CPU_POOL_WORKERS,
+    IO_POOL_MAX_PENDING,
+    CPU_POOL_MAX_PENDING,
+    SOLVER_POOL_WORKERS,
+    SYMBOLIC_WORKERS,
+    SYMBOLIC_TIMEOUT,
+    SYMBOLIC_MAX_RSS_MB
+)
+from app.utils.sandbox import SandboxPool
+
+
+class ExecutorSaturated(RuntimeError):
+    """
+    Raised when a pool already has its maximum number of pending tasks.
+    The API turns this into a 503 so clients back off.
+    """
+
+
+class BoundedExecutor:
+    """
+    Wraps an executor with a cap on running + queued tasks.
+    Submissions beyond the cap fail fast instead of piling up.
+    """
+
+    def __init__(self, name: str, executor, max_pending: int):
+        self.name = name
+        self._executor = executor
+        self._max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pending = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ExecutorSaturated(f"{self.name} pool is saturated")
+
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self._pending += 1
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+        self._slots.release()
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "max_pending": self._max_pending,
+                "rejected": self._rejected
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_io_pool = None
+_cpu_pool = None
+_solver_pool = None
+_symbolic_pool = None
+_pools_lock = threading.Lock()
+
+
+def io_pool() -> BoundedExecutor:
+    """
+    Thread pool for network calls and work that releases the GIL
+    (embedding, FAISS, the solver pipeline).
+    """
+    global _io_pool
+
+    if _io_pool is None:
+        with _pools_lock:
+            if _io_pool is None:
+                _io_pool = BoundedExecutor(
+                    "io",
+                    ThreadPoolExecutor(
+                        max_workers=IO_POOL_WORKERS,
+                        thread_name_prefix="quantix-io"
+                    ),
+                    IO_POOL_MAX_PENDING
+                )
+
+    return _io_pool
+
+
+def cpu_pool() -> BoundedExecutor:
+    """
+    Process pool for pure CPU-bound functions (OCR).
+    Tasks must be picklable top-level functions. Workers are spawned,
+    not forked, so they never inherit torch/FAISS thread state.
+    """
+    global _cpu_pool
+
+    if _cpu_pool is None:
+        with _pools_lock:
+            if _cpu_pool is None:
+                _cpu_pool = BoundedExecutor(
+                    "cpu",
+                    ProcessPoolExecutor(
+                        max_workers=CPU_POOL_WORKERS,
+                        mp_context=multiprocessing.get_context("spawn")
+                    ),
+                    CPU_POOL_MAX_PENDING
+                )
+
+    return _cpu_pool
+
+
+def solver_pool() -> ThreadPoolExecutor:
+    """
+    Threads for sub-problem fan-out inside solve_problem.
+    Kept apart from the io pool so a request running there can
+    wait on its sub-problems without starving itself.
+    """
+    global _solver_pool
+
+    if _solver_pool is None:
+        with _pools_lock:
+            if _solver_pool is None:
+                _solver_pool = ThreadPoolExecutor(
+                    max_workers=SOLVER_POOL_WORKERS,
+                    thread_name_prefix="quantix-solver"
+                )
+
+    return _solver_pool
+
+
+def symbolic_pool() -> SandboxPool | None:
+    """
+    Sandboxed processes for SymPy work, with SymPy already imported.
+    None when SYMBOLIC_WORKERS is 0 (solve in-process, no budgets).
+    """
+    global _symbolic_pool
+
+    if _symbolic_pool is None and SYMBOLIC_WORKERS > 0:
+        with _pools_lock:
+            if _symbolic_pool is None:
+                _symbolic_pool = SandboxPool(
+                    "symbolic",
+                    SYMBOLIC_WORKERS,
+                    SYMBOLIC_TIMEOUT,
+                    SYMBOLIC_MAX_RSS_MB,
+                    preload=("sympy", "app.agents.symbolic")
+                )
+
+    return _symbolic_pool
+
+
+async def run_io(fn, *args, **kwargs):
+    return await io_pool().run(fn, *args, **kwargs)
+
+
+async def run_cpu(fn, *args, **kwargs):
+    return await cpu_pool().run(fn, *args, **kwargs)
+
+
+async def run_cpu_all(calls: list[tuple]) -> list:
+    """
+    Results of (fn, *args) calls run concurrently on the cpu pool, in
+    order. All of them are submitted or none: when the pool fills up
+    part-way, the submitted ones are cancelled (or, if already running,
+    awaited) before ExecutorSaturated propagates. A failing call
+    re-raises only once its siblings are done, so none outlives the
+    request.
+    """
+    pool = cpu_pool()
+    futures = []
+    try:
+        for fn, *args in calls:
+            futures.append(pool.submit(fn, *args))
+    except ExecutorSaturated:
+        for future in futures:
+            future.cancel()
+        await asyncio.gather(
+            *(asyncio.wrap_future(f) for f in futures), return_exceptions=True
+        )
+        raise
+
+    results = await asyncio.gather(
+        *(asyncio.wrap_future(f) for f in futures), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+def stream_io(fn, *args, **kwargs):
+    """
+    Runs the blocking generator fn(*args, **kwargs) on the io pool and
+    returns an async iterator over its items as they are produced.
+
+    The task is submitted right away, so ExecutorSaturated is raised
+    here rather than mid-stream. Closing the iterator early stops the
+    generator at its next item.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(kind, value):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+        except RuntimeError:
+            # Event loop already closed (shutdown)
+            stop.set()
+
+    def pump():
+        try:
+            for item in fn(*args, **kwargs):
+                if stop.is_set():
+                    return
+                put("item", item)
+        except Exception as e:
+            put("error", e)
+        else:
+            put("end", None)
+
+    io_pool().submit(pump)
+
+    async def drain():
+        try:
+            while True:
+                kind, value = await queue.get()
+                if kind == "end":
+                    return
+                if kind == "error":
+                    raise value
+                yield value
+        finally:
+            stop.set()
+
+    return drain()
+
+
+def shutdown_pools():
+    global _io_pool, _cpu_pool, _solver_pool, _symbolic_pool
+
+    with _pools_lock:
+        for pool in (_io_pool, _cpu_pool):
+            if pool is not None:
+                pool.shutdown()
+        if _solver_pool is not None:
+            _solver_pool.shutdown(wait=False, cancel_futures=True)
+        if _symbolic_pool is not None:
+            _symbolic_pool.shutdown()
+        _io_pool = None
+        _cpu_pool = None
+        _solver_pool = None
+        _symbolic_pool = None
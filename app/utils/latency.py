@@ -0,0 +1,38 @@
+import threading
+from collections import deque
+
+
+class LatencyWindow:
+    """
+    Recent latencies (ms) with percentile summaries for /metrics.
+    Only the last `size` samples are kept.
+    """
+
+    def __init__(self, size: int = 1000):
+        self._samples = deque(maxlen=size)
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def record(self, ms: float):
+        with self._lock:
+            self._samples.append(ms)
+            self._count += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._samples)
+            count = self._count
+
+        if not ordered:
+            return {"count": count}
+
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 2)
+
+        return {
+            "count": count,
+            "p50": pct(50),
+            "p95": pct(95),
+            "p99": pct(99),
+            "max": round(ordered[-1], 2)
+        }
@@ -1,9 +1,61 @@
-from PIL import Image
-import pytesseract
-import cv2
-import numpy as np
+"""
+OCR engine for uploaded photos of printed problems.
+
+Pipeline:
+  1. decode straight to grayscale, at 1/2, 1/4 or 1/8 scale when the
+     photo is far above the target resolution (JPEG decodes scaled DCT
+     blocks, so this is cheaper than a full decode), then INTER_AREA
+     down to OCR_TARGET_DPI;
+  2. Otsu binarization;
+  3. text-line detection from the horizontal ink profile;
+  4. Tesseract on each line (--psm 7), with lines spread over the cpu
+     pool by ocr_image(). A page where no clean lines are found is
+     read whole (--psm 6).
+
+Between 3 and 4, when OCR_DEDUP_SIZE is set, a perceptual hash of the
+page's ink region is looked up among recent pages. A near match is only
+a candidate: the hash cannot see glyph-level differences (another
+number in the same layout), so a few of its lines are read again and
+must give the same text before another photo of the same printed sheet
+reuses that page's result.
+
+Recognition prefers tesserocr: each worker process keeps its engines
+initialized (language data loaded once) and hands them raw pixel
+buffers. pytesseract, which starts the tesseract binary and writes a
+temp image per read, is the fallback.
+"""
+
 import io
 import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass, field, replace
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+from app.config import (
+    CPU_POOL_WORKERS,
+    OCR_TARGET_DPI,
+    OCR_PAGE_INCHES,
+    OCR_BACKEND,
+    OCR_LANG,
+    OCR_TESSDATA,
+    OCR_DEDUP_SIZE,
+    OCR_DEDUP_MAX_DISTANCE,
+    OCR_DEDUP_TTL,
+    OCR_DEDUP_VERIFY_LINES
+)
+from app.utils.cache import HammingCache
+from app.utils.executors import run_cpu, run_cpu_all
 
 # Windows-only: set tesseract path if needed
 if os.name == "nt":
@@ -11,49 +63,471 @@ if os.name == "nt":
         r"C:\Program Files\Tesseract-OCR\tesseract.exe"
     )
 
+_REDUCED_DECODE = (
+    (8, cv2.IMREAD_REDUCED_GRAYSCALE_8),
+    (4, cv2.IMREAD_REDUCED_GRAYSCALE_4),
+    (2, cv2.IMREAD_REDUCED_GRAYSCALE_2)
+)
+
+
+@dataclass(frozen=True)
+class OCRLine:
+    text: str
+    confidence: float
+    # x, y, width, height in the downscaled page
+    box: tuple[int, int, int, int]
+
+
+@dataclass(frozen=True)
+class OCRResult:
+    text: str
+    confidence: float
+    lines: list[OCRLine]
+    timing_ms: dict = field(default_factory=dict)
+    backend: str = ""
+    phash: str = ""
+    # Set when the result was reused from a near-identical page
+    duplicate_distance: int | None = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+# ─────────────────────────────────────────────
+# Preprocessing
+# ─────────────────────────────────────────────
+
+def _max_side() -> int:
+    return int(OCR_TARGET_DPI * OCR_PAGE_INCHES)
+
+
+def decode_gray(image_bytes: bytes, max_side: int | None = None) -> np.ndarray:
+    """
+    Grayscale page with its long side at most `max_side` pixels.
+    """
+    max_side = max_side or _max_side()
+    flag = cv2.IMREAD_GRAYSCALE
+
+    try:
+        # Reads the header only
+        long_side = max(Image.open(io.BytesIO(image_bytes)).size)
+    except Exception:
+        long_side = 0
+    for factor, reduced in _REDUCED_DECODE:
+        if long_side // factor >= max_side:
+            flag = reduced
+            break
+
+    gray = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), flag)
+    if gray is None:
+        raise ValueError("Unreadable image")
+
+    scale = max_side / max(gray.shape)
+    if scale < 1:
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def binarize(gray: np.ndarray) -> np.ndarray:
+    # Preprocessing (IMPORTANT for math text): black text on white
+    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def detect_lines(binary: np.ndarray, pad: int = 4) -> list[tuple[int, int, int, int]]:
+    """
+    Text-line boxes (x, y, w, h), top to bottom, from rows containing
+    ink. An empty list means no clean line structure (skewed photo,
+    dark borders); the caller then reads the page whole.
+    """
+    height, width = binary.shape
+    ink = binary == 0
+    rows = ink.sum(axis=1)
+
+    on = rows >= max(2, width // 500)
+    edges = np.diff(on.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+
+    # Join bands split by small gaps (i dots, exponents, fraction bars)
+    gap = max(2, height // 400)
+    bands = []
+    for start, end in zip(starts, ends):
+        if bands and start - bands[-1][1] <= gap:
+            bands[-1][1] = end
+        else:
+            bands.append([start, end])
+
+    min_height = max(6, height // 200)
+    boxes = []
+    for start, end in bands:
+        if end - start < min_height:
+            continue
+        if end - start > height // 3:
+            return []
+        columns = np.flatnonzero(ink[start:end].any(axis=0))
+        x0 = max(0, columns[0] - pad)
+        x1 = min(width, columns[-1] + 1 + pad)
+        y0 = max(0, start - pad)
+        y1 = min(height, end + pad)
+        boxes.append((int(x0), int(y0), int(x1 - x0), int(y1 - y0)))
+
+    return boxes
+
+
+def phash(binary: np.ndarray, boxes: list) -> int:
+    """
+    DCT hash of the region holding the text lines (the whole page
+    without lines): one bit per low-frequency AC coefficient, set when
+    it is above their median. Cropping to the ink first makes it
+    indifferent to framing and margins.
+    """
+    if boxes:
+        x0 = min(x for x, _, _, _ in boxes)
+        y0 = min(y for _, y, _, _ in boxes)
+        x1 = max(x + w for x, _, w, _ in boxes)
+        y1 = max(y + h for _, y, _, h in boxes)
+        binary = binary[y0:y1, x0:x1]
+
+    small = cv2.resize(binary, (32, 32), interpolation=cv2.INTER_AREA)
+    low = cv2.dct(small.astype(np.float32))[:8, :8].flatten()[1:]
+    bits = low > np.median(low)
+
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def preprocess(image_bytes: bytes) -> tuple[list[np.ndarray], list, dict, int]:
+    """
+    (crops, line boxes, timings, perceptual hash). Runs in a cpu-pool
+    worker. Crops are the binarized line images, or the whole binary
+    page when no lines were found (boxes empty); only they travel back
+    to the parent, not the page.
+    """
+    start = time.perf_counter()
+    gray = decode_gray(image_bytes)
+    decoded = time.perf_counter()
+    binary = binarize(gray)
+    boxes = detect_lines(binary)
+    lined = time.perf_counter()
+    page_hash = phash(binary, boxes)
+    done = time.perf_counter()
+
+    if boxes:
+        crops = [np.ascontiguousarray(_crop(binary, box)) for box in boxes]
+    else:
+        crops = [binary]
+
+    return crops, boxes, {
+        "decode_ms": round((decoded - start) * 1000, 2),
+        "lines_ms": round((lined - decoded) * 1000, 2),
+        "hash_ms": round((done - lined) * 1000, 2)
+    }, page_hash
+
+
+# ─────────────────────────────────────────────
+# Near-duplicate pages
+# ─────────────────────────────────────────────
+
+_dedup = None
+_dedup_lock = threading.Lock()
+_dedup_counts = {"bypassed": 0, "confirmed": 0, "rejected": 0}
+
+# Characters worth re-reading a line for: where two sheets with the
+# same layout differ
+_MATH_CHARS = re.compile(r"[0-9=+\-*/^()]")
+
+
+def ocr_dedup_cache() -> HammingCache:
+    global _dedup
+
+    if _dedup is None:
+        with _dedup_lock:
+            if _dedup is None:
+                _dedup = HammingCache(OCR_DEDUP_SIZE, OCR_DEDUP_MAX_DISTANCE, OCR_DEDUP_TTL)
+
+    return _dedup
+
+
+def _count_dedup(field: str):
+    with _dedup_lock:
+        _dedup_counts[field] += 1
+
+
+def _find_candidate(page_hash: int, boxes: list, use_cache: bool):
+    """
+    (distance, entry) of an earlier page whose hash is within
+    OCR_DEDUP_MAX_DISTANCE and that has as many text lines, or None.
+    Pages without lines are never shared: there is nothing cheaper to
+    confirm them with than reading them.
+    """
+    if OCR_DEDUP_SIZE <= 0 or not boxes:
+        return None
+    if not use_cache:
+        _count_dedup("bypassed")
+        return None
+    return ocr_dedup_cache().get(page_hash, lambda entry: len(entry["reads"]) == len(boxes))
+
+
+def _lines_to_verify(entry: dict) -> list[int]:
+    """
+    The OCR_DEDUP_VERIFY_LINES lines with the most digits and operators
+    in the earlier read (top to bottom on ties). A hash cannot tell
+    "2x + 7 = 15" from "4x + 9 = 21"; a re-read of that line can.
+    """
+    ranked = sorted(
+        range(len(entry["reads"])),
+        key=lambda i: -len(_MATH_CHARS.findall(entry["reads"][i][0]))
+    )
+    return sorted(ranked[:max(1, OCR_DEDUP_VERIFY_LINES)])
+
 
-def extract_text_from_image(image_bytes: bytes) -> dict:
+def _confirm(candidate, indexes: list[int], fresh: list, timing_ms: dict):
     """
-    Performs OCR using Tesseract.
-    Returns extracted text + confidence score.
+    The earlier result when the re-read lines match what it read there,
+    else None. The result carries the lower of its page confidence and
+    the re-read lines'.
     """
+    distance, entry = candidate
+    for i, (text, _) in zip(indexes, fresh):
+        if "".join(text.split()) != "".join(entry["reads"][i][0].split()):
+            _count_dedup("rejected")
+            return None
+
+    _count_dedup("confirmed")
+    result = entry["result"]
+    confidence = min([result.confidence] + [round(c, 2) for _, c in fresh])
+    return replace(
+        result, confidence=confidence, timing_ms=timing_ms, duplicate_distance=distance
+    )
+
 
-    # Load image
-    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+def _remember(page_hash: int, boxes: list, reads: list, result: OCRResult) -> OCRResult:
+    if OCR_DEDUP_SIZE > 0 and boxes:
+        ocr_dedup_cache().set(page_hash, {"reads": reads, "result": result})
+    return result
 
-    # Convert to OpenCV format
-    img = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
 
-    # Preprocessing (IMPORTANT for math text)
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    gray = cv2.threshold(
-        gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
-    )[1]
+def ocr_dedup_stats() -> dict:
+    """
+    Cache counters plus confirmed / rejected hash matches. hit_rate
+    counts only confirmed matches: those are the reads saved.
+    """
+    stats = ocr_dedup_cache().stats()
+    with _dedup_lock:
+        counts = dict(_dedup_counts)
 
-    # OCR with confidence data
-    data = pytesseract.image_to_data(
-        gray,
-        output_type=pytesseract.Output.DICT,
-        config="--psm 6"
+    lookups = stats["hits"] + stats["misses"]
+    return dict(
+        stats,
+        **counts,
+        enabled=OCR_DEDUP_SIZE > 0,
+        verify_lines=max(1, OCR_DEDUP_VERIFY_LINES),
+        hit_rate=round(counts["confirmed"] / lookups, 4) if lookups else 0.0
     )
 
+
+# ─────────────────────────────────────────────
+# Recognition
+# ─────────────────────────────────────────────
+
+# Per-process engines by page segmentation mode (tesserocr backend)
+_engines = {}
+_engines_lock = threading.Lock()
+_backend = None
+
+
+def _engine(psm: int):
+    engine = _engines.get(psm)
+    if engine is None:
+        engine = tesserocr.PyTessBaseAPI(
+            path=OCR_TESSDATA or tesserocr.get_languages()[0],
+            lang=OCR_LANG,
+            psm=psm
+        )
+        _engines[psm] = engine
+    return engine
+
+
+def ocr_backend() -> str:
+    """
+    Backend this process uses, decided (and its engines loaded) once.
+    """
+    global _backend
+
+    if _backend is None:
+        with _engines_lock:
+            if _backend is None:
+                # Only a successful choice sticks: a forced backend that
+                # fails keeps failing rather than degrading silently
+                backend = "pytesseract"
+                if OCR_BACKEND != "pytesseract" and tesserocr is not None:
+                    try:
+                        _engine(7)
+                        _engine(6)
+                        backend = "tesserocr"
+                    except RuntimeError:
+                        # No language data for OCR_LANG
+                        if OCR_BACKEND == "tesserocr":
+                            raise
+                elif OCR_BACKEND == "tesserocr":
+                    raise RuntimeError("tesserocr is not installed")
+                _backend = backend
+
+    return _backend
+
+
+def warm_up() -> str:
+    return ocr_backend()
+
+
+def _read_tesserocr(image: np.ndarray, psm: int) -> tuple[str, float]:
+    image = np.ascontiguousarray(image)
+    height, width = image.shape
+
+    with _engines_lock:
+        engine = _engine(psm)
+        engine.SetImageBytes(image.tobytes(), width, height, 1, width)
+        engine.SetSourceResolution(OCR_TARGET_DPI)
+        text = engine.GetUTF8Text()
+        confidences = [c for c in engine.AllWordConfidences() if c > 0]
+
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return " ".join(text.split()), float(confidence)
+
+
+def _read(image: np.ndarray, psm: int) -> tuple[str, float]:
+    if ocr_backend() == "tesserocr":
+        return _read_tesserocr(image, psm)
+
+    try:
+        data = pytesseract.image_to_data(
+            image,
+            output_type=pytesseract.Output.DICT,
+            config=f"--psm {psm}"
+        )
+    except (pytesseract.TesseractNotFoundError, pytesseract.TesseractError) as e:
+        # These do not unpickle in the parent, which would break the
+        # whole cpu pool; send a plain error back instead
+        raise RuntimeError(f"Tesseract failed: {e}") from None
+
     words = []
     confidences = []
-
     for i, text in enumerate(data["text"]):
         if text.strip():
             words.append(text)
-            conf = int(data["conf"][i])
+            conf = float(data["conf"][i])
             if conf > 0:
                 confidences.append(conf)
 
-    extracted_text = " ".join(words)
-    avg_confidence = (
-        sum(confidences) / len(confidences)
-        if confidences else 0
+    confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return " ".join(words), confidence
+
+
+def read_lines(crops: list[np.ndarray]) -> tuple[str, list[tuple[str, float]]]:
+    """
+    (backend, (text, confidence) per single-line crop).
+    Runs in a cpu-pool worker.
+    """
+    return ocr_backend(), [_read(crop, 7) for crop in crops]
+
+
+def read_page(binary: np.ndarray) -> tuple[str, list[tuple[str, float]]]:
+    return ocr_backend(), [_read(binary, 6)]
+
+
+def _crop(binary: np.ndarray, box) -> np.ndarray:
+    x, y, w, h = box
+    return binary[y:y + h, x:x + w]
+
+
+def _result(boxes, reads, timing_ms: dict, backend: str, page_hash: int) -> OCRResult:
+    lines = [
+        OCRLine(text, round(confidence, 2), box)
+        for box, (text, confidence) in zip(boxes, reads)
+        if text
+    ]
+
+    # Page confidence weighs each line by its text length
+    chars = sum(len(line.text) for line in lines)
+    confidence = (
+        sum(line.confidence * len(line.text) for line in lines) / chars
+        if chars else 0.0
+    )
+
+    return OCRResult(
+        text="\n".join(line.text for line in lines),
+        confidence=round(confidence, 2),
+        lines=lines,
+        timing_ms=timing_ms,
+        backend=backend,
+        phash=f"{page_hash:016x}"
     )
 
-    return {
-        "text": extracted_text,
-        "confidence": avg_confidence
-    }
+
+def _page_box(page: np.ndarray) -> tuple[int, int, int, int]:
+    return (0, 0, page.shape[1], page.shape[0])
+
+
+def extract_text_from_image(image_bytes: bytes, use_cache: bool = True) -> OCRResult:
+    """
+    Whole pipeline in the calling process, lines read one by one.
+    """
+    crops, boxes, timing_ms, page_hash = preprocess(image_bytes)
+
+    candidate = _find_candidate(page_hash, boxes, use_cache)
+    if candidate is not None:
+        start = time.perf_counter()
+        indexes = _lines_to_verify(candidate[1])
+        _, fresh = read_lines([crops[i] for i in indexes])
+        timing_ms["verify_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        duplicate = _confirm(candidate, indexes, fresh, timing_ms)
+        if duplicate is not None:
+            return duplicate
+
+    start = time.perf_counter()
+    if boxes:
+        backend, reads = read_lines(crops)
+    else:
+        boxes = [_page_box(crops[0])]
+        backend, reads = read_page(crops[0])
+    timing_ms["ocr_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    return _remember(page_hash, boxes, reads, _result(boxes, reads, timing_ms, backend, page_hash))
+
+
+async def ocr_image(image_bytes: bytes, use_cache: bool = True) -> OCRResult:
+    """
+    extract_text_from_image with line reads spread over the cpu pool:
+    one task per worker, each with a contiguous run of lines.
+    Raises ExecutorSaturated when the pool is full; no line read is
+    left running then.
+    """
+    crops, boxes, timing_ms, page_hash = await run_cpu(preprocess, image_bytes)
+
+    candidate = _find_candidate(page_hash, boxes, use_cache)
+    if candidate is not None:
+        start = time.perf_counter()
+        indexes = _lines_to_verify(candidate[1])
+        _, fresh = await run_cpu(read_lines, [crops[i] for i in indexes])
+        timing_ms["verify_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        duplicate = _confirm(candidate, indexes, fresh, timing_ms)
+        if duplicate is not None:
+            return duplicate
+
+    start = time.perf_counter()
+    if boxes:
+        tasks = max(1, min(CPU_POOL_WORKERS, len(crops)))
+        step = -(-len(crops) // tasks)
+        done = await run_cpu_all([
+            (read_lines, crops[i:i + step]) for i in range(0, len(crops), step)
+        ])
+        backend = done[0][0]
+        reads = [read for _, group_reads in done for read in group_reads]
+    else:
+        boxes = [_page_box(crops[0])]
+        backend, reads = await run_cpu(read_page, crops[0])
+    timing_ms["ocr_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+    return _remember(page_hash, boxes, reads, _result(boxes, reads, timing_ms, backend, page_hash))
@@ -0,0 +1,276 @@
+import importlib
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+
+# How often a running task is checked for memory overrun / worker death
+_POLL_INTERVAL = 0.05
+
+
+class BudgetExceeded(RuntimeError):
+    """
+    A sandboxed task ran past its wall-clock or memory budget.
+    The worker running it has been killed and replaced.
+    """
+
+
+class SandboxTimeout(BudgetExceeded):
+    pass
+
+
+class SandboxMemoryExceeded(BudgetExceeded):
+    pass
+
+
+class WorkerCrashed(RuntimeError):
+    pass
+
+
+class SandboxUnavailable(RuntimeError):
+    """
+    No worker became free, or finished starting, within the task's
+    budget, or the pool has been shut down. Nothing ran.
+    """
+
+
+def _worker_main(conn, preload):
+    for name in preload:
+        importlib.import_module(name)
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+
+        fn, args, kwargs = task
+        try:
+            reply = ("ok", fn(*args, **kwargs))
+        except Exception as e:
+            reply = ("error", e)
+
+        try:
+            conn.send(reply)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            conn.send(("error", RuntimeError(f"unpicklable result: {e!r}")))
+
+
+def _rss_bytes(pid: int) -> int | None:
+    """
+    Resident set size from /proc (Linux). None where unavailable,
+    in which case only the wall-clock budget applies.
+    """
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _Worker:
+    def __init__(self, ctx, preload):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child, preload), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.ready = False
+
+    def started(self) -> bool:
+        """
+        Ready, or dead: either way there is nothing left to wait for.
+        """
+        return self.ready or self.conn.poll(0)
+
+    def wait_ready(self, timeout: float) -> bool:
+        if not self.ready and self.conn.poll(timeout):
+            self.conn.recv()
+            self.ready = True
+        return self.ready
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Pre-started worker processes for untrusted, possibly runaway work.
+
+    Each task gets a wall-clock budget and, where /proc is available,
+    an RSS budget. A worker that overruns either is killed and a fresh
+    one is started in its place; the caller gets a BudgetExceeded.
+    Workers are spawned with `preload` modules imported up front, so
+    tasks never pay import cost; a respawn imports while the other
+    workers keep serving, and is only used once it is ready or when
+    nothing else is idle. Tasks must be picklable top-level functions.
+    """
+
+    def __init__(self, name: str, workers: int, timeout: float,
+                 max_rss_mb: int = 0, preload=()):
+        self.name = name
+        self.timeout = timeout
+        self.max_rss = max_rss_mb * 2 ** 20 if max_rss_mb > 0 else None
+        self._ctx = multiprocessing.get_context("spawn")
+        self._preload = tuple(preload)
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._counters = {
+            "tasks": 0,
+            "timeouts": 0,
+            "memory_kills": 0,
+            "crashes": 0,
+            "respawns": 0
+        }
+
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._ctx, self._preload)
+        with self._lock:
+            self._workers.add(worker)
+        return worker
+
+    def _replace(self, worker: _Worker, counter: str):
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+            self._counters[counter] += 1
+            closed = self._closed
+            if not closed:
+                self._counters["respawns"] += 1
+        if not closed:
+            self._idle.put(self._spawn())
+
+    def _wait(self, worker: _Worker, deadline: float, timeout: float):
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SandboxTimeout(f"{self.name} task exceeded {timeout:g}s")
+
+            if worker.conn.poll(min(remaining, _POLL_INTERVAL)):
+                return worker.conn.recv()
+
+            if self.max_rss is not None:
+                rss = _rss_bytes(worker.process.pid)
+                if rss is not None and rss > self.max_rss:
+                    raise SandboxMemoryExceeded(
+                        f"{self.name} task exceeded {self.max_rss // 2 ** 20}MB"
+                    )
+
+    def _acquire(self, timeout: float) -> _Worker:
+        deadline = time.monotonic() + timeout
+
+        while True:
+            if self._closed:
+                raise SandboxUnavailable(f"{self.name} pool is shut down")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SandboxUnavailable(
+                    f"no {self.name} worker free within {timeout:g}s"
+                )
+
+            # Short waits so a shutdown is noticed by waiting callers
+            try:
+                worker = self._idle.get(timeout=min(remaining, 0.5))
+            except queue.Empty:
+                continue
+
+            # A respawn may still be importing: take a started idle
+            # worker over it when there is one
+            cold = []
+            while not worker.started():
+                try:
+                    other = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                cold.append(worker)
+                worker = other
+            for other in cold:
+                self._idle.put(other)
+            return worker
+
+    def run(self, fn, *args, timeout: float | None = None, **kwargs):
+        """
+        Runs fn(*args, **kwargs) in a worker, blocking until a worker
+        is free and the task finishes. Exceptions raised by fn are
+        re-raised here. Waiting for a worker is capped by the same
+        budget as the task (SandboxUnavailable). A worker still
+        starting up (after a respawn) spends the task's own budget.
+        """
+        timeout = timeout or self.timeout
+        worker = self._acquire(timeout)
+        deadline = time.monotonic() + timeout
+
+        try:
+            ready = worker.wait_ready(timeout)
+        except (EOFError, OSError) as e:
+            self._replace(worker, "crashes")
+            raise WorkerCrashed(f"{self.name} worker died: {e!r}") from None
+        if not ready:
+            # Still importing: it stays in the pool for a later task
+            self._idle.put(worker)
+            raise SandboxUnavailable(f"no {self.name} worker ready within {timeout:g}s")
+
+        with self._lock:
+            self._counters["tasks"] += 1
+
+        try:
+            worker.conn.send((fn, args, kwargs))
+            status, value = self._wait(worker, deadline, timeout)
+        except SandboxTimeout:
+            self._replace(worker, "timeouts")
+            raise
+        except SandboxMemoryExceeded:
+            self._replace(worker, "memory_kills")
+            raise
+        except (EOFError, OSError) as e:
+            self._replace(worker, "crashes")
+            raise WorkerCrashed(f"{self.name} worker died: {e!r}") from None
+        except BaseException:
+            # e.g. an unpicklable task: the worker itself is fine
+            self._idle.put(worker)
+            raise
+
+        self._idle.put(worker)
+        if status == "error":
+            raise value
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(
+                self._counters,
+                workers=len(self._workers),
+                idle=self._idle.qsize()
+            )
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+            self._workers.clear()
+        for worker in workers:
+            worker.stop()
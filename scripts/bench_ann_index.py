@@ -0,0 +1,121 @@
+"""
+Recall-vs-latency benchmark for the knowledge-base index types.
+
+Builds every index type offered by app.rag.vectorstore.build_index over
+a synthetic, clustered corpus of unit vectors (MiniLM-sized by default).
+Each type is measured against exact inner-product search: build time,
+on-disk size, single-query latency and recall@k, sweeping nprobe (IVF)
+and efSearch (HNSW).
+
+    python -m scripts.bench_ann_index --n 1000000 --queries 200
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from app.rag.vectorstore import INDEX_TYPES, build_index
+
+DIM = 384
+
+
+def synthetic_corpus(n: int, dim: int, clusters: int, seed: int = 0):
+    """
+    Gaussian blobs around random centres, L2-normalized, so that
+    neighbourhoods look more like sentence embeddings than pure noise.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    corpus = np.empty((n, dim), dtype=np.float32)
+
+    for start in range(0, n, 100_000):
+        end = min(n, start + 100_000)
+        labels = rng.integers(0, clusters, end - start)
+        corpus[start:end] = centres[labels]
+        corpus[start:end] += 0.6 * rng.standard_normal((end - start, dim), dtype=np.float32)
+
+    faiss.normalize_L2(corpus)
+    return corpus
+
+
+def make_queries(corpus: np.ndarray, count: int, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    queries = corpus[rng.integers(0, len(corpus), count)].copy()
+    queries += 0.1 * rng.standard_normal(queries.shape, dtype=np.float32)
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def search_one_by_one(index, queries, k):
+    """
+    Per-request latency: one query per search call, as the API does.
+    """
+    found = np.empty((len(queries), k), dtype=np.int64)
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        _, ids = index.search(query.reshape(1, -1), k)
+        found[i] = ids[0]
+    elapsed_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return found, elapsed_ms
+
+
+def _sweep(built_type):
+    params = faiss.ParameterSpace()
+    if built_type in ("ivf_flat", "ivf_pq"):
+        return [("nprobe", v, params) for v in (1, 4, 16, 64)]
+    if built_type == "hnsw":
+        return [("efSearch", v, params) for v in (16, 64, 256)]
+    return [(None, None, None)]
+
+
+def run(n, dim, clusters, queries_count, k, types):
+    print(f"corpus: n={n} dim={dim} clusters={clusters}, {queries_count} queries, recall@{k}")
+
+    corpus = synthetic_corpus(n, dim, clusters)
+    queries = make_queries(corpus, queries_count)
+    ids = np.arange(n, dtype=np.int64)
+
+    exact = faiss.IndexFlatIP(dim)
+    exact.add(corpus)
+    _, truth = exact.search(queries, k)
+    del exact
+
+    print(f"{'type':10s} {'param':>14s} {'build s':>8s} {'size MB':>8s} {'ms/query':>9s} {'recall':>7s}")
+    for index_type in types:
+        start = time.perf_counter()
+        index, built_type = build_index(index_type, corpus, ids)
+        build_s = time.perf_counter() - start
+        size_mb = faiss.serialize_index(index).nbytes / 2 ** 20
+
+        label = index_type if built_type == index_type else f"{index_type}->{built_type}"
+        for name, value, params in _sweep(built_type):
+            if params is not None:
+                params.set_index_parameter(index, name, value)
+            found, ms = search_one_by_one(index, queries, k)
+            setting = f"{name}={value}" if name else "-"
+            print(
+                f"{label:10s} {setting:>14s} {build_s:8.1f} {size_mb:8.1f} "
+                f"{ms:9.3f} {recall_at_k(found, truth):7.3f}"
+            )
+
+        del index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=DIM)
+    parser.add_argument("--clusters", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(INDEX_TYPES), choices=INDEX_TYPES)
+    args = parser.parse_args()
+
+    run(args.n, args.dim, args.clusters, args.queries, args.k, args.types)
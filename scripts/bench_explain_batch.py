@@ -0,0 +1,69 @@
+"""
+Batched explanations against the offline fake Gemini server.
+
+Explains a worksheet of problems three ways: one call after another
+(the old /solve loop), one concurrent call per problem (batch size 1),
+and packed batches. Caching is bypassed so every run goes upstream.
+
+    python -m scripts.bench_explain_batch -n 12 --latency 0.8
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+os.environ.setdefault(
+    "LLM_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "llm_cache.sqlite3")
+)
+
+from app.agents import gemini_client as client_module  # noqa: E402
+from app.agents.gemini_explainer_agent import (  # noqa: E402
+    explain_batch,
+    explain_with_gemini_async
+)
+from scripts.bench_gemini_client import serve, server_stats  # noqa: E402
+
+
+async def sequential(problems):
+    return [await explain_with_gemini_async(*p, use_cache=False) for p in problems]
+
+
+async def timed(label, url, coro):
+    start = time.perf_counter()
+    explanations = await coro
+    ms = (time.perf_counter() - start) * 1000
+    done = sum(1 for e in explanations if e)
+    print(f"  {label:22} {ms:7.0f} ms  explained {done}/{len(explanations)}"
+          f"  upstream calls {server_stats(url)['calls']}")
+
+
+async def run(problems, url, batch_size):
+    print(f"{len(problems)} problems")
+    await timed("sequential", url, sequential(problems))
+    await timed("concurrent per item", url, explain_batch(problems, use_cache=False, batch_size=1))
+    await timed(f"batches of {batch_size}", url, explain_batch(problems, use_cache=False, batch_size=batch_size))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.8)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--port", type=int, default=8093)
+    args = parser.parse_args()
+
+    url = serve(args.port, args.latency, 0.0)
+    client_module._client = client_module.GeminiClient("fake", base_url=url)
+
+    problems = [
+        (f"Find the sum of the first {k} odd numbers", f"{k * k}", [])
+        for k in range(1, args.n + 1)
+    ]
+    asyncio.run(run(problems, url, args.batch_size))
+    client_module.close_gemini_client()
+
+
+if __name__ == "__main__":
+    main()
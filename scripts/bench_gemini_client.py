@@ -0,0 +1,115 @@
+"""
+Shared Gemini client against the offline fake server.
+
+Starts scripts.fake_gemini in-process and compares:
+  - a new genai.Client per call (the old get_gemini_model path)
+    with the shared pooled client, for sequential calls;
+  - a burst of concurrent callers with repeated prompts, to show
+    single-flight and the concurrency cap;
+  - a server failing a share of calls, to show retries.
+
+    python -m scripts.bench_gemini_client -n 40 --latency 0.05
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import uvicorn
+from google import genai
+from google.genai import types
+
+from app.agents.gemini_client import GeminiClient
+from scripts.fake_gemini import create_app
+
+
+def serve(port: int, latency: float, fail_rate: float) -> str:
+    server = uvicorn.Server(uvicorn.Config(
+        create_app(latency, fail_rate), host="127.0.0.1", port=port, log_level="warning"
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def server_stats(url: str, reset: bool = True) -> dict:
+    stats = httpx.get(f"{url}/stats").json()
+    if reset:
+        httpx.post(f"{url}/reset")
+    return stats
+
+
+def per_call_client(url: str, prompt: str) -> str:
+    client = genai.Client(api_key="fake", http_options=types.HttpOptions(base_url=url))
+    return client.models.generate_content(model="gemini-1.5-flash", contents=prompt).text
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8090)
+    args = parser.parse_args()
+
+    url = serve(args.port, args.latency, 0.0)
+    flaky_url = serve(args.port + 1, args.latency, 0.3)
+
+    prompts = [f"Explain step {i}" for i in range(args.n)]
+
+    # ── sequential: client per call vs shared ──
+    start = time.perf_counter()
+    for prompt in prompts:
+        per_call_client(url, prompt)
+    per_call_ms = (time.perf_counter() - start) * 1000 / args.n
+    per_call = server_stats(url)
+
+    client = GeminiClient("fake", base_url=url, max_concurrency=8)
+    start = time.perf_counter()
+    for prompt in prompts:
+        client.generate(prompt)
+    shared_ms = (time.perf_counter() - start) * 1000 / args.n
+    shared = server_stats(url)
+
+    print(f"sequential x{args.n} (server latency {args.latency * 1000:.0f} ms)")
+    print(f"  client per call  {per_call_ms:7.1f} ms/call  connections {per_call['connections']}")
+    print(f"  shared client    {shared_ms:7.1f} ms/call  connections {shared['connections']}")
+
+    # ── burst: 8 distinct prompts, each asked by 8 callers ──
+    burst = [f"Explain step {i % 8}" for i in range(64)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(64) as callers:
+        answers = list(callers.map(client.generate, burst))
+    burst_ms = (time.perf_counter() - start) * 1000
+    seen = server_stats(url)
+
+    print(f"burst of 64 callers, 8 distinct prompts: {burst_ms:.0f} ms")
+    print(f"  upstream calls {seen['calls']}  peak concurrency {seen['peak_concurrency']}"
+          f"  answers {len(answers)}")
+    client.close()
+
+    # ── retries against a server failing 30% of calls ──
+    flaky = GeminiClient(
+        "fake", base_url=flaky_url, max_concurrency=8, max_retries=5, backoff=(0.01, 0.2)
+    )
+    ok = failed = 0
+    with ThreadPoolExecutor(16) as callers:
+        for future in [callers.submit(flaky.generate, p) for p in prompts]:
+            try:
+                future.result()
+                ok += 1
+            except Exception:
+                failed += 1
+    seen = server_stats(flaky_url)
+    stats = flaky.stats()
+    flaky.close()
+
+    print(f"30% server failures, {args.n} prompts: ok {ok}  failed {failed}")
+    print(f"  upstream calls {seen['calls']}  server 503s {seen['failures']}"
+          f"  client retries {stats['retries']}")
+
+
+if __name__ == "__main__":
+    main()
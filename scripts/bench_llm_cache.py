@@ -0,0 +1,69 @@
+"""
+LLM response cache against the offline fake Gemini server.
+
+Runs the fallback solver and the explainer over a set of problems
+twice: a cold pass that calls upstream, then a warm pass that should
+come from the cache. A third pass with use_cache=False refreshes every
+entry. Uses a throwaway SQLite file unless LLM_CACHE_PATH is set.
+
+    python -m scripts.bench_llm_cache -n 50 --latency 0.3
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault(
+    "LLM_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "llm_cache.sqlite3")
+)
+os.environ.setdefault("GEMINI_API_KEY", "fake")
+
+from app.agents import gemini_client as client_module  # noqa: E402
+from app.agents.gemini_explainer_agent import explain_with_gemini  # noqa: E402
+from app.agents.gemini_solver_agent import solve_with_gemini  # noqa: E402
+from app.agents.llm_cache import llm_cache_stats  # noqa: E402
+from scripts.bench_gemini_client import serve, server_stats  # noqa: E402
+
+
+def run_pass(problems, use_cache: bool) -> float:
+    start = time.perf_counter()
+    for text in problems:
+        answer = solve_with_gemini(text, use_cache)["final_answer"]["text"]
+        explain_with_gemini(text, answer, ["step"], use_cache)
+    return (time.perf_counter() - start) * 1000 / len(problems)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--port", type=int, default=8092)
+    args = parser.parse_args()
+
+    url = serve(args.port, args.latency, 0.0)
+    client_module._client = client_module.GeminiClient("fake", base_url=url)
+
+    problems = [f"Prove that {k}^n - 1 is divisible by {k - 1}" for k in range(3, args.n + 3)]
+    # Same problems with different spacing hit the same entries
+    respaced = [text.replace(" ", "  ") + " " for text in problems]
+
+    print(f"cache file: {os.environ['LLM_CACHE_PATH']}")
+    for label, batch, use_cache in (
+        ("cold", problems, True),
+        ("warm (respaced)", respaced, True),
+        ("use_cache=False", problems, False),
+    ):
+        ms = run_pass(batch, use_cache)
+        print(f"  {label:16} {ms:9.3f} ms/problem  upstream calls {server_stats(url)['calls']}")
+
+    stats = llm_cache_stats()
+    print(f"saved calls {stats['saved_calls']}  saved {stats['saved_ms']:.0f} ms")
+    for kind, counters in stats["kinds"].items():
+        print(f"  {kind:8} {counters}")
+
+    client_module.close_gemini_client()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+OCR throughput on synthetic phone photos of worksheets.
+
+Renders pages of printed problems at phone-camera resolution (default
+4032x3024 JPEG): gray paper, an uneven lighting gradient, slight blur
+and sensor noise. Then it times:
+  - preprocessing: the old PIL -> RGB -> BGR -> gray path at full
+    resolution against decode_gray + binarize + detect_lines;
+  - recognition of one photo's line crops: pytesseract (a tesseract
+    process and temp file per crop, when the binary is installed), a
+    fresh tesserocr engine per crop (language data reloaded per read,
+    as each tesseract process does, without the process start), and
+    the warm per-process engines;
+  - full OCR: the old single full-page pytesseract call (when the
+    binary is installed) against ocr_image() over the cpu pool.
+
+    TESSDATA_PREFIX=/usr/share/tessdata python -m scripts.bench_ocr -n 10 --lines 12
+"""
+
+import argparse
+import asyncio
+import io
+import shutil
+import statistics
+import time
+
+import cv2
+import numpy as np
+import pytesseract
+from PIL import Image
+
+from app.config import OCR_LANG, OCR_TESSDATA
+from app.utils import ocr
+from app.utils.ocr import binarize, decode_gray, detect_lines, ocr_image
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+PROBLEMS = [
+    "Find the derivative of f(x) = x^3 + 2x",
+    "Solve x + y = 3 and x - y = 1",
+    "Find the maximum of f(x) = 4x - x^2",
+    "Find the gradient of f(x, y) = x^2 y + y",
+]
+
+
+def photo(lines: int, size=(3024, 4032), seed: int = 0, problems=PROBLEMS) -> bytes:
+    rng = np.random.default_rng(seed)
+    height, width = size[1], size[0]
+    page = np.full((height, width), 225, np.uint8)
+
+    # Lighting falls off toward one corner
+    ramp = np.linspace(0, 35, width, dtype=np.float32)[None, :] \
+        + np.linspace(0, 20, height, dtype=np.float32)[:, None]
+    page = np.clip(page - ramp, 0, 255).astype(np.uint8)
+
+    top = height // 10
+    step = (height - 2 * top) // max(lines, 1)
+    for i in range(lines):
+        text = f"{i + 1}. {problems[i % len(problems)]}"
+        cv2.putText(
+            page, text, (width // 12, top + i * step), cv2.FONT_HERSHEY_SIMPLEX,
+            2.6, 30, 6, cv2.LINE_AA
+        )
+
+    page = cv2.GaussianBlur(page, (5, 5), 0)
+    noise = rng.normal(0, 6, page.shape).astype(np.float32)
+    page = np.clip(page + noise, 0, 255).astype(np.uint8)
+
+    ok, encoded = cv2.imencode(".jpg", page, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def old_preprocess(image_bytes: bytes) -> np.ndarray:
+    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+    img = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def new_preprocess(image_bytes: bytes):
+    binary = binarize(decode_gray(image_bytes))
+    return binary, detect_lines(binary)
+
+
+def old_ocr(image_bytes: bytes) -> str:
+    data = pytesseract.image_to_data(
+        old_preprocess(image_bytes), output_type=pytesseract.Output.DICT, config="--psm 6"
+    )
+    return " ".join(t for t in data["text"] if t.strip())
+
+
+def timed(fn, images) -> list[float]:
+    times = []
+    for image in images:
+        start = time.perf_counter()
+        fn(image)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def report(label, times):
+    print(f"  {label:28} p50 {statistics.median(times):8.1f} ms  "
+          f"max {max(times):8.1f} ms  {1000 * len(times) / sum(times):6.2f} img/s")
+
+
+def crops_of(image_bytes: bytes) -> list[np.ndarray]:
+    binary, boxes = new_preprocess(image_bytes)
+    return [binary[y:y + h, x:x + w] for x, y, w, h in boxes]
+
+
+def pytesseract_lines(crops):
+    for crop in crops:
+        pytesseract.image_to_data(crop, output_type=pytesseract.Output.DICT, config="--psm 7")
+
+
+def cold_tesserocr_lines(crops):
+    for crop in crops:
+        with tesserocr.PyTessBaseAPI(
+            path=OCR_TESSDATA or tesserocr.get_languages()[0], lang=OCR_LANG, psm=7
+        ) as engine:
+            crop = np.ascontiguousarray(crop)
+            engine.SetImageBytes(crop.tobytes(), crop.shape[1], crop.shape[0], 1, crop.shape[1])
+            engine.GetUTF8Text()
+
+
+def warm_tesserocr_lines(crops):
+    for crop in crops:
+        ocr._read_tesserocr(crop, 7)
+
+
+async def timed_async(images) -> list[float]:
+    times = []
+    for image in images:
+        start = time.perf_counter()
+        await ocr_image(image)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=10)
+    parser.add_argument("--lines", type=int, default=12)
+    args = parser.parse_args()
+
+    images = [photo(args.lines, seed=i) for i in range(args.n)]
+    print(f"{args.n} photos, {args.lines} lines, "
+          f"{sum(map(len, images)) / len(images) / 1e6:.1f} MB JPEG each")
+
+    binary, boxes = new_preprocess(images[0])
+    print(f"  downscaled to {binary.shape[1]}x{binary.shape[0]}, "
+          f"{len(boxes)} lines detected (expected {args.lines})")
+
+    print("preprocessing")
+    report("old (PIL, 3 copies, full res)", timed(old_preprocess, images))
+    report("new (gray decode, downscale)", timed(new_preprocess, images))
+
+    has_binary = shutil.which(pytesseract.pytesseract.tesseract_cmd) is not None
+    crops = [crops_of(image) for image in images]
+
+    print(f"recognition, per photo ({ocr.ocr_backend()} is active)")
+    if has_binary:
+        report("pytesseract per crop", timed(pytesseract_lines, crops))
+    else:
+        print("  pytesseract skipped: no tesseract binary")
+    if ocr.ocr_backend() == "tesserocr":
+        report("tesserocr, engine per crop", timed(cold_tesserocr_lines, crops))
+        report("tesserocr, warm engine", timed(warm_tesserocr_lines, crops))
+
+    print("full OCR")
+    if has_binary:
+        report("old (one --psm 6 call)", timed(old_ocr, images))
+    report("new (lines over cpu pool)", asyncio.run(timed_async(images)))
+
+
+if __name__ == "__main__":
+    main()
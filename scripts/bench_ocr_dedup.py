@@ -0,0 +1,141 @@
+"""
+Near-duplicate OCR cache on a simulated classroom.
+
+Renders a few worksheets and has several students photograph each:
+own sensor noise, framing (shift and zoom) and a slight tilt. Half of
+the sheets are look-alikes: the same layout and wording as another
+sheet with different numbers in every line, which the perceptual hash
+alone cannot tell apart. The photos arrive shuffled and go through
+ocr_image() twice, without the dedup cache and with it. Reports
+latency, confirmed and rejected hash matches, and hits served from
+another worksheet's page (wrong text, should be 0), then the Hamming
+distances between photos of the same sheet and of different sheets.
+
+    TESSDATA_PREFIX=/usr/share/tessdata python -m scripts.bench_ocr_dedup --sheets 4 --students 6
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("OCR_DEDUP_SIZE", "512")
+
+import cv2  # noqa: E402
+import numpy as np  # noqa: E402
+
+from app.utils.ocr import ocr_dedup_cache, ocr_dedup_stats, ocr_image, preprocess  # noqa: E402
+from scripts.bench_ocr import photo  # noqa: E402
+
+PROBLEMS = [
+    "Find the derivative of f(x) = x^3 + 2x",
+    "Solve x + y = 3 and x - y = 1",
+    "Find the maximum of f(x) = 4x - x^2",
+    "Find the gradient of f(x, y) = x^2 y + y",
+    "Integrate 3x^2 + 1 from 0 to 2",
+    "Solve 2x + 5 = 11",
+    "Find the limit of sin(x)/x as x tends to 0",
+    "Factor x^2 - 5x + 6",
+]
+
+# Same layout, other numbers
+LOOKALIKE = {
+    "Find the derivative of f(x) = x^3 + 2x": "Find the derivative of f(x) = x^4 + 5x",
+    "Solve x + y = 3 and x - y = 1": "Solve x + y = 7 and x - y = 5",
+    "Find the maximum of f(x) = 4x - x^2": "Find the maximum of f(x) = 6x - x^2",
+    "Find the gradient of f(x, y) = x^2 y + y": "Find the gradient of f(x, y) = x^3 y + y",
+    "Integrate 3x^2 + 1 from 0 to 2": "Integrate 5x^2 + 4 from 0 to 3",
+    "Solve 2x + 5 = 11": "Solve 4x + 9 = 21",
+    "Find the limit of sin(x)/x as x tends to 0": "Find the limit of sin(x)/x as x tends to 1",
+    "Factor x^2 - 5x + 6": "Factor x^2 + 3x - 10",
+}
+
+
+def student_photo(sheet: list[str], student: int, rng: random.Random) -> bytes:
+    page = photo(len(sheet), seed=student, problems=sheet)
+    gray = cv2.imdecode(np.frombuffer(page, np.uint8), cv2.IMREAD_GRAYSCALE)
+    height, width = gray.shape
+
+    matrix = cv2.getRotationMatrix2D(
+        (width / 2, height / 2), rng.uniform(-0.5, 0.5), rng.uniform(0.95, 1.05)
+    )
+    matrix[:, 2] += (rng.uniform(-0.03, 0.03) * width, rng.uniform(-0.03, 0.03) * height)
+    gray = cv2.warpAffine(gray, matrix, (width, height), borderValue=200)
+
+    ok, encoded = cv2.imencode(".jpg", gray, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    return encoded.tobytes()
+
+
+def report(label, times):
+    print(f"  {label:16} p50 {statistics.median(times):7.1f} ms  "
+          f"mean {statistics.mean(times):7.1f} ms  total {sum(times) / 1000:6.1f} s")
+
+
+async def run(uploads, use_cache: bool):
+    ocr_dedup_cache().clear()
+    times, origin, wrong = [], {}, 0
+    for sheet, image in uploads:
+        start = time.perf_counter()
+        result = await ocr_image(image, use_cache=use_cache)
+        times.append((time.perf_counter() - start) * 1000)
+
+        if result.duplicate_distance is None:
+            origin[result.phash] = sheet
+        elif origin[result.phash] != sheet:
+            wrong += 1
+    return times, wrong
+
+
+def distances(uploads):
+    hashes = [(sheet, preprocess(image)[3]) for sheet, image in uploads]
+    same, other = [], []
+    for i, (sheet_a, a) in enumerate(hashes):
+        for sheet_b, b in hashes[i + 1:]:
+            (same if sheet_a == sheet_b else other).append((a ^ b).bit_count())
+    return same, other
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sheets", type=int, default=4)
+    parser.add_argument("--students", type=int, default=6)
+    parser.add_argument("--lines", type=int, default=6)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    sheets = [
+        [PROBLEMS[(k * 3 + i) % len(PROBLEMS)] for i in range(args.lines)]
+        for k in range(-(-args.sheets // 2))
+    ]
+    sheets += [[LOOKALIKE[p] for p in sheet] for sheet in sheets]
+    sheets = sheets[:args.sheets]
+    uploads = [
+        (k, student_photo(sheet, student, rng))
+        for k, sheet in enumerate(sheets)
+        for student in range(args.students)
+    ]
+    rng.shuffle(uploads)
+    print(f"{args.sheets} worksheets x {args.students} students, {args.lines} lines")
+
+    # Spawn the cpu workers and load Tesseract before timing
+    asyncio.run(ocr_image(uploads[0][1], use_cache=False))
+
+    times, _ = asyncio.run(run(uploads, use_cache=False))
+    report("no dedup", times)
+    times, wrong = asyncio.run(run(uploads, use_cache=True))
+    report("dedup", times)
+
+    stats = ocr_dedup_stats()
+    print(f"  served {stats['confirmed']}/{len(uploads)} (ideal {len(uploads) - args.sheets}), "
+          f"hash matches rejected on re-read {stats['rejected']}, wrong sheet {wrong}, "
+          f"max distance {stats['max_distance']}, lines re-read {stats['verify_lines']}")
+
+    same, other = distances(uploads)
+    print(f"hash distance, same sheet:  max {max(same):2}  p50 {statistics.median(same)}")
+    print(f"hash distance, other sheet: min {min(other):2}  p50 {statistics.median(other)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Symbolic vs numeric engine on optimization problems.
+
+Runs every problem through both engines, and through "auto" as the
+solver does (symbolic, switching to numeric in the same call past
+NUMERIC_SWITCH_AFTER), in a sandboxed worker with the SymPy memo caches
+cleared between runs so repeats measure real work. Runs that exceed
+the budget are killed and reported as "timeout"; the kill count shows
+whether "auto" ever needed one.
+
+    python -m scripts.bench_optimization --repeat 5 --budget 5
+"""
+
+import argparse
+import statistics
+import time
+
+from app.agents import symbolic
+from app.agents.parser_agent import parse_problem
+from app.utils.sandbox import BudgetExceeded, SandboxPool
+
+PROBLEMS = [
+    "Find the minimum of f(x) = x^2 - 4x + 1",
+    "Find the maximum of f(x) = x^3 - 3x on [-2, 2]",
+    "Find the minimum of f(x) = x^4 - 3x^3 + 2x",
+    "Find the maximum of f(x) = x*exp(-x)",
+    "Find the minimum of f(x) = x^2 + exp(-x)",
+    "Find the maximum of f(x) = sin(x) + x/3 on [0, 2pi]",
+    "Find the minimum of f(x) = x^2 + 10sin(x)",
+    "Find the maximum of f(x) = log(x + 1) - x^2/4 on [0, 5]",
+    "Find the minimum of f(x) = x^6 - 7x^5 + 3x^3 - x + cos(x)",
+    "Find the maximum of f(x) = x e^(-x) for 0 <= x <= 5",
+]
+
+
+def _bench_task(problem: str, method: str):
+    sub = parse_problem(problem)["subproblems"][0]
+    symbolic.clear_caches()
+    start = time.perf_counter()
+    solved = symbolic.solve_symbolic(
+        "quant_optimization", problem, method,
+        sub["equations"], sub["expression"], sub["extremum"]
+    )
+    return (time.perf_counter() - start) * 1000, solved["final_answer"]["text"]
+
+
+def _measure(pool, problem, method, repeat, budget):
+    times, answer = [], None
+    for _ in range(repeat):
+        try:
+            ms, answer = pool.run(_bench_task, problem, method, timeout=budget)
+        except BudgetExceeded:
+            return None, "timeout"
+        except Exception as e:
+            return None, f"error: {type(e).__name__}"
+        times.append(ms)
+    return statistics.median(times), answer
+
+
+def _fmt(ms):
+    return f"{ms:9.2f}" if ms is not None else f"{'-':>9s}"
+
+
+def run(repeat, budget):
+    pool = SandboxPool("bench", 1, budget, preload=("sympy", "scripts.bench_optimization"))
+    print(f"median of {repeat} runs, budget {budget:g}s")
+    print(f"{'symbolic ms':>11s} {'numeric ms':>10s} {'auto ms':>9s}  problem / answers")
+
+    try:
+        for problem in PROBLEMS:
+            s_ms, s_answer = _measure(pool, problem, "symbolic", repeat, budget)
+            n_ms, n_answer = _measure(pool, problem, "numeric", repeat, budget)
+            kills = pool.stats()["timeouts"]
+            a_ms, a_answer = _measure(pool, problem, "auto", repeat, budget)
+            print(f"{_fmt(s_ms):>11s} {_fmt(n_ms):>10s} {_fmt(a_ms):>9s}  {problem}")
+            print(f"{'':33s} symbolic: {s_answer}")
+            print(f"{'':33s} numeric:  {n_answer}")
+            print(f"{'':33s} auto:     {a_answer}"
+                  + (" (killed)" if pool.stats()["timeouts"] > kills else ""))
+    finally:
+        pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=5.0,
+                        help="seconds before a symbolic run is killed")
+    args = parser.parse_args()
+
+    run(args.repeat, args.budget)
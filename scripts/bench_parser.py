@@ -0,0 +1,191 @@
+"""
+Micro-benchmark for parse_problem.
+
+Builds a synthetic corpus of problem statements from templates and
+times the current parser against the previous implementation, which is
+kept below for comparison. The previous parser used uncompiled patterns
+and a substring scan over OPERATIONS. The benchmark also counts the
+statements where the detected operation differs, e.g. "determine"
+no longer reads as "min". --check runs the equation / expression /
+extremum extraction cases below instead.
+
+    python -m scripts.bench_parser --n 50000
+    python -m scripts.bench_parser --check
+"""
+
+import argparse
+import random
+import re
+import time
+
+from app.agents.parser_agent import (
+    OPERATIONS,
+    TOPICS,
+    _detect_operation,
+    parse_problem
+)
+
+TEMPLATES = [
+    "Find the derivative of y = {poly} at ({a})",
+    "Differentiate f(x) = {poly} with respect to x",
+    "Find the maximum of f(x) = {poly} on [{a}, {b}]",
+    "Determine the minimum value of g(t) = {tpoly}",
+    "Solve {a}x + {b}y = {c}, x - y = {a}",
+    "Solve the system: {a}x + y = {b} and x + {c}y = {a}.",
+    "Find the gradient of f(x, y) = x^{a} y + sin(y) at ({a}, {b})",
+    "Compute the Jacobian of F(x, y) = [x^2 y, {a}x + sin(y)]",
+    "Find the Hessian of f(x, y) = x^3 + {a}xy^2 - y",
+    "Determine the limit of sin(x)/x as x tends to 0",
+    "Maximize the area A(w) = w({a} - w) for 0 <= w <= {a}",
+]
+
+
+# (statement, expected equations, expected expression)
+EXTRACTION_CASES = [
+    ("Solve x + y = 3, x - y = 1", ["x + y = 3", "x - y = 1"], None),
+    ("Solve the system: 2x + y = 5 and x + 3y = 2.", ["2x + y = 5", "x + 3y = 2"], None),
+    ("Solve a + b = 3, a - b = 1", ["a + b = 3", "a - b = 1"], None),
+    ("d/dx of y = sin(x)", ["y = sin(x)"], "sin(x)"),
+    ("Find d/dx of y = x^2 + 3x", ["y = x^2 + 3x"], "x^2 + 3x"),
+    ("Find the derivative with respect to x of y = x^2 at (2)", ["y = x^2"], "x^2"),
+    ("Find the maximum of a function g(t) = 4t - t^2 on [0, 3]", ["g(t) = 4t - t^2"], "4t - t^2"),
+    ("Maximize the area A(w) = w(4 - w) for 0 <= w <= 4", ["A(w) = w(4 - w)"], "w(4 - w)"),
+    ("Find the minimum of f(x) = x^2, x >= 2", ["f(x) = x^2"], "x^2"),
+    ("Find the gradient of f(x, y) = x^2 y + sin(y) at (1, 2)",
+     ["f(x, y) = x^2 y + sin(y)"], "x^2 y + sin(y)"),
+    ("Compute the Jacobian of F(x, y) = [x^2 y, 3x + sin(y)]",
+     ["F(x, y) = [x^2 y, 3x + sin(y)]"], "[x^2 y, 3x + sin(y)]"),
+    ("Find the maximum of sin x + cos x = y", ["sin x + cos x = y"], "y"),
+    ("Find the minimum of f(x) = x^2 - 4x + 5 subject to a maximum budget",
+     ["f(x) = x^2 - 4x + 5"], "x^2 - 4x + 5"),
+    ("What is x if 2x + 7 = 15", ["2x + 7 = 15"], None),
+    ("Find the minimum of f(x, y) = xy + theta x^2 given x > 0", ["f(x, y) = xy + theta x^2"],
+     "xy + theta x^2"),
+    ("Find the maximum of f(x) = x e^(-x) if x is positive", ["f(x) = x e^(-x)"], "x e^(-x)"),
+]
+
+
+# (statement, expected extremum)
+EXTREMUM_CASES = [
+    ("Find the maximum of f(x) = x^3 - 3x on [-2, 2]", "max"),
+    ("Minimise g(t) = t^2 - 2t", "min"),
+    ("Find the minimum of f(x) = x^2 - 4x + 5 subject to a maximum budget", "min"),
+    ("Determine the minimum value of g(t) = t^2 - 4t", "min"),
+    ("Find the derivative of the maximum of f(x) = x^2", None),
+]
+
+
+def check_extraction() -> bool:
+    failures = 0
+    for text, equations, expression in EXTRACTION_CASES:
+        item = parse_problem(text)["subproblems"][0]
+        if item["equations"] != equations or item["expression"] != expression:
+            failures += 1
+            print(f"FAIL {text!r}\n  equations  {item['equations']} (expected {equations})"
+                  f"\n  expression {item['expression']!r} (expected {expression!r})")
+    for text, extremum in EXTREMUM_CASES:
+        item = parse_problem(text)["subproblems"][0]
+        if item["extremum"] != extremum:
+            failures += 1
+            print(f"FAIL {text!r}\n  extremum {item['extremum']!r} (expected {extremum!r})")
+
+    total = len(EXTRACTION_CASES) + len(EXTREMUM_CASES)
+    print(f"{total - failures}/{total} extraction cases pass")
+    return failures == 0
+
+
+def make_corpus(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        a, b, c = rng.randint(1, 9), rng.randint(1, 9), rng.randint(1, 20)
+        poly = f"x^{a} + {b}x - {c}"
+        tpoly = f"t^2 - {a}t + {b}"
+        corpus.append(rng.choice(TEMPLATES).format(
+            a=a, b=b, c=c, poly=poly, tpoly=tpoly
+        ))
+    return corpus
+
+
+# ── Previous implementation, for comparison ───────────────────────────
+
+_LEGACY_OPERATIONS = {
+    k: v for k, v in OPERATIONS.items()
+    if k not in ("maximize", "minimize", "maximise", "minimise")
+}
+
+
+def legacy_detect_operation(text: str):
+    text_l = text.lower()
+    for key, op in _LEGACY_OPERATIONS.items():
+        if key in text_l:
+            return op
+    return None
+
+
+def legacy_parse_problem(raw_text: str) -> dict:
+    text = raw_text.replace("\r", " ")
+    text = re.sub(r"\n+", "\n", text)
+    text = re.sub(r"[ \t]+", " ", text).strip()
+
+    parts = re.split(r"\n|\. (?=[A-Z]|find|solve|max|min)", text)
+    items = []
+    for sub in (p.strip() for p in parts if len(p.strip()) > 3):
+        operation = legacy_detect_operation(sub)
+        items.append({
+            "problem_text": sub,
+            "operation": operation,
+            "topic": TOPICS.get(operation, "unknown"),
+            "variables": sorted(set(re.findall(r"[a-zA-Z]", sub))),
+        })
+
+    return {"original_text": text, "subproblems": items}
+
+
+def _time(fn, corpus, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for text in corpus:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(n, rounds):
+    corpus = make_corpus(n)
+
+    legacy_s = _time(legacy_parse_problem, corpus, rounds)
+    current_s = _time(parse_problem, corpus, rounds)
+
+    legacy_detect_s = _time(legacy_detect_operation, corpus, rounds)
+    current_detect_s = _time(_detect_operation, corpus, rounds)
+
+    print(f"{n} statements, best of {rounds}, us/statement")
+    print(f"{'':18s} {'legacy':>8s} {'current':>8s}")
+    print(f"{'parse_problem':18s} {legacy_s * 1e6 / n:8.2f} {current_s * 1e6 / n:8.2f}")
+    print(f"{'operation+topic':18s} {legacy_detect_s * 1e6 / n:8.2f} {current_detect_s * 1e6 / n:8.2f}")
+    print("(current parse_problem also extracts equations, expression and variables)")
+
+    changed = {}
+    for text in corpus:
+        old = legacy_parse_problem(text)["subproblems"][0]["operation"]
+        new = parse_problem(text)["subproblems"][0]["operation"]
+        if old != new:
+            changed.setdefault((old, new), text)
+
+    print(f"\noperation changes ({len(changed)} kinds):")
+    for (old, new), example in changed.items():
+        print(f"  {old} -> {new}: {example}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--n", type=int, default=50_000)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--check", action="store_true")
+    args = parser.parse_args()
+
+    if args.check:
+        raise SystemExit(0 if check_extraction() else 1)
+    run(args.n, args.rounds)
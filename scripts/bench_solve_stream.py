@@ -0,0 +1,79 @@
+"""
+Time-to-first-result of /solve against /solve/stream.
+
+Posts a request with several fast sub-problems and one slow one to a
+running server, alternating the two endpoints. For /solve the first
+result arrives with the whole response. For /solve/stream it is the
+first "result" line. Repeats use distinct problems, so the solve
+cache does not short-circuit them.
+
+    uvicorn app.main:app --port 8000
+    python -m scripts.bench_solve_stream --url http://127.0.0.1:8000 -n 10
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+import httpx
+
+# Symbolic runs out of budget, then the numeric engine answers
+SLOW = "Find the maximum of f(x) = x^50 + {k}x^37 - sin(x)*x^7 + exp(x)*x^3 on [-1, 1]"
+FAST = [
+    "Find the minimum of f(x) = x^2 - {k}x + 1",
+    "Find the gradient of f(x, y) = x^{k} y + y at (1, 2)",
+    "Find the Hessian of f(x, y) = x^3 + {k}xy^2",
+]
+
+
+def payload(k: int) -> dict:
+    subproblems = [
+        {"problem_text": SLOW.format(k=k + 2), "operation": "optimization"}
+    ] + [
+        {"problem_text": text.format(k=k + 2), "operation": op}
+        for text, op in zip(FAST, ("optimization", "gradient", "hessian"))
+    ]
+    return {"subproblems": subproblems}
+
+
+def blocking(client, url, body):
+    start = time.perf_counter()
+    client.post(f"{url}/solve", json=body).raise_for_status()
+    elapsed = (time.perf_counter() - start) * 1000
+    return elapsed, elapsed
+
+
+def streaming(client, url, body):
+    start = time.perf_counter()
+    first = None
+    with client.stream("POST", f"{url}/solve/stream", json=body) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if first is None and json.loads(line)["event"] == "result":
+                first = (time.perf_counter() - start) * 1000
+    return first, (time.perf_counter() - start) * 1000
+
+
+def run(url, n):
+    rows = {"solve": [], "solve/stream": []}
+    with httpx.Client(timeout=300) as client:
+        for i in range(n):
+            rows["solve"].append(blocking(client, url, payload(2 * i)))
+            rows["solve/stream"].append(streaming(client, url, payload(2 * i + 1)))
+
+    print(f"{n} requests each, 4 sub-problems (1 slow)")
+    for name, values in rows.items():
+        first = [v[0] for v in values]
+        total = [v[1] for v in values]
+        print(f"  /{name:13s} first result p50={statistics.median(first):8.1f}ms "
+              f"max={max(first):8.1f}ms   complete p50={statistics.median(total):8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("-n", type=int, default=10)
+    args = parser.parse_args()
+
+    run(args.url, args.n)
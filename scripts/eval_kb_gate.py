@@ -0,0 +1,123 @@
+"""
+Accuracy / latency evaluation of the KB relevance gate.
+
+Uses the bundled scripts/kb_eval.jsonl: paraphrases of KB questions
+("kb": true) and problems the KB does not cover, which the symbolic
+solvers should answer ("kb": false).
+
+Retrieval mode (default) sweeps the accept threshold for pure vector
+scores and for the hybrid lexical re-rank. It reports precision and
+recall of accepted KB answers, the false-accept rate on out-of-KB
+problems, and retrieval latency. It also suggests the threshold with
+the best F1.
+
+    python -m scripts.eval_kb_gate
+    python -m scripts.eval_kb_gate --solve     # end-to-end via solve_problem
+"""
+
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+
+from app.config import KB_LEXICAL_WEIGHT
+
+EVAL_PATH = Path(__file__).with_name("kb_eval.jsonl")
+
+
+def load_eval_set(path: Path = EVAL_PATH) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def normalize_answer(text) -> str:
+    return "".join(str(text).lower().replace("−", "-").split())
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def evaluate_retrieval(items, lexical_weight):
+    from app.rag.retriever import retrieve_context
+
+    retrieve_context(items[0]["query"], lexical_weight=lexical_weight)  # warm-up
+
+    rows, latencies = [], []
+    for item in items:
+        start = time.perf_counter()
+        hits = retrieve_context(item["query"], lexical_weight=lexical_weight)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        top = hits[0] if hits else None
+        rows.append({
+            "kb": item["kb"],
+            "score": top["score"] if top else 0.0,
+            "correct": bool(top) and normalize_answer(top.get("answer")) == normalize_answer(item["answer"])
+        })
+
+    positives = sum(r["kb"] for r in rows)
+    negatives = len(rows) - positives
+
+    print(f"\nlexical_weight={lexical_weight}  "
+          f"retrieval p50={statistics.median(latencies):.2f}ms p95={_percentile(latencies, 95):.2f}ms")
+    print(f"{'threshold':>9s} {'accepted':>8s} {'precision':>9s} {'recall':>7s} {'false acc':>9s} {'f1':>6s}")
+
+    best = (0.0, None)
+    for step in range(0, 14):
+        threshold = round(0.30 + 0.05 * step, 2)
+        accepted = [r for r in rows if r["score"] >= threshold]
+        correct = sum(r["correct"] and r["kb"] for r in accepted)
+        false_accepts = sum(not r["kb"] for r in accepted)
+
+        precision = correct / len(accepted) if accepted else 1.0
+        recall = correct / positives if positives else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        if f1 > best[0]:
+            best = (f1, threshold)
+
+        print(f"{threshold:9.2f} {len(accepted):8d} {precision:9.2f} {recall:7.2f} "
+              f"{false_accepts / negatives if negatives else 0:9.2f} {f1:6.2f}")
+
+    print(f"best F1 {best[0]:.2f} at threshold {best[1]}")
+
+
+def evaluate_solve(items):
+    from app.agents.solver_agent import solve_problem
+
+    correct, latencies, sources = 0, [], {}
+    for item in items:
+        payload = {"subproblems": [{
+            "problem_text": item["query"],
+            "operation": item.get("operation")
+        }]}
+
+        start = time.perf_counter()
+        result = solve_problem(payload)["results"][0]
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        source = result.get("source", {}).get("answer")
+        sources[source] = sources.get(source, 0) + 1
+        answer = (result.get("final_answer") or {}).get("text", "")
+        correct += normalize_answer(answer) == normalize_answer(item["answer"])
+
+    print(f"end-to-end accuracy {correct}/{len(items)}, "
+          f"p50={statistics.median(latencies):.1f}ms p95={_percentile(latencies, 95):.1f}ms")
+    print(f"answer sources: {sources}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--solve", action="store_true",
+                        help="run the full solver with the configured thresholds")
+    args = parser.parse_args()
+
+    items = load_eval_set()
+    if args.solve:
+        evaluate_solve(items)
+    else:
+        evaluate_retrieval(items, 0.0)
+        if KB_LEXICAL_WEIGHT > 0:
+            evaluate_retrieval(items, KB_LEXICAL_WEIGHT)
@@ -0,0 +1,115 @@
+"""
+Offline stand-in for the Gemini generateContent endpoint.
+
+Answers every prompt with a short echo after a fixed latency (batched
+explanation prompts get a JSON array, one entry per problem), fails a
+share of calls with 503 to exercise retries, and counts what it has
+seen at GET /stats (calls, failures, distinct prompts, peak
+concurrency, TCP connections).
+
+    python -m scripts.fake_gemini --port 8090 --latency 0.2 --fail-rate 0.2
+    GEMINI_API_KEY=fake GEMINI_BASE_URL=http://127.0.0.1:8090 uvicorn app.main:app
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_app(latency: float = 0.2, fail_rate: float = 0.0) -> FastAPI:
+    app = FastAPI(title="Fake Gemini")
+    state = {
+        "calls": 0,
+        "failures": 0,
+        "active": 0,
+        "peak_concurrency": 0,
+        "prompts": set(),
+        "connections": set()
+    }
+
+    @app.post("/{version}/models/{model}:generateContent")
+    async def generate_content(version: str, model: str, request: Request):
+        body = await request.json()
+        prompt = "".join(
+            part.get("text", "")
+            for content in body.get("contents", [])
+            for part in content.get("parts", [])
+        )
+
+        state["calls"] += 1
+        state["prompts"].add(prompt)
+        state["connections"].add(request.client.port if request.client else None)
+        state["active"] += 1
+        state["peak_concurrency"] = max(state["peak_concurrency"], state["active"])
+        try:
+            await asyncio.sleep(latency)
+        finally:
+            state["active"] -= 1
+
+        if random.random() < fail_rate:
+            state["failures"] += 1
+            return JSONResponse(status_code=503, content={"error": {
+                "code": 503, "message": "overloaded", "status": "UNAVAILABLE"
+            }})
+
+        # Batched explanation prompts get the JSON array they ask for
+        problems = re.findall(r"^### Problem (\d+)$", prompt, re.MULTILINE)
+        if problems:
+            text = json.dumps([
+                {"id": int(n), "explanation": f"fake explanation {n}"} for n in problems
+            ])
+        else:
+            text = f"fake answer ({len(prompt)} chars)\n{model}"
+
+        return {
+            "candidates": [{
+                "content": {
+                    "role": "model",
+                    "parts": [{"text": text}]
+                },
+                "finishReason": "STOP"
+            }],
+            "modelVersion": model
+        }
+
+    @app.get("/stats")
+    def stats():
+        return {
+            "calls": state["calls"],
+            "failures": state["failures"],
+            "distinct_prompts": len(state["prompts"]),
+            "peak_concurrency": state["peak_concurrency"],
+            "connections": len(state["connections"])
+        }
+
+    @app.post("/reset")
+    def reset():
+        state.update(calls=0, failures=0, peak_concurrency=0)
+        state["prompts"].clear()
+        state["connections"].clear()
+        return {"status": "reset"}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_app(args.latency, args.fail_rate),
+        host="127.0.0.1", port=args.port, log_level="warning"
+    )
+
+
+if __name__ == "__main__":
+    main()
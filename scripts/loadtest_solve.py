@@ -0,0 +1,108 @@
+"""
+Concurrent load test for /solve.
+
+Fires a mix of slow (heavy SymPy) and fast /solve requests plus cheap
+/parse probes at a running server and reports latency percentiles for
+each class. Blocking work on the event loop shows up as the probes
+inheriting the solver's latency.
+
+    uvicorn app.main:app --port 8000
+    python -m scripts.loadtest_solve --url http://127.0.0.1:8000 -c 32 -n 400
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+SLOW_PROBLEM = {
+    "subproblems": [{
+        "problem_text": "x**2 + y**2 = 5; x*y + x + y = 3",
+        "operation": "system"
+    }]
+}
+
+FAST_PROBLEM = {
+    "subproblems": [{
+        "problem_text": "find derivative of f(x) = x^2 + 3x",
+        "operation": "derivative"
+    }]
+}
+
+PROBE_FORM = {"input_type": "text", "text": "find the maximum of f(x) = 4x - x^2"}
+
+
+def _percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    k = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[k]
+
+
+async def _worker(client, url, queue, latencies, statuses):
+    while True:
+        try:
+            kind = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        start = time.perf_counter()
+        try:
+            if kind == "probe":
+                response = await client.post(f"{url}/parse", data=PROBE_FORM)
+            else:
+                body = SLOW_PROBLEM if kind == "slow" else FAST_PROBLEM
+                response = await client.post(f"{url}/solve", json=body)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        except httpx.HTTPError:
+            statuses["error"] = statuses.get("error", 0) + 1
+        latencies[kind].append((time.perf_counter() - start) * 1000)
+
+
+async def run(url: str, concurrency: int, total: int, slow_ratio: float):
+    queue = asyncio.Queue()
+    slow_every = max(1, int(round(1 / slow_ratio))) if slow_ratio > 0 else 0
+    for i in range(total):
+        if i % 2:
+            queue.put_nowait("probe")
+        elif slow_every and (i // 2) % slow_every == 0:
+            queue.put_nowait("slow")
+        else:
+            queue.put_nowait("fast")
+
+    latencies = {"slow": [], "fast": [], "probe": []}
+    statuses = {}
+
+    async with httpx.AsyncClient(timeout=300) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            _worker(client, url, queue, latencies, statuses)
+            for _ in range(concurrency)
+        ])
+        elapsed = time.perf_counter() - start
+
+    print(f"{total} requests, concurrency {concurrency}, {elapsed:.1f}s "
+          f"({total / elapsed:.1f} req/s), status codes {statuses}")
+    for kind, values in latencies.items():
+        if not values:
+            continue
+        print(
+            f"  {kind:5s} n={len(values):4d} "
+            f"p50={statistics.median(values):8.1f}ms "
+            f"p95={_percentile(values, 95):8.1f}ms "
+            f"p99={_percentile(values, 99):8.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-n", "--requests", type=int, default=400)
+    parser.add_argument("--slow-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.url, args.concurrency, args.requests, args.slow_ratio))